@@ -0,0 +1,487 @@
+"""Content-addressed storage and header parsing for uploaded audio.
+
+Uploads are streamed to disk in chunks while being hashed and stored as
+``<root>/<aa>/<bb>/<sha256>.<ext>``, so identical audio is kept once no matter
+how many users upload it or what the files were called; the extension comes
+from the content, not the uploaded name. MEDIA_FILES counts the songs that point at each
+stored file, and a file is removed once nothing references it.
+
+Durations come from the files themselves: the RIFF ``fmt``/``data`` chunks for
+WAV, and the Xing/Info or VBRI header (or the first frame's bitrate for CBR)
+for MP3. Title, album, artist and genre tags are read the same way: ID3v2
+(2.2 to 2.4, falling back to ID3v1) for MP3, and the ``LIST``/``INFO`` or
+``id3`` chunk for WAV.
+"""
+import hashlib
+import os
+import re
+import struct
+import tempfile
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from media_server import INCOMING_DIR, MEDIA_ROOT
+
+CHUNK_SIZE = 1024 * 1024
+
+MEDIA_FILES_TABLE = """
+    CREATE TABLE IF NOT EXISTS MEDIA_FILES (
+        Content_Hash CHAR(64) PRIMARY KEY,
+        File_Path VARCHAR(255) NOT NULL UNIQUE,
+        Size_Bytes BIGINT NOT NULL,
+        Duration INT NOT NULL,
+        Ref_Count INT NOT NULL DEFAULT 0
+    )
+"""
+
+
+def store_stream(stream: BinaryIO, root: str = MEDIA_ROOT) -> Tuple[str, str, int, bool]:
+    """Copy ``stream`` into content-addressed storage.
+
+    Returns (path, sha256 hex digest, size in bytes, created). ``created`` is
+    False when identical content was already stored, in which case the new copy
+    is discarded.
+    """
+    tmp_dir = os.path.join(root, INCOMING_DIR)
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(head) < 12:
+                    head += chunk[:12 - len(head)]
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        content_hash = digest.hexdigest()
+        path = content_path(content_hash, audio_extension(head), root)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return path, content_hash, size, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return path, content_hash, size, True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def audio_extension(head: bytes) -> str:
+    """"wav" or "mp3", from the first 12 bytes of the content"""
+    return "wav" if head[:4] == b"RIFF" and head[8:12] == b"WAVE" else "mp3"
+
+
+def content_path(content_hash: str, extension: str, root: str = MEDIA_ROOT) -> str:
+    return os.path.join(root, content_hash[:2], content_hash[2:4], f"{content_hash}.{extension}")
+
+
+def hash_file(path: str) -> Tuple[str, int]:
+    """Return (sha256 hex digest, size) of a file, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def audio_duration(path: str) -> Optional[int]:
+    """Duration in whole seconds read from WAV or MP3 headers, or None if unrecognised"""
+    with open(path, "rb") as f:
+        head = f.read(12)
+        f.seek(0)
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            seconds = wav_duration(f)
+        else:
+            seconds = mp3_duration(f, os.path.getsize(path))
+    if seconds is None:
+        return None
+    return max(int(round(seconds)), 1)
+
+
+def wav_duration(f: BinaryIO) -> Optional[float]:
+    f.seek(12)
+    byte_rate = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", header)
+        if chunk_id == b"fmt ":
+            fmt = f.read(chunk_size)
+            if len(fmt) < 12:
+                return None
+            byte_rate = struct.unpack("<I", fmt[8:12])[0]
+            if chunk_size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            return chunk_size / byte_rate
+        else:
+            # Chunks are word aligned
+            f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+
+_MP3_BITRATES = {
+    # (MPEG-1?, layer) -> kbps by bitrate index
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def parse_mp3_frame_header(header: bytes) -> Optional[dict]:
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 3
+    layer = 4 - ((header[1] >> 1) & 3)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 1
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and not mpeg1:
+        samples, length = 576, 72 * bitrate // sample_rate + padding
+    else:
+        samples, length = 1152, 144 * bitrate // sample_rate + padding
+    return {
+        "mpeg1": mpeg1,
+        "mono": header[3] >> 6 == 3,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "samples": samples,
+        "length": length,
+    }
+
+
+def id3v2_size(header: bytes) -> int:
+    """Total size of a leading ID3v2 tag (0 if there is none)"""
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def mp3_duration(f: BinaryIO, file_size: int) -> Optional[float]:
+    f.seek(0)
+    offset = id3v2_size(f.read(10))
+
+    # Find the first frame whose successor also syncs, to skip false positives
+    f.seek(offset)
+    window = f.read(64 * 1024)
+    frame = None
+    for i in range(len(window) - 4):
+        candidate = parse_mp3_frame_header(window[i:i + 4])
+        if candidate is None:
+            continue
+        following = window[i + candidate["length"]:i + candidate["length"] + 4]
+        if len(following) < 4 or parse_mp3_frame_header(following):
+            frame, offset = candidate, offset + i
+            break
+    if frame is None:
+        return None
+
+    f.seek(offset)
+    first = f.read(frame["length"] or 4)
+
+    # VBR files carry a frame count in a Xing/Info or VBRI header
+    side_info = (17 if frame["mono"] else 32) if frame["mpeg1"] else (9 if frame["mono"] else 17)
+    xing = 4 + side_info
+    if first[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", first[xing + 4:xing + 8])[0]
+        if flags & 1:
+            frames = struct.unpack(">I", first[xing + 8:xing + 12])[0]
+            return frames * frame["samples"] / frame["sample_rate"]
+    if first[36:40] == b"VBRI":
+        frames = struct.unpack(">I", first[50:54])[0]
+        return frames * frame["samples"] / frame["sample_rate"]
+
+    # Constant bitrate: audio bytes over bytes per second
+    audio_bytes = file_size - offset
+    f.seek(max(file_size - 128, 0))
+    if f.read(3) == b"TAG":
+        audio_bytes -= 128
+    return audio_bytes * 8 / frame["bitrate"]
+
+
+# Text frames read from ID3v2.2 (three letter ids) and 2.3/2.4 tags
+_ID3_FRAMES = {
+    "TT2": "title", "TIT2": "title",
+    "TAL": "album", "TALB": "album",
+    "TP1": "artists", "TPE1": "artists",
+    "TCO": "genre", "TCON": "genre",
+}
+_INFO_FIELDS = {b"INAM": "title", b"IPRD": "album", b"IART": "artists", b"IGNR": "genre"}
+_ID3_TEXT_ENCODINGS = {0: "latin-1", 1: "utf-16", 2: "utf-16-be", 3: "utf-8"}
+
+# Genre numbers used by ID3v1 and by "(n)" references in ID3v2 TCON frames
+ID3V1_GENRES = [
+    "Blues", "Classic Rock", "Country", "Dance", "Disco", "Funk", "Grunge", "Hip-Hop", "Jazz", "Metal",
+    "New Age", "Oldies", "Other", "Pop", "R&B", "Rap", "Reggae", "Rock", "Techno", "Industrial",
+    "Alternative", "Ska", "Death Metal", "Pranks", "Soundtrack", "Euro-Techno", "Ambient", "Trip-Hop",
+    "Vocal", "Jazz+Funk", "Fusion", "Trance", "Classical", "Instrumental", "Acid", "House", "Game",
+    "Sound Clip", "Gospel", "Noise", "AlternRock", "Bass", "Soul", "Punk", "Space", "Meditative",
+    "Instrumental Pop", "Instrumental Rock", "Ethnic", "Gothic", "Darkwave", "Techno-Industrial",
+    "Electronic", "Pop-Folk", "Eurodance", "Dream", "Southern Rock", "Comedy", "Cult", "Gangsta",
+    "Top 40", "Christian Rap", "Pop/Funk", "Jungle", "Native American", "Cabaret", "New Wave",
+    "Psychadelic", "Rave", "Showtunes", "Trailer", "Lo-Fi", "Tribal", "Acid Punk", "Acid Jazz", "Polka",
+    "Retro", "Musical", "Rock & Roll", "Hard Rock",
+]
+
+
+def read_tags(path: str) -> Dict[str, object]:
+    """Title, album, genre (strings) and artists (a list) from a file's tags; missing ones are left out"""
+    with open(path, "rb") as f:
+        head = f.read(12)
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return wav_tags(f)
+        f.seek(0)
+        header = f.read(10)
+        size = id3v2_size(header)
+        tags = parse_id3v2(header, f.read(size - 10)) if size else {}
+        if not tags:
+            f.seek(0, os.SEEK_END)
+            if f.tell() >= 128:
+                f.seek(-128, os.SEEK_END)
+                tags = parse_id3v1(f.read(128))
+    return tags
+
+
+def synchsafe(data: bytes) -> int:
+    size = 0
+    for byte in data:
+        size = (size << 7) | (byte & 0x7F)
+    return size
+
+
+def parse_id3v2(header: bytes, body: bytes) -> Dict[str, object]:
+    """Text tags from an ID3v2 tag, given its 10 byte header and the rest of the tag"""
+    major, flags = header[3], header[5]
+    if major not in (2, 3, 4):
+        return {}
+    if flags & 0x80 and major < 4:
+        # Tag-wide unsynchronisation; 2.4 does this per frame
+        body = body.replace(b"\xff\x00", b"\xff")
+    pos = 0
+    if flags & 0x40 and major == 3:
+        pos = 4 + struct.unpack(">I", body[:4])[0]
+    elif flags & 0x40 and major == 4:
+        pos = synchsafe(body[:4])
+    id_length, header_length = (3, 6) if major == 2 else (4, 10)
+
+    tags = {}
+    while pos + header_length <= len(body):
+        frame_id = body[pos:pos + id_length]
+        if not frame_id.strip(b"\0"):
+            break  # padding
+        if major == 2:
+            size, frame_flags = int.from_bytes(body[pos + 3:pos + 6], "big"), 0
+        else:
+            raw_size = body[pos + 4:pos + 8]
+            size = synchsafe(raw_size) if major == 4 else int.from_bytes(raw_size, "big")
+            frame_flags = int.from_bytes(body[pos + 8:pos + 10], "big")
+        data = body[pos + header_length:pos + header_length + size]
+        pos += header_length + size
+
+        field = _ID3_FRAMES.get(frame_id.decode("latin-1"))
+        if field is None or field in tags or not data:
+            continue
+        if major == 3:
+            if frame_flags & 0x00C0:
+                continue  # compressed or encrypted
+            if frame_flags & 0x0020:
+                data = data[1:]  # group id
+        elif major == 4:
+            if frame_flags & 0x000C:
+                continue
+            if frame_flags & 0x0040:
+                data = data[1:]
+            if frame_flags & 0x0001:
+                data = data[4:]  # data length indicator
+            if frame_flags & 0x0002:
+                data = data.replace(b"\xff\x00", b"\xff")
+        values = id3_text(data)
+        if values:
+            tags[field] = values if field == "artists" else values[0]
+    if "genre" in tags:
+        tags["genre"] = genre_name(tags["genre"])
+    return tags
+
+
+def id3_text(data: bytes) -> List[str]:
+    """The values of an ID3v2 text frame (2.4 separates several with NULs)"""
+    encoding = _ID3_TEXT_ENCODINGS.get(data[0])
+    if encoding is None:
+        return []
+    text = data[1:].decode(encoding, "replace")
+    return [value.strip() for value in text.split("\0") if value.strip()]
+
+
+def genre_name(genre: str) -> str:
+    """Resolve ID3v1 genre numbers, written as "17" or "(17)" or "(17)Rock", to names"""
+    m = re.match(r"^\((\d+)\)(.*)$", genre) or re.match(r"^(\d+)()$", genre)
+    if not m:
+        return genre
+    if m.group(2).strip():
+        return m.group(2).strip()
+    number = int(m.group(1))
+    return ID3V1_GENRES[number] if number < len(ID3V1_GENRES) else genre
+
+
+def parse_id3v1(tag: bytes) -> Dict[str, object]:
+    if tag[:3] != b"TAG":
+        return {}
+
+    def field(start, end):
+        return tag[start:end].split(b"\0")[0].decode("latin-1").strip()
+
+    tags = {"title": field(3, 33), "artists": [field(33, 63)], "album": field(63, 93)}
+    if tag[127] < len(ID3V1_GENRES):
+        tags["genre"] = ID3V1_GENRES[tag[127]]
+    return {key: value for key, value in tags.items() if value and value != [""]}
+
+
+def wav_tags(f: BinaryIO) -> Dict[str, object]:
+    """Tags from a WAV file's LIST/INFO chunk, or an embedded ID3v2 chunk"""
+    f.seek(12)
+    tags = {}
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return tags
+        chunk_id, chunk_size = struct.unpack("<4sI", header)
+        if chunk_id == b"LIST":
+            # Read the whole chunk, so a short or non-INFO list keeps the next chunk aligned
+            body = f.read(chunk_size)
+            info = body[4:] if body[:4] == b"INFO" else b""
+            pos = 0
+            while pos + 8 <= len(info):
+                field_id, field_size = struct.unpack("<4sI", info[pos:pos + 8])
+                value = info[pos + 8:pos + 8 + field_size].split(b"\0")[0]
+                pos += 8 + field_size + (field_size % 2)
+                field = _INFO_FIELDS.get(field_id)
+                if field is None:
+                    continue
+                try:
+                    value = value.decode("utf-8").strip()
+                except UnicodeDecodeError:
+                    value = value.decode("latin-1").strip()
+                if value:
+                    tags[field] = [value] if field == "artists" else value
+            if chunk_size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id in (b"id3 ", b"ID3 "):
+            data = f.read(chunk_size)
+            size = id3v2_size(data[:10])
+            if size:
+                # INFO wins where both are present
+                tags = {**parse_id3v2(data[:10], data[10:size]), **tags}
+            if chunk_size % 2:
+                f.seek(1, os.SEEK_CUR)
+        else:
+            f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+
+def ingest_file(source: str, root: str = MEDIA_ROOT) -> Dict[str, object]:
+    """Store one audio file and read its duration and tags.
+
+    Runs in the bulk importer's worker processes, so it takes and returns
+    plain values. The result has the source path, ``error`` (None on
+    success), and otherwise the stored path, content hash, size, duration,
+    whether the content was newly stored, and the tags.
+    """
+    result = {"source": source, "error": None}
+    try:
+        with open(source, "rb") as f:
+            path, content_hash, size, created = store_stream(f, root)
+        result.update(path=path, content_hash=content_hash, size=size, created=created)
+        duration = audio_duration(path)
+        if duration is None:
+            if created:
+                os.remove(path)
+            result["error"] = "could not read the audio duration"
+            return result
+        result.update(duration=duration, tags=read_tags(source))
+    except (OSError, struct.error, ValueError) as e:
+        result["error"] = str(e)
+    return result
+
+
+def remove_unreferenced(db) -> int:
+    """Delete stored files no song points at any more; returns how many were removed"""
+    orphans = db.execute_query("SELECT Content_Hash, File_Path FROM MEDIA_FILES WHERE Ref_Count <= 0")
+    if not isinstance(orphans, list) or not orphans:
+        return 0
+    hashes = tuple(o['Content_Hash'] for o in orphans)
+    placeholders = ", ".join(["%s"] * len(hashes))
+    if not db.execute_query(
+        f"DELETE FROM MEDIA_FILES WHERE Ref_Count <= 0 AND Content_Hash IN ({placeholders})",
+        hashes,
+        fetch=False
+    ):
+        return 0
+
+    # An upload of the same content may have re-registered the file meanwhile
+    revived = db.execute_query(
+        f"SELECT Content_Hash FROM MEDIA_FILES WHERE Content_Hash IN ({placeholders})",
+        hashes
+    )
+    if not isinstance(revived, list):
+        return 0
+    revived = {r['Content_Hash'] for r in revived}
+
+    removed = 0
+    for orphan in orphans:
+        if orphan['Content_Hash'] not in revived and os.path.exists(orphan['File_Path']):
+            os.remove(orphan['File_Path'])
+            removed += 1
+    return removed
+
+
+def discard_uncommitted(db, stored: List[Tuple[str, str]]) -> int:
+    """Delete newly stored files whose songs failed to commit.
+
+    ``stored`` holds (path, content hash) pairs from ``store_stream`` calls
+    that returned ``created``. A file is kept if MEDIA_FILES already has its
+    hash, i.e. another upload of the same content committed meanwhile.
+    Returns how many files were removed.
+    """
+    if not stored:
+        return 0
+    hashes = tuple({content_hash for _, content_hash in stored})
+    placeholders = ", ".join(["%s"] * len(hashes))
+    registered = db.execute_query(
+        f"SELECT Content_Hash FROM MEDIA_FILES WHERE Content_Hash IN ({placeholders})",
+        hashes
+    )
+    if not isinstance(registered, list):
+        return 0
+    registered = {r['Content_Hash'] for r in registered}
+
+    removed = 0
+    for path, content_hash in stored:
+        if content_hash not in registered and os.path.exists(path):
+            os.remove(path)
+            removed += 1
+    return removed
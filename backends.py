@@ -0,0 +1,71 @@
+"""Database engines the app can run on.
+
+``DatabaseManager`` and the connection pool only talk to a backend through a
+small interface, so the same pages, maintenance commands and benchmarks run
+on either engine (selected with ``DB_BACKEND``):
+
+- ``name`` and ``fulltext`` (whether MATCH ... AGAINST search is available);
+- ``connect()`` opens a DB-API connection whose cursors accept
+  ``dictionary=`` / ``buffered=`` and raise ``mysql.connector`` errors;
+- ``create_database()`` creates the database and its schema from scratch;
+- ``migrate(conn)``, ``schema_version(conn)``, ``explain_queries(conn, queries)``
+  and ``table_rows(conn)`` for maintenance and benchmarks.
+
+The SQLite implementation lives in sqlite_backend.py.
+"""
+from typing import Dict, Iterable, List
+
+import mysql.connector
+
+import migrations
+
+
+class MySQLBackend:
+    name = "mysql"
+    fulltext = True
+
+    def __init__(self, host: str, user: str, password: str, database: str):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+
+    def connect(self, database: bool = True):
+        return mysql.connector.connect(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            auth_plugin='mysql_native_password',
+            **({"database": self.database} if database else {})
+        )
+
+    def create_database(self) -> List[migrations.Migration]:
+        """Create the database if needed and run every migration on it"""
+        conn = self.connect(database=False)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
+            cursor.execute(f"USE {self.database}")
+            cursor.close()
+            return self.migrate(conn)
+        finally:
+            conn.close()
+
+    def migrate(self, conn) -> List[migrations.Migration]:
+        return migrations.migrate(conn)
+
+    def schema_version(self, conn) -> int:
+        return migrations.schema_version(conn)
+
+    def explain_queries(self, conn, queries: Iterable[tuple]) -> Dict[str, List[Dict]]:
+        return migrations.explain_queries(conn, queries)
+
+    def table_rows(self, conn) -> Dict[str, int]:
+        """Approximate rows per table (InnoDB estimates, good enough to tell scales apart)"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES "
+                           "WHERE TABLE_SCHEMA = DATABASE()")
+            return {name: rows for name, rows in cursor.fetchall()}
+        finally:
+            cursor.close()
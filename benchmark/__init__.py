@@ -0,0 +1,22 @@
+"""Synthetic data and query benchmarks for Audily.
+
+Fill a separate benchmark database with skewed, deterministic data, then
+replay the queries each page issues and write the latencies to JSON:
+
+    python -m benchmark generate --scale 1m --seed 7
+    python -m benchmark run --iterations 500 --concurrency 8
+    python -m benchmark run --compare benchmark/results/<baseline>.json
+    python -m benchmark startup --runs 10
+
+``startup`` times a cold start instead: importing the app and rendering the
+login page in fresh interpreters, plus an import-time profile.
+
+The benchmark database defaults to ``MUSIC_APP_BENCH`` (``BENCH_DATABASE``);
+the generator refuses to touch a database whose name doesn't say "bench"
+unless given ``--force``. Set ``DB_BACKEND=sqlite`` to generate and replay
+against an embedded SQLite file (``<database>.sqlite3``) instead of MySQL.
+"""
+import os
+
+BENCH_DATABASE = os.getenv("BENCH_DATABASE", "MUSIC_APP_BENCH")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
@@ -0,0 +1,108 @@
+"""Command line entry point: ``python -m benchmark {generate,run,startup}``"""
+import argparse
+import json
+import os
+import sys
+
+from benchmark import BENCH_DATABASE
+
+
+def generate(args) -> bool:
+    from database import get_backend
+    from benchmark.datagen import DataGenerator
+
+    backend = get_backend()
+    backend.create_database()
+    conn = backend.connect()
+    try:
+        print(f"🎲 Generating scale {args.scale} (seed {args.seed}) into {args.database} ({backend.name})")
+        inserted = DataGenerator(conn, args.scale, args.seed).generate()
+    finally:
+        conn.close()
+    print(f"✅ {sum(inserted.values())} rows generated")
+    return True
+
+
+def run(args) -> bool:
+    from database import DatabaseManager
+    from benchmark.runner import run_benchmark
+
+    db = DatabaseManager()
+    print(f"⏱ Replaying page queries against {args.database} ({db.backend.name})")
+    results = run_benchmark(db, args.page, args.iterations, args.concurrency, args.warmup, args.seed, args.cache)
+    return report(results, args)
+
+
+def startup(args) -> bool:
+    from benchmark.startup import run_startup
+
+    print(f"⏱ Timing cold start against {args.database} ({args.runs} runs)")
+    return report(run_startup(args.runs), args)
+
+
+def report(results, args) -> bool:
+    from benchmark.runner import compare, write_results
+
+    path = write_results(results, args.output)
+    print(f"✅ Results written to {path}")
+
+    if not args.compare:
+        return True
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    regressions = compare(baseline, results, args.threshold)
+    for r in regressions:
+        print(f"⚠️ {r['query']}: p95 {r['before']:.2f} ms -> {r['after']:.2f} ms (+{r['change']:.0%})")
+    if not regressions:
+        print(f"✅ No query slowed down by more than {args.threshold:.0%}")
+    return not regressions
+
+
+COMMANDS = {
+    "generate": generate,
+    "run": run,
+    "startup": startup,
+}
+
+
+def main(argv=None) -> int:
+    from benchmark.datagen import SCALES
+    from benchmark.workload import PAGES
+
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Audily synthetic benchmarks")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--database", default=BENCH_DATABASE, help="benchmark database name")
+    parser.add_argument("--force", action="store_true",
+                        help="generate: allow a database whose name doesn't contain 'bench'")
+    parser.add_argument("--scale", choices=list(SCALES), default="10k", help="generate: total row count")
+    parser.add_argument("--seed", type=int, default=42, help="data and parameter sampling seed")
+    parser.add_argument("--page", action="append", choices=list(PAGES),
+                        help="run: only replay these pages (repeatable)")
+    parser.add_argument("--iterations", type=int, default=200, help="run: timed calls per query")
+    parser.add_argument("--concurrency", type=int, default=4, help="run: worker threads")
+    parser.add_argument("--warmup", type=int, default=10, help="run: untimed calls per query first")
+    parser.add_argument("--cache", action="store_true", help="run: keep the app's result cache enabled")
+    parser.add_argument("--runs", type=int, default=5, help="startup: fresh interpreters to time")
+    parser.add_argument("--output", help="run/startup: results file (default benchmark/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="run/startup: baseline results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="run/startup: p95 growth over the baseline that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate" and "bench" not in args.database.lower() and not args.force:
+        parser.error(f"refusing to overwrite {args.database}; pass --force if it really is a scratch database")
+
+    # The app reads these when first imported
+    os.environ["DB_NAME"] = args.database
+    # Never the app's own SQLite file, whatever SQLITE_PATH says
+    os.environ["SQLITE_PATH"] = f"{args.database.lower()}.sqlite3"
+    os.environ["METRICS_AUTOSTART"] = "0"
+    os.environ.setdefault("DB_POOL_SIZE", str(max(args.concurrency, 1) + 1))
+    if not args.cache:
+        os.environ["QUERY_CACHE_MAX_ENTRIES"] = "0"
+
+    return 0 if COMMANDS[args.command](args) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""Deterministic synthetic data for the benchmark database.
+
+Row counts scale linearly from a ~10k row base (``SCALES``). The same seed and
+scale always produce the same rows, so runs on different commits compare like
+with like. The data is skewed the way real listening is:
+
+- song popularity, plays per song and songs per artist follow Zipf curves;
+- playlists, ratings and listening per user follow a Pareto curve, so a
+  few heavy users own most playlists;
+- popularity ranks are shuffled over IDs so hot rows aren't clustered.
+"""
+import time
+from collections import Counter
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from migrations import PLAYLIST_POSITION_GAP, SONG_RATINGS_REBUILD, USER_ACTIVITY_DAILY_REBUILD, USER_STATS_REBUILD
+
+# Rows per table at scale "10k"; SONG_ARTISTS adds ~1.2 rows per song
+BASE_ROWS = {
+    "USERS": 400,
+    "ARTISTS": 150,
+    "SONGS": 1500,
+    "PLAYLISTS": 600,
+    "PLAYLIST_SONGS": 2400,
+    "RATINGS": 1200,
+    "COMMENTS": 500,
+    "TRENDING": 900,
+    "USER_ACTIVITY": 1000,
+}
+SCALES = {"10k": 1, "100k": 10, "1m": 100, "10m": 1000}
+
+ZIPF_EXPONENT = 1.1
+PARETO_SHAPE = 1.2
+FEATURED_ARTIST_SHARE = 0.2
+PLAYS_PER_SONG = 40
+BATCH_SIZE = 5000
+
+# Fixed so generated timestamps don't depend on when the generator runs
+EPOCH = np.datetime64("2024-01-01T00:00:00")
+SPAN_DAYS = 365
+TRENDING_DAYS = 30
+
+GENRES = ["Pop", "Rock", "Hip Hop", "Electronic", "Jazz", "Classical", "R&B", "Country", "Metal", "Folk",
+          "Reggae", "Blues", "Latin", "Soul", "Punk", "Ambient"]
+WORDS = ["love", "night", "fire", "dream", "river", "light", "heart", "summer", "shadow", "gold", "rain",
+         "city", "ocean", "midnight", "wild", "echo", "stone", "electric", "velvet", "neon", "silver",
+         "storm", "paper", "crystal", "desert", "thunder", "honey", "ghost", "diamond", "satellite",
+         "highway", "garden", "mirror", "winter", "island", "sugar", "static", "horizon", "falling", "broken"]
+COMMENTS = ["Love this one!", "On repeat all week", "That chorus though", "Underrated track",
+            "Takes me back", "Perfect for the gym", "The bridge is everything", "Great production"]
+
+
+def zipf_weights(rng: np.random.Generator, n: int, exponent: float = ZIPF_EXPONENT) -> np.ndarray:
+    """Zipf probabilities over ``n`` items, assigned to IDs in random order"""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def pareto_weights(rng: np.random.Generator, n: int, shape: float = PARETO_SHAPE) -> np.ndarray:
+    weights = rng.pareto(shape, n) + 1.0
+    return weights / weights.sum()
+
+
+def unique_pairs(rng: np.random.Generator, count: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """``count`` distinct (left id, right id) pairs drawn with the given probabilities (ids from 1)"""
+    pairs = np.empty((0, 2), dtype=np.int64)
+    while len(pairs) < count:
+        draw = int((count - len(pairs)) * 1.3) + 16
+        sample = np.column_stack([rng.choice(len(left), draw, p=left) + 1, rng.choice(len(right), draw, p=right) + 1])
+        pairs = np.unique(np.vstack([pairs, sample]), axis=0)
+        if len(pairs) >= len(left) * len(right):
+            break
+    return pairs[rng.permutation(len(pairs))[:count]]
+
+
+def timestamps(rng: np.random.Generator, count: int, days: int = SPAN_DAYS, end_days: int = SPAN_DAYS) -> np.ndarray:
+    """Uniform timestamps over the ``days`` before ``EPOCH + end_days``"""
+    start = (end_days - days) * 86400
+    return EPOCH + rng.integers(start, end_days * 86400, count).astype("timedelta64[s]")
+
+
+def phrases(rng: np.random.Generator, count: int, words: int = 2) -> List[str]:
+    picks = rng.integers(0, len(WORDS), (count, words))
+    return [" ".join(WORDS[i] for i in row).title() for row in picks]
+
+
+class DataGenerator:
+    TABLES = ["USERS", "ARTISTS", "SONGS", "SONG_ARTISTS", "PLAYLISTS", "PLAYLIST_SONGS", "RATINGS",
+              "COMMENTS", "TRENDING", "USER_ACTIVITY", "USER_STATS", "RECOMMENDATIONS", "TRENDING_HOURLY",
+              "MEDIA_FILES", "SONG_RATINGS", "USER_ACTIVITY_DAILY"]
+
+    def __init__(self, conn, scale: str = "10k", seed: int = 42):
+        self.conn = conn
+        self.rng = np.random.default_rng(seed)
+        self.counts = {table: rows * SCALES[scale] for table, rows in BASE_ROWS.items()}
+        self.inserted: Dict[str, int] = {}
+
+    def insert(self, table: str, columns: List[str], rows: Iterable[tuple], total: int):
+        query = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                 f"VALUES ({', '.join(['%s'] * len(columns))})")
+        cursor = self.conn.cursor()
+        started = time.perf_counter()
+        batch, written = [], 0
+        try:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    cursor.executemany(query, batch)
+                    self.conn.commit()
+                    written += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(query, batch)
+                self.conn.commit()
+                written += len(batch)
+        finally:
+            cursor.close()
+        self.inserted[table] = written
+        print(f"  {table}: {written} rows in {time.perf_counter() - started:.1f}s")
+        assert written == total, f"{table}: expected {total} rows, wrote {written}"
+
+    def reset(self):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+            for table in self.TABLES:
+                cursor.execute(f"TRUNCATE TABLE {table}")
+        finally:
+            cursor.close()
+
+    def generate(self) -> Dict[str, int]:
+        rng, n = self.rng, self.counts
+        self.reset()
+
+        users = n["USERS"]
+        user_activity = pareto_weights(rng, users)
+        names = ["admin"] + [f"user{i:07d}" for i in range(2, users + 1)]
+        plans = rng.choice(["Free", "Premium", "Family"], users, p=[0.7, 0.25, 0.05])
+        self.insert("USERS", ["User_ID", "Username", "Email", "Password", "Subscription_Type", "Created_At"], (
+            (i + 1, names[i], f"{names[i]}@example.com", "bench", str(plans[i]), created)
+            for i, created in enumerate(timestamps(rng, users).tolist())
+        ), users)
+
+        artists = n["ARTISTS"]
+        artist_weights = zipf_weights(rng, artists)
+        self.insert("ARTISTS", ["Artist_ID", "Name", "Bio"], (
+            (i + 1, name, f"{name} is a synthetic benchmark artist.")
+            for i, name in enumerate(phrases(rng, artists))
+        ), artists)
+
+        songs = n["SONGS"]
+        song_weights = zipf_weights(rng, songs)
+        titles = phrases(rng, songs)
+        albums = phrases(rng, songs)
+        genre_weights = zipf_weights(rng, len(GENRES), 0.8)
+        genres = rng.choice(len(GENRES), songs, p=genre_weights)
+        durations = rng.integers(120, 420, songs)
+        uploaders = rng.choice(users, songs, p=zipf_weights(rng, users)) + 1
+        play_counts = np.floor(song_weights * songs * PLAYS_PER_SONG).astype(np.int64)
+        self.insert("SONGS", ["Song_ID", "Title", "Album", "Genre", "Duration", "File_Path", "User_ID",
+                              "Upload_Date", "Play_Count"], (
+            (i + 1, titles[i], albums[i], GENRES[genres[i]], int(durations[i]), f"bench/{i + 1}.mp3",
+             int(uploaders[i]), uploaded, int(play_counts[i]))
+            for i, uploaded in enumerate(timestamps(rng, songs).tolist())
+        ), songs)
+
+        primary = rng.choice(artists, songs, p=artist_weights) + 1
+        featured_songs = np.flatnonzero(rng.random(songs) < FEATURED_ARTIST_SHARE)
+        featured = rng.choice(artists, len(featured_songs), p=artist_weights) + 1
+        pairs = np.unique(np.vstack([
+            np.column_stack([np.arange(1, songs + 1), primary]),
+            np.column_stack([featured_songs + 1, featured]),
+        ]), axis=0)
+        self.insert("SONG_ARTISTS", ["Song_ID", "Artist_ID"],
+                    ((int(s), int(a)) for s, a in pairs), len(pairs))
+
+        playlists = n["PLAYLISTS"]
+        owners = rng.choice(users, playlists, p=user_activity) + 1
+        playlist_names = phrases(rng, playlists)
+        self.insert("PLAYLISTS", ["Playlist_ID", "Name", "User_ID", "Created_At"], (
+            (i + 1, playlist_names[i], int(owners[i]), created)
+            for i, created in enumerate(timestamps(rng, playlists).tolist())
+        ), playlists)
+
+        playlist_lengths = rng.lognormal(0, 1, playlists)
+        entries = unique_pairs(rng, n["PLAYLIST_SONGS"], playlist_lengths / playlist_lengths.sum(), song_weights)
+        lengths = Counter()
+
+        def positioned():
+            # Songs are appended in the order drawn, PLAYLIST_POSITION_GAP apart
+            for p, s in entries:
+                lengths[p] += 1
+                yield int(p), int(s), lengths[p] * PLAYLIST_POSITION_GAP
+
+        self.insert("PLAYLIST_SONGS", ["Playlist_ID", "Song_ID", "Position"], positioned(), len(entries))
+
+        ratings = unique_pairs(rng, n["RATINGS"], user_activity, song_weights)
+        stars = rng.choice(np.arange(1, 11) / 2, len(ratings),
+                           p=np.array([1, 1, 2, 3, 5, 8, 12, 16, 14, 10]) / 72)
+        self.insert("RATINGS", ["User_ID", "Song_ID", "Rating_Value"],
+                    ((int(u), int(s), float(v)) for (u, s), v in zip(ratings, stars)), len(ratings))
+
+        comments = n["COMMENTS"]
+        commenters = rng.choice(users, comments, p=user_activity) + 1
+        commented = rng.choice(songs, comments, p=song_weights) + 1
+        texts = rng.integers(0, len(COMMENTS), comments)
+        self.insert("COMMENTS", ["Comment_Text", "User_ID", "Song_ID", "Timestamp"], (
+            (COMMENTS[texts[i]], int(commenters[i]), int(commented[i]), at)
+            for i, at in enumerate(timestamps(rng, comments).tolist())
+        ), comments)
+
+        # Daily counts for the last TRENDING_DAYS days, popular songs trending most days
+        first_day = (EPOCH + np.timedelta64(SPAN_DAYS - TRENDING_DAYS, "D")).astype("datetime64[D]")
+        day_weights = np.full(TRENDING_DAYS, 1.0 / TRENDING_DAYS)
+        trending = unique_pairs(rng, n["TRENDING"], song_weights, day_weights)
+        self.insert("TRENDING", ["Song_ID", "Trend_Date", "Play_Count"], (
+            (int(s), (first_day + int(d) - 1).astype(object), int(max(play_counts[s - 1] // TRENDING_DAYS, 1)))
+            for s, d in trending
+        ), len(trending))
+
+        plays = n["USER_ACTIVITY"]
+        listeners = rng.choice(users, plays, p=user_activity) + 1
+        played = rng.choice(songs, plays, p=song_weights)
+        self.insert("USER_ACTIVITY", ["User_ID", "Activity_Type", "Song_ID", "Timestamp"], (
+            (int(listeners[i]), "play", int(played[i]) + 1, at)
+            for i, at in enumerate(timestamps(rng, plays).tolist())
+        ), plays)
+
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+            cursor.execute(USER_STATS_REBUILD)
+            cursor.execute(SONG_RATINGS_REBUILD)
+            cursor.execute(USER_ACTIVITY_DAILY_REBUILD.format(where=""))
+            self.conn.commit()
+            # Fresh statistics so EXPLAIN and the optimizer see the new distribution
+            for table in self.TABLES:
+                cursor.execute(f"ANALYZE TABLE {table}")
+                cursor.fetchall()
+        finally:
+            cursor.close()
+        return self.inserted
@@ -0,0 +1,138 @@
+"""Replay the page workload and record latency and throughput per query.
+
+Results are plain JSON (``RESULTS_FORMAT``) keyed by ``"<page>/<label>"`` so
+two runs can be diffed with ``compare``.
+"""
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from benchmark import RESULTS_DIR
+from benchmark.workload import Context, workload
+
+RESULTS_FORMAT = 1
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def measure(db, ctx: Context, fn, iterations: int, concurrency: int, seed: int) -> Dict:
+    """Call ``fn`` ``iterations`` times across ``concurrency`` threads"""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def worker(index: int, calls: int):
+        nonlocal errors
+        local_ctx = ctx.fork(seed + index)
+        timings, failed = [], 0
+        for _ in range(calls):
+            started = time.perf_counter()
+            try:
+                ok = fn(db, local_ctx) is not False
+            except Exception:
+                ok = False
+            timings.append(time.perf_counter() - started)
+            failed += not ok
+        with lock:
+            latencies.extend(timings)
+            errors += failed
+
+    shares = [iterations // concurrency + (i < iterations % concurrency) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker, i, calls) for i, calls in enumerate(shares) if calls]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    ms = np.asarray(latencies) * 1000
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_qps": round(len(latencies) / wall, 1) if wall else 0.0,
+    }
+
+
+def run_benchmark(db, pages: List[str] = None, iterations: int = 200, concurrency: int = 4,
+                  warmup: int = 10, seed: int = 42, cache: bool = False) -> Dict:
+    ctx = Context(db, seed)
+    queries, totals = {}, {}
+    for page, label, fn in workload(pages):
+        for i in range(warmup):
+            fn(db, ctx)
+        result = measure(db, ctx, fn, iterations, concurrency, seed)
+        queries[f"{page}/{label}"] = {"page": page, **result}
+        print(f"  {page:<10} {label:<24} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+              f"{result['throughput_qps']:>8.1f} q/s" + (f"  {result['errors']} errors" if result['errors'] else ""))
+
+        page_total = totals.setdefault(page, {"queries": 0, "mean_ms": 0.0, "p95_ms": 0.0})
+        page_total["queries"] += 1
+        page_total["mean_ms"] = round(page_total["mean_ms"] + result["mean_ms"], 3)
+        page_total["p95_ms"] = round(page_total["p95_ms"] + result["p95_ms"], 3)
+
+    version = db.execute_query("SELECT VERSION() AS Version")
+    conn = db.pool.acquire()
+    try:
+        tables = db.backend.table_rows(conn)
+    finally:
+        db.pool.release(conn)
+    return {
+        "format": RESULTS_FORMAT,
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "backend": db.backend.name,
+            "server": version[0]['Version'] if isinstance(version, list) and version else None,
+            "iterations": iterations,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "seed": seed,
+            "cache": cache,
+            "table_rows": tables,
+        },
+        "pages": totals,
+        "queries": queries,
+        "statements": db.metrics.summary(),
+    }
+
+
+def write_results(results: Dict, path: str = None) -> str:
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{stamp}-{results['meta']['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    return path
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.2, metric: str = "p95_ms") -> List[Dict]:
+    """Queries whose ``metric`` grew by more than ``threshold`` (a fraction) over the baseline"""
+    regressions = []
+    for key, result in current["queries"].items():
+        before = baseline.get("queries", {}).get(key)
+        if not before or not before.get(metric):
+            continue
+        change = (result[metric] - before[metric]) / before[metric]
+        if change > threshold:
+            regressions.append({"query": key, "before": before[metric], "after": result[metric],
+                                "change": round(change, 3)})
+    return sorted(regressions, key=lambda r: r["change"], reverse=True)
@@ -0,0 +1,128 @@
+"""Cold-start cost of the app: an import-time profile and time to first render.
+
+Every run starts a fresh interpreter, the way a new server worker does, and
+times two phases:
+
+- ``import``: loading ``audily_app`` and everything it imports at module level;
+- ``login render``: the first script run up to the rendered login page
+  (pool warm-up, schema check and the page itself), using Streamlit's
+  ``AppTest``. The test harness's own imports are not counted.
+
+Results use the same shape as ``runner.run_benchmark`` (``startup/<phase>``
+entries under ``queries``), so ``compare`` tracks startup regressions too.
+"""
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from benchmark.runner import RESULTS_FORMAT, git_commit
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_SCRIPT = os.path.join(APP_DIR, "audily_app.py")
+
+_CHILD = """
+import json, sys, time
+spawned = float(sys.argv[1])
+import audily_app
+imported = time.time()
+from streamlit.testing.v1 import AppTest
+harness = time.time()
+at = AppTest.from_file(sys.argv[2], default_timeout=120).run()
+rendered = time.time()
+print(json.dumps({
+    "import_ms": (imported - spawned) * 1000,
+    "render_ms": (rendered - harness) * 1000,
+    "rendered": any("Audily" in t.value for t in at.title),
+    "errors": [e.message for e in at.exception] + [e.value for e in at.error],
+}))
+"""
+
+# "import time: self [us] | cumulative | imported package"
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module: str = "audily_app", top: int = 15) -> Dict:
+    """``python -X importtime`` for ``module``: total and its heaviest direct imports"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=APP_DIR, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    # Lines come out in completion order, so a module's own imports are the
+    # entries one level deeper that precede it since the last top-level one
+    children, direct, total = [], [], 0.0
+    for m in _IMPORTTIME.finditer(result.stderr):
+        cumulative, depth, name = int(m.group(2)) / 1000, len(m.group(3)), m.group(4)
+        if depth == 1:
+            if name == module:
+                direct, total = children, cumulative
+            children = []
+        elif depth == 3:
+            children.append({"module": name, "cumulative_ms": round(cumulative, 1)})
+    direct.sort(key=lambda d: d["cumulative_ms"], reverse=True)
+    return {"module": module, "total_ms": round(total, 1), "imports": direct[:top]}
+
+
+def cold_start() -> Dict:
+    """One fresh-interpreter run of the child script"""
+    spawned = time.time()
+    result = subprocess.run([sys.executable, "-c", _CHILD, repr(spawned), APP_SCRIPT],
+                            cwd=APP_DIR, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode or not lines:
+        raise RuntimeError(f"Cold start failed:\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def summarize(values: List[float]) -> Dict:
+    ms = np.asarray(values)
+    return {
+        "calls": len(values),
+        "errors": 0,
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def run_startup(runs: int = 5) -> Dict:
+    profile = import_profile()
+    print(f"  import audily_app: {profile['total_ms']:.0f} ms")
+    for entry in profile["imports"]:
+        print(f"    {entry['module']:<28} {entry['cumulative_ms']:>8.1f} ms")
+
+    samples = [cold_start() for _ in range(runs)]
+    failed = [s for s in samples if not s["rendered"] or s["errors"]]
+    if failed:
+        raise RuntimeError(f"Login page did not render: {failed[0]['errors']}")
+    queries = {
+        "startup/import": {"page": "startup", **summarize([s["import_ms"] for s in samples])},
+        "startup/login render": {"page": "startup", **summarize([s["render_ms"] for s in samples])},
+        "startup/first render": {"page": "startup",
+                                 **summarize([s["import_ms"] + s["render_ms"] for s in samples])},
+    }
+    for key, result in queries.items():
+        print(f"  {key:<24} p50 {result['p50_ms']:>9.1f} ms  p95 {result['p95_ms']:>9.1f} ms")
+
+    return {
+        "format": RESULTS_FORMAT,
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "backend": os.getenv("DB_BACKEND", "mysql"),
+            "runs": runs,
+        },
+        "import_profile": profile,
+        "pages": {},
+        "queries": queries,
+    }
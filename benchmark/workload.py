@@ -0,0 +1,247 @@
+"""The queries each page issues, replayed with sampled parameters.
+
+Each entry is ``(label, fn(db, ctx))``. Queries the app builds through
+``DatabaseManager`` methods call those methods, so they always match the
+app. Queries written inline in the page modules (``views/``) are copied
+here and must be kept in sync with the page they mirror.
+"""
+import copy
+from typing import Dict, List
+
+import numpy as np
+
+from benchmark.datagen import GENRES, WORDS
+
+
+class Context:
+    """Samples parameters the way traffic arrives: popular songs and active users more often"""
+
+    def __init__(self, db, seed: int = 42):
+        self.rng = np.random.default_rng(seed)
+        self.song_ids, self.song_plays, self.song_cdf = self._weighted(
+            db, "SELECT Song_ID, Play_Count FROM SONGS")
+        self.user_ids, _, self.user_cdf = self._weighted(
+            db, "SELECT User_ID, Playlist_Count + Upload_Count + Total_Plays FROM USER_STATS")
+        artists = db.execute_query("SELECT MAX(Artist_ID) AS Max_ID FROM ARTISTS")
+        self.max_artist = (artists[0]['Max_ID'] or 0) if isinstance(artists, list) and artists else 0
+        if not len(self.song_ids) or not len(self.user_ids) or not self.max_artist:
+            raise RuntimeError("Benchmark database is empty; run `python -m benchmark generate` first")
+
+    def fork(self, seed: int) -> "Context":
+        """A copy sharing the loaded ids but with its own generator, one per worker thread"""
+        forked = copy.copy(self)
+        forked.rng = np.random.default_rng(seed)
+        return forked
+
+    @staticmethod
+    def _weighted(db, query: str) -> tuple:
+        """(ids, counts, cumulative weights) with weight count + 1 per id"""
+        ids, counts = [], []
+        for _, _, rows in db.stream_query(query, site="benchmark"):
+            ids.extend(r[0] for r in rows)
+            counts.extend(int(r[1] or 0) for r in rows)
+        ids, counts = np.asarray(ids, dtype=np.int64), np.asarray(counts, dtype=np.float64)
+        return ids, counts, np.cumsum(counts + 1.0)
+
+    def _pick(self, ids: np.ndarray, cdf: np.ndarray) -> int:
+        # Binary search on a precomputed CDF; rng.choice(p=...) rebuilds it on every call
+        return int(ids[np.searchsorted(cdf, self.rng.random() * cdf[-1], side="right")])
+
+    def song(self) -> int:
+        return self._pick(self.song_ids, self.song_cdf)
+
+    def songs(self, n: int) -> tuple:
+        picked = set()
+        while len(picked) < min(n, len(self.song_ids)):
+            picked.add(self.song())
+        return tuple(sorted(picked))
+
+    def page_cursor(self) -> tuple:
+        """(Play_Count, Song_ID) of a random song, as if paging deep into the catalog"""
+        i = int(self.rng.integers(len(self.song_ids)))
+        return int(self.song_plays[i]), int(self.song_ids[i])
+
+    def user(self) -> int:
+        return self._pick(self.user_ids, self.user_cdf)
+
+    def artist(self) -> int:
+        return int(self.rng.integers(1, self.max_artist + 1))
+
+    def genre(self) -> str:
+        return GENRES[int(self.rng.integers(len(GENRES)))]
+
+    def search_text(self) -> str:
+        word = WORDS[int(self.rng.integers(len(WORDS)))]
+        return word[:int(self.rng.integers(3, len(word) + 1))]
+
+
+def _in(ids: tuple) -> str:
+    return ", ".join(["%s"] * len(ids))
+
+
+def dashboard_user_stats(db, ctx, user_id: int = None):
+    return db.execute_query(
+        "SELECT Playlist_Count, Upload_Count, Total_Plays FROM USER_STATS WHERE User_ID = %s",
+        (user_id or ctx.user(),), cache=True)
+
+
+def dashboard_recent(db, ctx, user_id: int = None):
+    return db.execute_query(
+        "SELECT s.Song_ID, s.Title, a.Name as Artist, s.Play_Count, s.Cover_Image "
+        "FROM SONGS s "
+        "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+        "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+        "WHERE s.User_ID = %s "
+        "ORDER BY s.Upload_Date DESC LIMIT 5",
+        (user_id or ctx.user(),), cache=True)
+
+
+def dashboard_recommended(db, ctx, user_id: int = None):
+    rows = db.fetch_frame(
+        "SELECT s.Song_ID, s.Title, GROUP_CONCAT(a.Name SEPARATOR ', ') as Artist "
+        "FROM (SELECT Song_ID, Score FROM RECOMMENDATIONS "
+        "      WHERE User_ID = %s ORDER BY Score DESC LIMIT 5) r "
+        "JOIN SONGS s ON r.Song_ID = s.Song_ID "
+        "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+        "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+        "GROUP BY s.Song_ID, s.Title, r.Score "
+        "ORDER BY r.Score DESC",
+        (user_id or ctx.user(),), cache=True)
+    if rows is not False and rows.empty:
+        return db.fetch_song_page(limit=5)
+    return rows
+
+
+def dashboard_page(db, ctx):
+    """The whole dashboard, its reads fanned out the way the page runs them"""
+    user_id = ctx.user()
+    return db.fetch_all({
+        "stats": lambda: dashboard_user_stats(db, ctx, user_id),
+        "recent": lambda: dashboard_recent(db, ctx, user_id),
+        "recommended": lambda: dashboard_recommended(db, ctx, user_id),
+    })
+
+
+def browse_artist_page(db, ctx):
+    artist_id = ctx.artist()
+    artist = db.execute_query("SELECT * FROM ARTISTS WHERE Artist_ID = %s", (artist_id,), cache=True)
+    if not isinstance(artist, list):
+        return artist
+    return db.fetch_song_page(
+        "EXISTS (SELECT 1 FROM SONG_ARTISTS sa WHERE sa.Song_ID = s.Song_ID AND sa.Artist_ID = %s)",
+        (artist_id,))
+
+
+def trending_details(db, ctx):
+    song_ids = ctx.songs(10)
+    return db.fetch_frame(
+        "SELECT s.Song_ID, s.Title, GROUP_CONCAT(a.Name SEPARATOR ', ') as Artist, "
+        "ROUND(r.Rating_Sum / NULLIF(r.Rating_Count, 0), 1) AS Avg_Rating, "
+        "COALESCE(r.Rating_Count, 0) AS Ratings "
+        "FROM SONGS s "
+        "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+        "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+        "LEFT JOIN SONG_RATINGS r ON r.Song_ID = s.Song_ID "
+        f"WHERE s.Song_ID IN ({_in(song_ids)}) "
+        "GROUP BY s.Song_ID, s.Title, r.Rating_Sum, r.Rating_Count",
+        song_ids, cache=True)
+
+
+def trending_artists(db, ctx):
+    artist_ids = tuple(sorted({ctx.artist() for _ in range(5)}))
+    return db.fetch_frame(
+        f"SELECT Artist_ID, Name FROM ARTISTS WHERE Artist_ID IN ({_in(artist_ids)})",
+        artist_ids, cache=True)
+
+
+def admin_activity_report(db, ctx):
+    return db.fetch_frame(
+        "SELECT u.Username, COALESCE(SUM(d.Activity_Count), 0) as Activity_Count "
+        "FROM USERS u LEFT JOIN USER_ACTIVITY_DAILY d ON u.User_ID = d.User_ID "
+        "GROUP BY u.User_ID",
+        cache=True)
+
+
+def admin_popularity_report(db, ctx):
+    return db.fetch_frame(
+        "SELECT s.Title, a.Name as Artist, s.Play_Count "
+        "FROM SONGS s "
+        "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+        "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+        "ORDER BY s.Play_Count DESC LIMIT 10",
+        cache=True)
+
+
+def admin_reports(db, ctx):
+    """Both reports, fanned out the way the Reports tab runs them"""
+    return db.fetch_all({
+        "activity": lambda: admin_activity_report(db, ctx),
+        "popularity": lambda: admin_popularity_report(db, ctx),
+    })
+
+
+def play_more_comments(db, ctx):
+    """A "Load more" click: the newest page, then the page after it"""
+    song_id = ctx.song()
+    newest = db.fetch_comment_page(song_id)
+    if not newest:
+        return newest
+    return db.fetch_comment_page(song_id, after=(newest[-1]['Timestamp'], newest[-1]['Comment_ID']))
+
+
+PAGES: Dict[str, List[tuple]] = {
+    "dashboard": [
+        ("user stats", dashboard_user_stats),
+        ("recent uploads", dashboard_recent),
+        ("recommended", dashboard_recommended),
+        ("whole page", dashboard_page),
+    ],
+    "browse": [
+        ("all songs", lambda db, ctx: db.fetch_song_page()),
+        ("all songs, deep page", lambda db, ctx: db.fetch_song_page(after=ctx.page_cursor())),
+        ("search songs", lambda db, ctx: db.search_songs(ctx.search_text())),
+        ("search artists", lambda db, ctx: db.search_artists(ctx.search_text())),
+        ("artist grid", lambda db, ctx: db.fetch_grid_page("Artists", "Name", limit=25)),
+        ("genre list", lambda db, ctx: db.execute_query(
+            "SELECT DISTINCT Genre FROM SONGS WHERE Genre IS NOT NULL", cache=True)),
+        ("genre songs", lambda db, ctx: db.fetch_song_page("s.Genre = %s", (ctx.genre(),))),
+        ("artist songs", browse_artist_page),
+    ],
+    "playlists": [
+        ("user playlists", lambda db, ctx: db.fetch_user_playlists(ctx.user())),
+    ],
+    "trending": [
+        ("song details", trending_details),
+        ("artist names", trending_artists),
+    ],
+    "admin": [
+        ("users grid", lambda db, ctx: db.fetch_grid_page("Users", "Created_At", descending=True)),
+        ("songs grid", lambda db, ctx: db.fetch_grid_page("Songs", "Play_Count", descending=True)),
+        ("songs grid, filtered", lambda db, ctx: db.fetch_grid_page(
+            "Songs", "Title", filter_column="Title", filter_text=ctx.search_text())),
+        ("artists grid", lambda db, ctx: db.fetch_grid_page("Artists", "Name")),
+        ("activity report", admin_activity_report),
+        ("popularity report", admin_popularity_report),
+        ("reports tab", admin_reports),
+    ],
+    "play": [
+        ("song", lambda db, ctx: db.execute_query("SELECT * FROM SONGS WHERE Song_ID = %s", (ctx.song(),))),
+        ("song artists", lambda db, ctx: db.execute_query(
+            "SELECT a.Name FROM SONG_ARTISTS sa "
+            "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+            "WHERE sa.Song_ID = %s", (ctx.song(),))),
+        ("comment count", lambda db, ctx: db.comment_count(ctx.song())),
+        ("comments", lambda db, ctx: db.fetch_comment_page(ctx.song())),
+        ("comments, load more", play_more_comments),
+        ("song rating", lambda db, ctx: db.song_rating(ctx.song())),
+        ("my rating", lambda db, ctx: db.execute_query(
+            "SELECT Rating_Value FROM RATINGS WHERE User_ID = %s AND Song_ID = %s",
+            (ctx.user(), ctx.song()))),
+    ],
+}
+
+
+def workload(pages: List[str] = None) -> List[tuple]:
+    """(page, label, fn) for the selected pages, in page order"""
+    selected = pages or list(PAGES)
+    return [(page, label, fn) for page in selected for label, fn in PAGES[page]]
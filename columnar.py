@@ -0,0 +1,62 @@
+"""Columnar query results for pages that only show tables and charts.
+
+``DatabaseManager.fetch_frame`` reads through a tuple cursor in chunks
+(``stream_query``), and each chunk is transposed straight into one NumPy array
+per column, typed from the cursor's column metadata. No dict is built per
+row, and the arrays become the DataFrame's columns without another copy.
+"""
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from exports import Chunk
+
+INTEGER_TYPES = {"TINY", "SHORT", "LONG", "INT24", "LONGLONG", "YEAR"}
+FLOAT_TYPES = {"FLOAT", "DOUBLE", "DECIMAL", "NEWDECIMAL"}
+DATETIME_TYPES = {"DATE", "DATETIME", "TIMESTAMP"}
+
+
+def column_array(values: tuple, mysql_type: str) -> np.ndarray:
+    """One chunk of a column; NULLs become NaN/NaT, so an integer column with NULLs is float"""
+    if mysql_type in INTEGER_TYPES:
+        try:
+            return np.array(values, dtype=np.int64)
+        except TypeError:
+            return np.array(values, dtype=np.float64)
+    if mysql_type in FLOAT_TYPES:
+        return np.array(values, dtype=np.float64)
+    if mysql_type in DATETIME_TYPES:
+        return np.array(values, dtype="datetime64[us]")
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def frame_from_chunks(chunks: Iterator[Chunk]) -> pd.DataFrame:
+    """Build a DataFrame from streamed (columns, MySQL type names, rows) chunks"""
+    columns, types, parts = [], [], None
+    for columns, types, rows in chunks:
+        if parts is None:
+            parts = [[] for _ in columns]
+        if rows:
+            for part, values, mysql_type in zip(parts, zip(*rows), types):
+                part.append(column_array(values, mysql_type))
+    data = {}
+    for column, mysql_type, part in zip(columns, types, parts or []):
+        if not part:
+            data[column] = column_array((), mysql_type)
+        else:
+            # A single chunk is used as is; concatenate would copy it
+            data[column] = part[0] if len(part) == 1 else np.concatenate(part)
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+
+def format_durations(seconds) -> np.ndarray:
+    """Durations in seconds as "MM:SS" strings, minutes not wrapped at the hour; NULLs are blank"""
+    seconds = np.asarray(seconds, dtype=np.float64)
+    missing = np.isnan(seconds)
+    minutes, secs = np.divmod(np.where(missing, 0, seconds).astype(np.int64), 60)
+    text = np.char.add(np.char.add(np.char.zfill(minutes.astype(str), 2), ":"),
+                       np.char.zfill(secs.astype(str), 2))
+    return np.where(missing, "", text)
@@ -0,0 +1,1334 @@
+"""Database access shared by every page and session.
+
+The connection pool, result cache, query metrics, play-event pipeline and
+trending engine are process-wide singletons (``st.cache_resource``).
+``DatabaseManager`` wraps them for the pages, the maintenance CLI and the
+benchmarks. This module holds no UI, so importing it doesn't pull in the
+page modules or their plotting and DataFrame dependencies.
+"""
+import streamlit as st
+from mysql.connector import Error, FieldType, IntegrityError, InterfaceError, OperationalError
+import os
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv
+from backends import MySQLBackend
+from exports import export_path, write_export
+from migrations import (HALF_STAR_COLUMNS, PLAYLIST_POSITION_GAP, RATING_HALF_STARS, SONG_RATINGS_REBUILD,
+                        USER_ACTIVITY_DAILY_REBUILD, USER_STATS_REBUILD)
+from query_metrics import QueryMetrics, call_site, start_metrics_server
+from sqlite_backend import SQLiteBackend
+from trending import TrendingEngine, bucket_start
+import re
+import time
+import atexit
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from collections import Counter, OrderedDict, deque, namedtuple
+from typing import Optional, Union, List, Dict, Any
+
+# Load environment variables
+load_dotenv()
+
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_USER = os.getenv("DB_USER", "root")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "umair1122")
+DB_NAME = os.getenv("DB_NAME", "MUSIC_APP")
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", f"{DB_NAME.lower()}.sqlite3")
+
+class PoolTimeout(Error):
+    """Raised when no pooled connection frees up within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Process-wide pool of database connections shared by every Streamlit session.
+
+    Connections are checked out per query and handed back afterwards. Instead of
+    pinging the server before each use, a connection is only dropped when a query
+    on it fails or when it has sat idle longer than ``recycle`` seconds (the server
+    may have closed it by then).
+    """
+
+    def __init__(self, size: int, timeout: float, recycle: float, connect):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._connect = connect
+        self._idle = deque()  # (connection, last_released_at), most recent on the right
+        self._cond = threading.Condition()
+        self._open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.created = 0
+        self.recycled = 0
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                while self._idle:
+                    conn, released_at = self._idle.pop()
+                    if time.monotonic() - released_at > self.recycle:
+                        self._discard(conn)
+                        self.recycled += 1
+                        continue
+                    self.in_use += 1
+                    return conn
+
+                if self._open < self.size:
+                    # Reserve the slot now, open the socket outside the lock
+                    self._open += 1
+                    self.in_use += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(msg=f"No database connection available after {self.timeout}s")
+                self.waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self.in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def release(self, conn, healthy: bool = True):
+        with self._cond:
+            self.in_use -= 1
+            if healthy:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        # Caller holds the lock
+        self._open -= 1
+        try:
+            conn.close()
+        except Error:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "created": self.created,
+                "recycled": self.recycled,
+            }
+
+
+@st.cache_resource
+def get_backend():
+    """The database engine picked by DB_BACKEND: a MySQL server (default) or an embedded SQLite file"""
+    if DB_BACKEND == "sqlite":
+        return SQLiteBackend(SQLITE_PATH)
+    if DB_BACKEND != "mysql":
+        raise ValueError(f"Unknown DB_BACKEND {DB_BACKEND!r}; expected 'mysql' or 'sqlite'")
+    return MySQLBackend(DB_HOST, DB_USER, DB_PASSWORD, DB_NAME)
+
+
+@st.cache_resource
+def get_connection_pool() -> ConnectionPool:
+    """One pool per server process, reused across reruns and sessions"""
+    return ConnectionPool(
+        size=int(os.getenv("DB_POOL_SIZE", "10")),
+        timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        recycle=float(os.getenv("DB_POOL_RECYCLE", "300")),
+        connect=get_backend().connect,
+    )
+
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+`?(\w+)`?", re.IGNORECASE)
+_WRITE_PATTERN = re.compile(r"^\s*(?:INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace so differently formatted copies of a query share a key"""
+    return " ".join(query.split())
+
+
+def referenced_tables(query: str) -> frozenset:
+    return frozenset(name.upper() for name in _TABLE_PATTERN.findall(query))
+
+
+class QueryCache:
+    """Bounded LRU cache of read results, tagged by the tables each query touches.
+
+    Writes bump a per-table generation counter and drop every entry tagged with
+    that table. A read only stores its result if none of its tables changed while
+    it was running, so a slow read can't reinsert data a concurrent write replaced.
+    """
+
+    def __init__(self, max_entries: int, default_ttl: float):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, tables, rows)
+        self._by_table = {}  # table -> set of keys
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query: str, params) -> tuple:
+        return normalize_sql(query), tuple(params or ())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, tables, rows = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(rows)
+
+    def generation(self, tables) -> tuple:
+        with self._lock:
+            return tuple(self._generations.get(t, 0) for t in sorted(tables))
+
+    def put(self, key, tables, rows, ttl: float = None, generation: tuple = None):
+        with self._lock:
+            if generation is not None and generation != tuple(self._generations.get(t, 0) for t in sorted(tables)):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + (ttl or self.default_ttl), tables, list(rows))
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                for key in self._by_table.pop(table, set()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+    def _remove(self, key):
+        # Caller holds the lock
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+@st.cache_resource
+def get_query_cache() -> QueryCache:
+    """Result cache shared by every session in this server process"""
+    return QueryCache(
+        max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "512")),
+        default_ttl=float(os.getenv("QUERY_CACHE_TTL", "60")),
+    )
+
+
+# InnoDB skips tokens shorter than innodb_ft_min_token_size (3 by default)
+SEARCH_MIN_TOKEN_LENGTH = 3
+SEARCH_POPULARITY_WEIGHT = float(os.getenv("SEARCH_POPULARITY_WEIGHT", "0.25"))
+
+COMMENTS_PAGE_SIZE = int(os.getenv("COMMENTS_PAGE_SIZE", "20"))
+# Newest page of a song's comments; posting a comment invalidates it sooner
+COMMENTS_CACHE_TTL = float(os.getenv("COMMENTS_CACHE_TTL", "10"))
+
+# Rows per fetchmany when building a DataFrame column by column
+FRAME_CHUNK_SIZE = int(os.getenv("FRAME_CHUNK_SIZE", "5000"))
+
+# Raw USER_ACTIVITY rows older than this are compacted into the daily rollups only
+ACTIVITY_RETENTION_DAYS = int(os.getenv("ACTIVITY_RETENTION_DAYS", "90"))
+# Rows deleted per transaction when compacting, so locks stay short
+ACTIVITY_COMPACT_BATCH = int(os.getenv("ACTIVITY_COMPACT_BATCH", "5000"))
+# Raw activity columns as archived, with MySQL type names for the Parquet schema
+ACTIVITY_ARCHIVE_COLUMNS = [("Activity_ID", "LONG"), ("User_ID", "LONG"), ("Activity_Type", "VAR_STRING"),
+                            ("Song_ID", "LONG"), ("Activity_Details", "BLOB"), ("Timestamp", "TIMESTAMP")]
+
+# Seconds a page waits for a fanned-out read before rendering without it
+FANOUT_TIMEOUT = float(os.getenv("QUERY_FANOUT_TIMEOUT", "5"))
+
+# Helpers shared by several pages; their queries are attributed to the page calling them
+PAGE_HELPER_MODULES = ("views.common",)
+
+# Set on fan-out worker threads: the page's call site for the metrics, and
+# where database errors go until the page's thread can show them
+_fanout = threading.local()
+
+
+def report_error(message: str):
+    """``st.error``, or held for the page when raised on a fan-out worker thread"""
+    errors = getattr(_fanout, "errors", None)
+    if errors is not None:
+        errors.append(message)
+    else:
+        st.error(message)
+
+
+@st.cache_resource
+def get_query_metrics() -> QueryMetrics:
+    """Query latency histograms and slow-query log shared by every session"""
+    metrics = QueryMetrics(
+        slow_threshold=float(os.getenv("SLOW_QUERY_MS", "200")) / 1000,
+        slow_log_size=int(os.getenv("SLOW_QUERY_LOG_SIZE", "200")),
+    )
+    metrics.add_gauges("pool", get_connection_pool().stats)
+    metrics.add_gauges("cache", get_query_cache().stats)
+    return metrics
+
+
+@st.cache_resource
+def get_metrics_server():
+    """Serve /metrics once per app process.
+
+    Only the Streamlit app calls this, so maintenance commands, the importer
+    and the benchmark don't try to bind METRICS_PORT.
+    """
+    if os.getenv("METRICS_AUTOSTART", "1") != "1":
+        return None
+    return start_metrics_server(get_query_metrics(), os.getenv("METRICS_HOST", "0.0.0.0"),
+                                int(os.getenv("METRICS_PORT", "8503")))
+
+
+@st.cache_resource
+def get_query_executor() -> ThreadPoolExecutor:
+    """Threads that run one page's independent reads side by side (``DatabaseManager.fetch_all``).
+
+    Shared by every session, so fan-out never holds more than this many of the
+    pool's connections at once. QUERY_FANOUT_WORKERS=0 runs the reads in turn.
+    """
+    workers = int(os.getenv("QUERY_FANOUT_WORKERS", "4"))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query-fanout") if workers > 0 else None
+
+
+def fulltext_terms(text: str) -> str:
+    """Turn free text into a BOOLEAN MODE query that prefix-matches every token"""
+    tokens = [t for t in re.findall(r"\w+", text.lower()) if len(t) >= SEARCH_MIN_TOKEN_LENGTH]
+    return " ".join(f"{t}*" for t in dict.fromkeys(tokens))
+
+
+def ensure_schema() -> bool:
+    """Apply pending schema migrations (see migrations.py) once per process.
+
+    Only success is cached; after a failure (say the server was briefly
+    unreachable) the next DatabaseManager tries again.
+    """
+    try:
+        return migrate_schema()
+    except (Error, RuntimeError) as e:
+        print(f"⚠️ Could not upgrade database schema: {e}")
+        return False
+
+
+@st.cache_resource
+def migrate_schema() -> bool:
+    # Raises on failure, which st.cache_resource doesn't cache
+    pool = get_connection_pool()
+    conn = pool.acquire()
+    try:
+        for migration in get_backend().migrate(conn):
+            print(f"✅ Applied schema migration {migration.version}: {migration.name}")
+        return True
+    finally:
+        pool.release(conn)
+
+
+# Admin grids: columns shown, columns that may be sorted on (NOT NULL, so keyset
+# cursors stay well defined) and columns the text filter may search
+ADMIN_GRIDS = {
+    "Users": {
+        "table": "USERS",
+        "key": "User_ID",
+        "columns": ["User_ID", "Username", "Email", "Subscription_Type", "Created_At"],
+        "sortable": ["User_ID", "Username", "Created_At"],
+        "filterable": ["Username", "Email", "Subscription_Type"],
+    },
+    "Songs": {
+        "table": "SONGS",
+        "key": "Song_ID",
+        "columns": ["Song_ID", "Title", "Album", "Genre", "Duration", "Play_Count", "User_ID", "Upload_Date", "File_Path"],
+        "sortable": ["Song_ID", "Title", "Play_Count", "Upload_Date"],
+        "filterable": ["Title", "Album", "Genre"],
+    },
+    "Artists": {
+        "table": "ARTISTS",
+        "key": "Artist_ID",
+        "columns": ["Artist_ID", "Name", "Bio", "Profile_Picture"],
+        "sortable": ["Artist_ID", "Name"],
+        "filterable": ["Name"],
+    },
+}
+
+
+class DatabaseManager:
+    def __init__(self):
+        self.backend = get_backend()
+        self.pool = get_connection_pool()
+        self.cache = get_query_cache()
+        self.metrics = get_query_metrics()
+        self.last_insert_id = None
+        self.last_row_counts = []
+        self.connect()
+        ensure_schema()
+        
+    def connect(self):
+        # Warm the pool once so a missing database is detected up front
+        try:
+            conn = self.pool.acquire()
+            self.pool.release(conn)
+        except PoolTimeout:
+            pass
+        except Error as e:
+            st.error(f"❌ Error connecting to the database: {e}")
+            if "Unknown database" in str(e):
+                self.create_database()
+            else:
+                st.stop()
+
+    def create_database(self):
+        try:
+            # Create the database, then every table and index by running the migrations from scratch
+            self.backend.create_database()
+            st.success("Database and all tables created successfully! Please restart the app.")
+            st.stop()
+        except Exception as e:
+            st.error(f"Failed to create database: {e}")
+            st.stop()
+
+    def execute_query(self, query: str, params=None, fetch: bool = True,
+                      cache: Union[bool, float] = False) -> Union[List[Dict], bool]:
+        """Execute a database query on a pooled connection with proper error handling.
+
+        Pass ``cache=True`` (or a TTL in seconds) to serve repeated reads from the
+        shared result cache. Writes invalidate cached reads of the tables they touch.
+        """
+        is_read = fetch and query.strip().upper().startswith(('SELECT', 'SHOW', 'DESCRIBE'))
+        cache_key = tables = generation = None
+        if cache and is_read:
+            cache_key = QueryCache.make_key(query, params)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+            tables = referenced_tables(query)
+            generation = self.cache.generation(tables)
+
+        try:
+            conn = self.pool.acquire()
+        except Error as e:
+            report_error(f"Database error: {e}")
+            return False
+
+        healthy = True
+        cursor = None
+        rows, error = 0, None
+        started = time.perf_counter()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(query, params or ())
+            
+            if is_read:
+                result = cursor.fetchall() or []
+                rows = len(result)
+                if cache_key is not None:
+                    ttl = None if cache is True else float(cache)
+                    self.cache.put(cache_key, tables, result, ttl=ttl, generation=generation)
+                return result
+            
+            conn.commit()
+            rows = max(cursor.rowcount, 0)
+            self.last_insert_id = cursor.lastrowid
+            if _WRITE_PATTERN.match(query):
+                self.cache.invalidate(referenced_tables(query))
+            return True
+        except (OperationalError, InterfaceError) as e:
+            # The connection itself is broken; don't hand it back to the pool
+            healthy = False
+            error = e
+            report_error(f"Database error: {e}")
+            return False
+        except Error as e:
+            error = e
+            report_error(f"Database error: {e}")
+            return False
+        finally:
+            self.record_query(query, params, time.perf_counter() - started, rows, error)
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Error:
+                    healthy = False
+            self.pool.release(conn, healthy=healthy)
+
+    def fetch_frame(self, query: str, params=None, cache: Union[bool, float] = False,
+                    chunk_size: int = FRAME_CHUNK_SIZE):
+        """Run a read and return the result as a pandas DataFrame (False on error).
+
+        For pages that only show a table or chart: rows come off a tuple cursor
+        in chunks and go straight into per-column arrays (see ``columnar``),
+        with no dict per row. ``cache`` works as for ``execute_query``; every
+        caller gets its own copy of a cached frame.
+        """
+        # Imported on first use so NumPy and pandas stay off the startup path
+        from columnar import frame_from_chunks
+
+        cache_key = tables = generation = None
+        if cache:
+            # Tagged so the frame and the dict rows of one query are separate entries
+            cache_key = ("frame",) + QueryCache.make_key(query, params)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached[0].copy()
+            tables = referenced_tables(query)
+            generation = self.cache.generation(tables)
+
+        try:
+            frame = frame_from_chunks(
+                self.stream_query(query, params, chunk_size, site=self.call_site())
+            )
+        except Error as e:
+            report_error(f"Database error: {e}")
+            return False
+        if cache_key is not None:
+            ttl = None if cache is True else float(cache)
+            self.cache.put(cache_key, tables, [frame], ttl=ttl, generation=generation)
+            return frame.copy()
+        return frame
+
+    def fetch_all(self, reads: Dict[str, Any], timeout: float = FANOUT_TIMEOUT,
+                  timeouts: Dict[str, float] = None) -> Dict[str, Any]:
+        """Run independent reads at the same time and return their results by name.
+
+        Each value in ``reads`` is a no-argument callable, such as a lambda
+        around ``execute_query`` or ``fetch_frame``. They run on the fan-out
+        threads over pooled connections, so the page waits for the slowest
+        read rather than for all of them in turn. A read still running after
+        ``timeout`` seconds (or its entry in ``timeouts``) comes back as None
+        and the page renders without it. It finishes in the background, and a
+        cached read is then served from the cache on the next run.
+        """
+        executor = get_query_executor()
+        if executor is None:
+            return {name: read() for name, read in reads.items()}
+
+        site = self.call_site()
+
+        def run(read):
+            _fanout.site, _fanout.errors = site, []
+            try:
+                return read(), _fanout.errors
+            finally:
+                _fanout.site = _fanout.errors = None
+
+        started = time.monotonic()
+        futures = {name: executor.submit(run, read) for name, read in reads.items()}
+        results = {}
+        for name, future in futures.items():
+            deadline = started + (timeouts or {}).get(name, timeout)
+            try:
+                results[name], errors = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeout:
+                results[name], errors = None, []
+            for message in errors:
+                st.error(message)
+        return results
+
+    def call_site(self) -> str:
+        """The page function a query is run for, also from a fan-out worker thread"""
+        return getattr(_fanout, "site", None) or call_site((DatabaseManager,), PAGE_HELPER_MODULES)
+
+    def record_query(self, query: str, params, seconds: float, rows: int = 0,
+                     error: Exception = None, site: str = None):
+        """Add one statement to the latency metrics, tagged with the app method that ran it"""
+        self.metrics.record(query, seconds, rows, error, site or self.call_site(), params)
+
+    def execute_transaction(self, statements: List[tuple]) -> bool:
+        """Run several write statements on one connection and commit them together.
+
+        Each statement is ``(query, params)``; a list of param tuples is sent with
+        ``executemany``. Cached reads of every written table are invalidated.
+        After a commit, ``last_row_counts`` holds each statement's affected rows.
+        """
+        try:
+            conn = self.pool.acquire()
+        except Error as e:
+            report_error(f"Database error: {e}")
+            return False
+
+        healthy = True
+        cursor = None
+        row_counts = []
+        try:
+            cursor = conn.cursor()
+            for query, params in statements:
+                started = time.perf_counter()
+                try:
+                    if isinstance(params, list):
+                        cursor.executemany(query, params)
+                    else:
+                        cursor.execute(query, params or ())
+                except Error as e:
+                    self.record_query(query, params, time.perf_counter() - started, error=e)
+                    raise
+                row_counts.append(max(cursor.rowcount, 0))
+                self.record_query(query, params, time.perf_counter() - started, row_counts[-1])
+            conn.commit()
+            self.last_insert_id = cursor.lastrowid
+            self.last_row_counts = row_counts
+        except Error as e:
+            healthy = not isinstance(e, (OperationalError, InterfaceError))
+            try:
+                conn.rollback()
+            except Error:
+                healthy = False
+            report_error(f"Database error: {e}")
+            return False
+        finally:
+            if cursor is not None:
+                cursor.close()
+            self.pool.release(conn, healthy=healthy)
+
+        self.cache.invalidate(frozenset().union(*(referenced_tables(q) for q, _ in statements)))
+        return True
+
+    def rebuild_user_stats(self) -> bool:
+        """Recompute USER_STATS from PLAYLISTS and SONGS"""
+        return self.execute_query(USER_STATS_REBUILD, fetch=False)
+
+    def rebuild_song_ratings(self) -> bool:
+        """Recompute SONG_RATINGS from RATINGS"""
+        return self.execute_transaction([
+            ("DELETE FROM SONG_RATINGS", None),
+            (SONG_RATINGS_REBUILD, None),
+        ])
+
+    def rebuild_activity_rollups(self, days: int = None) -> bool:
+        """Recompute USER_ACTIVITY_DAILY from raw USER_ACTIVITY for the last ``days`` days.
+
+        Without ``days``, every day that still has raw rows is recomputed. Days
+        before the oldest raw row were compacted away and are left as they are.
+        """
+        conditions, params = ["Activity_Date >= (SELECT DATE(MIN(Timestamp)) FROM USER_ACTIVITY)"], ()
+        where = ""
+        if days is not None:
+            since = date.today() - timedelta(days=days)
+            conditions.append("Activity_Date >= %s")
+            params = (since,)
+            where = "WHERE Timestamp >= %s "
+        return self.execute_transaction([
+            (f"DELETE FROM USER_ACTIVITY_DAILY WHERE {' AND '.join(conditions)}", params),
+            (USER_ACTIVITY_DAILY_REBUILD.format(where=where), params),
+        ])
+
+    def compact_activity(self, keep_days: int = ACTIVITY_RETENTION_DAYS, batch_size: int = ACTIVITY_COMPACT_BATCH,
+                         archive_format: str = None) -> tuple:
+        """Delete raw USER_ACTIVITY rows from before the last ``keep_days`` days.
+
+        Rows go oldest first, ``batch_size`` per statement, so each delete holds
+        its locks only briefly and the play pipeline keeps writing. Their counts
+        are already in USER_ACTIVITY_DAILY. With ``archive_format`` (an export
+        format) every batch is written to an export file before it is deleted.
+        Returns (rows deleted, archive path or None).
+        """
+        cutoff = datetime.combine(date.today() - timedelta(days=keep_days), datetime.min.time())
+        columns = [column for column, _ in ACTIVITY_ARCHIVE_COLUMNS]
+        types = [mysql_type for _, mysql_type in ACTIVITY_ARCHIVE_COLUMNS]
+        deleted = 0
+
+        def batches():
+            nonlocal deleted
+            while True:
+                rows = self.execute_query(
+                    f"SELECT {', '.join(columns)} FROM USER_ACTIVITY WHERE Timestamp < %s "
+                    "ORDER BY Timestamp LIMIT %s",
+                    (cutoff, batch_size)
+                )
+                if not isinstance(rows, list):
+                    return
+                # Always one chunk, so an archive gets its header even when empty
+                yield columns, types, [tuple(row[column] for column in columns) for row in rows]
+                if not rows:
+                    return
+                ids = tuple(row['Activity_ID'] for row in rows)
+                if not self.execute_query(
+                    f"DELETE FROM USER_ACTIVITY WHERE Activity_ID IN ({', '.join(['%s'] * len(ids))})",
+                    ids,
+                    fetch=False
+                ):
+                    return
+                deleted += len(ids)
+                if len(rows) < batch_size:
+                    return
+
+        if archive_format is None:
+            for _ in batches():
+                pass
+            return deleted, None
+        path = export_path("user_activity", archive_format)
+        write_export(batches(), path, archive_format)
+        return deleted, path
+
+    def rate_song(self, user_id: int, song_id: int, rating: float) -> bool:
+        """Set a user's rating for a song and move the song's aggregate with it.
+
+        The rating itself is one upsert. In the same transaction the previous
+        rating, if any, is taken out of SONG_RATINGS and the new one added, so
+        the count, sum and half-star histogram never need a scan of RATINGS.
+        """
+        half_stars = round(rating * 2)
+        if not 0 <= half_stars <= RATING_HALF_STARS:
+            raise ValueError(f"Rating must be between 0 and {RATING_HALF_STARS / 2}: {rating}")
+        bucket = HALF_STAR_COLUMNS[half_stars]
+        return self.execute_transaction([
+            ("UPDATE SONG_RATINGS sr JOIN RATINGS r ON r.Song_ID = sr.Song_ID "
+             "SET sr.Rating_Count = sr.Rating_Count - 1, sr.Rating_Sum = sr.Rating_Sum - r.Rating_Value, "
+             + ", ".join(f"sr.{column} = sr.{column} - (ROUND(r.Rating_Value * 2) = {n})"
+                         for n, column in enumerate(HALF_STAR_COLUMNS)) + " "
+             "WHERE r.User_ID = %s AND r.Song_ID = %s", (user_id, song_id)),
+            ("INSERT INTO RATINGS (Rating_Value, User_ID, Song_ID, Rated_At) VALUES (%s, %s, %s, NOW()) "
+             "ON DUPLICATE KEY UPDATE Rating_Value = VALUES(Rating_Value), Rated_At = VALUES(Rated_At)",
+             (half_stars / 2, user_id, song_id)),
+            (f"INSERT INTO SONG_RATINGS (Song_ID, Rating_Count, Rating_Sum, {bucket}) VALUES (%s, 1, %s, 1) "
+             "ON DUPLICATE KEY UPDATE Rating_Count = Rating_Count + 1, Rating_Sum = Rating_Sum + VALUES(Rating_Sum), "
+             f"{bucket} = {bucket} + 1", (song_id, half_stars / 2)),
+        ])
+
+    def song_rating(self, song_id: int) -> Dict:
+        """Average, count and half-star histogram (``{0.5: n, ...}``) of a song's ratings"""
+        rows = self.execute_query(
+            f"SELECT Rating_Count, Rating_Sum, {', '.join(HALF_STAR_COLUMNS)} FROM SONG_RATINGS WHERE Song_ID = %s",
+            (song_id,),
+            cache=True
+        )
+        row = rows[0] if isinstance(rows, list) and rows else {}
+        count = row.get('Rating_Count') or 0
+        return {
+            'Ratings': count,
+            'Avg_Rating': round(row['Rating_Sum'] / count, 1) if count else None,
+            'Histogram': {n / 2: row.get(column, 0) for n, column in enumerate(HALF_STAR_COLUMNS)},
+        }
+
+    def stream_query(self, query: str, params=None, chunk_size: int = 5000, site: str = None):
+        """Yield (columns, MySQL type names, rows) chunks from an unbuffered cursor.
+
+        Rows are pulled from the server as they are consumed, so the full result
+        never sits in memory. Always yields at least one (possibly empty) chunk.
+        A connection abandoned mid-result is discarded rather than pooled.
+        """
+        conn = self.pool.acquire()
+        exhausted = False
+        cursor = None
+        streamed, error = 0, None
+        started = time.perf_counter()
+        try:
+            cursor = conn.cursor(buffered=False)
+            cursor.execute(query, params or ())
+            columns = [d[0] for d in cursor.description]
+            types = [FieldType.get_info(d[1]) for d in cursor.description]
+            first = True
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows and not first:
+                    break
+                first = False
+                streamed += len(rows)
+                yield columns, types, rows
+                if len(rows) < chunk_size:
+                    break
+            exhausted = True
+        except Error as e:
+            error = e
+            raise
+        finally:
+            # Includes time the consumer spent between chunks
+            self.record_query(query, params, time.perf_counter() - started, streamed, error, site or "stream_query")
+            if cursor is not None and exhausted:
+                cursor.close()
+            self.pool.release(conn, healthy=exhausted)
+
+    def grid_query(self, grid: str, sort: str, descending: bool = False, filter_column: str = None,
+                   filter_text: str = "", after: tuple = None, limit: int = None) -> tuple:
+        """Build the (query, params) for one admin grid page, or the whole filtered table"""
+        spec = ADMIN_GRIDS[grid]
+        key = spec['key']
+        if sort not in spec['sortable'] or (filter_column and filter_column not in spec['filterable']):
+            raise ValueError(f"Unsupported sort or filter column for {grid}")
+
+        conditions, params = [], []
+        if filter_column and filter_text:
+            conditions.append(f"{filter_column} LIKE %s")
+            params.append(f"%{filter_text}%")
+        op = "<" if descending else ">"
+        if after is not None:
+            conditions.append(f"({sort} {op} %s OR ({sort} = %s AND {key} {op} %s))")
+            params += [after[0], after[0], after[1]]
+        order = "DESC" if descending else "ASC"
+
+        query = f"SELECT {', '.join(spec['columns'])} FROM {spec['table']}"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        query += f" ORDER BY {sort} {order}, {key} {order}"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, tuple(params)
+
+    def fetch_grid_page(self, grid: str, sort: str, descending: bool = False, filter_column: str = None,
+                        filter_text: str = "", after: tuple = None, limit: int = 50) -> Union[List[Dict], bool]:
+        query, params = self.grid_query(grid, sort, descending, filter_column, filter_text, after, limit)
+        return self.execute_query(query, params, cache=True)
+
+    def export_grid(self, grid: str, fmt: str, filter_column: str = None, filter_text: str = "") -> tuple:
+        """Stream a filtered admin table to an export file; returns (path, rows written)"""
+        query, params = self.grid_query(grid, ADMIN_GRIDS[grid]['key'], False, filter_column, filter_text)
+        path = export_path(grid, fmt)
+        rows = self.stream_query(query, params, site=self.call_site())
+        return path, write_export(rows, path, fmt)
+
+    def fetch_user_playlists(self, user_id: int) -> Union[List[Dict], bool]:
+        """Load a user's playlists and their songs with one query.
+
+        Returns one dict per playlist with its songs (Song_ID, Title, Artist,
+        Position) under ``Songs``, in playlist order.
+        """
+        rows = self.execute_query(
+            "SELECT p.Playlist_ID, p.Name, p.User_ID, ps.Position, s.Song_ID, s.Title, "
+            "GROUP_CONCAT(a.Name SEPARATOR ', ') as Artist "
+            "FROM PLAYLISTS p "
+            "LEFT JOIN PLAYLIST_SONGS ps ON p.Playlist_ID = ps.Playlist_ID "
+            "LEFT JOIN SONGS s ON ps.Song_ID = s.Song_ID "
+            "LEFT JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+            "LEFT JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+            "WHERE p.User_ID = %s "
+            "GROUP BY p.Playlist_ID, p.Name, p.User_ID, ps.Position, s.Song_ID, s.Title "
+            "ORDER BY p.Playlist_ID, ps.Position, s.Song_ID",
+            (user_id,),
+            cache=True
+        )
+        if not isinstance(rows, list):
+            return rows
+
+        playlists = OrderedDict()
+        for row in rows:
+            playlist = playlists.setdefault(row['Playlist_ID'], {
+                'Playlist_ID': row['Playlist_ID'],
+                'Name': row['Name'],
+                'User_ID': row['User_ID'],
+                'Songs': [],
+            })
+            if row['Song_ID'] is not None:
+                playlist['Songs'].append({'Song_ID': row['Song_ID'], 'Title': row['Title'],
+                                          'Artist': row['Artist'], 'Position': row['Position']})
+        return list(playlists.values())
+
+    def add_to_playlist(self, playlist_id: int, song_ids) -> Optional[int]:
+        """Append songs to the end of a playlist in one transaction.
+
+        Each song's position is read from the playlist's current last one by
+        the insert itself, so concurrent appends can't pick the same position.
+        Songs already in the playlist keep their place. Returns how many songs
+        were added, or None if the insert failed (e.g. a song doesn't exist).
+        """
+        song_ids = list(dict.fromkeys(song_ids))
+        if not song_ids:
+            return 0
+        if not self.execute_transaction([
+            ("INSERT INTO PLAYLIST_SONGS (Playlist_ID, Song_ID, Position, Added_At) "
+             "SELECT %s, %s, last.Position, NOW() "
+             f"FROM (SELECT COALESCE(MAX(Position), 0) + {PLAYLIST_POSITION_GAP} AS Position "
+             "      FROM PLAYLIST_SONGS WHERE Playlist_ID = %s) last "
+             "WHERE NOT EXISTS (SELECT 1 FROM PLAYLIST_SONGS WHERE Playlist_ID = %s AND Song_ID = %s)",
+             [(playlist_id, song_id, playlist_id, playlist_id, song_id) for song_id in song_ids]),
+        ]):
+            return None
+        return self.last_row_counts[0]
+
+    def remove_from_playlist(self, playlist_id: int, song_ids) -> bool:
+        song_ids = tuple(dict.fromkeys(song_ids))
+        if not song_ids:
+            return True
+        return self.execute_query(
+            f"DELETE FROM PLAYLIST_SONGS WHERE Playlist_ID = %s AND Song_ID IN ({', '.join(['%s'] * len(song_ids))})",
+            (playlist_id,) + song_ids,
+            fetch=False
+        )
+
+    def move_playlist_song(self, playlist_id: int, song_id: int, index: int) -> bool:
+        """Move a song to ``index`` (0-based) in its playlist.
+
+        The song takes the midpoint of its new neighbours' positions, so only
+        its own row changes. Once the neighbours are too close to split, the
+        whole playlist is renumbered in one transaction.
+        """
+        rows = self.execute_query(
+            "SELECT Song_ID, Position FROM PLAYLIST_SONGS WHERE Playlist_ID = %s ORDER BY Position, Song_ID",
+            (playlist_id,)
+        )
+        if not isinstance(rows, list):
+            return False
+        order = [row for row in rows if row['Song_ID'] != song_id]
+        if len(order) == len(rows):
+            return False
+        index = max(0, min(index, len(order)))
+        before = order[index - 1]['Position'] if index > 0 else None
+        after = order[index]['Position'] if index < len(order) else None
+
+        if before is None and after is None:
+            return True
+        if before is None:
+            position = after - PLAYLIST_POSITION_GAP
+        elif after is None:
+            position = before + PLAYLIST_POSITION_GAP
+        elif before < (before + after) / 2 < after:
+            position = (before + after) / 2
+        else:
+            # Out of float precision between the two
+            song_ids = [row['Song_ID'] for row in order]
+            song_ids.insert(index, song_id)
+            return self.renumber_playlist(playlist_id, song_ids)
+        return self.execute_query(
+            "UPDATE PLAYLIST_SONGS SET Position = %s WHERE Playlist_ID = %s AND Song_ID = %s",
+            (position, playlist_id, song_id),
+            fetch=False
+        )
+
+    def renumber_playlist(self, playlist_id: int, song_ids: List[int]) -> bool:
+        """Space a playlist's songs evenly again, in the given order"""
+        return self.execute_transaction([
+            ("UPDATE PLAYLIST_SONGS SET Position = %s WHERE Playlist_ID = %s AND Song_ID = %s",
+             [(PLAYLIST_POSITION_GAP * n, playlist_id, song_id) for n, song_id in enumerate(song_ids, 1)]),
+        ])
+
+    def song_page_query(self, where: str = "", params=(), after: tuple = None, limit: int = 50) -> tuple:
+        """Build the (query, params) for one page of songs ordered by (Play_Count, Song_ID) descending.
+
+        ``where`` filters SONGS (aliased ``s``); ``after`` is the
+        (Play_Count, Song_ID) of the last row on the previous page. Songs are
+        paged first and only the page is joined to its artists.
+        """
+        conditions = ["EXISTS (SELECT 1 FROM SONG_ARTISTS x WHERE x.Song_ID = s.Song_ID)"]
+        page_params = list(params or ())
+        if where:
+            conditions.append(f"({where})")
+        if after is not None:
+            conditions.append("(s.Play_Count < %s OR (s.Play_Count = %s AND s.Song_ID < %s))")
+            page_params += [after[0], after[0], after[1]]
+        page_params.append(limit)
+
+        query = (
+            "SELECT p.Song_ID, p.Title, GROUP_CONCAT(a.Name SEPARATOR ', ') as Artists, "
+            "p.Genre, p.Duration, p.Play_Count, "
+            "ROUND(r.Rating_Sum / NULLIF(r.Rating_Count, 0), 1) AS Avg_Rating, "
+            "COALESCE(r.Rating_Count, 0) AS Ratings "
+            "FROM (SELECT s.Song_ID, s.Title, s.Genre, s.Duration, s.Play_Count "
+            "      FROM SONGS s "
+            f"      WHERE {' AND '.join(conditions)} "
+            "      ORDER BY s.Play_Count DESC, s.Song_ID DESC LIMIT %s) p "
+            "JOIN SONG_ARTISTS sa ON p.Song_ID = sa.Song_ID "
+            "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+            "LEFT JOIN SONG_RATINGS r ON r.Song_ID = p.Song_ID "
+            "GROUP BY p.Song_ID, p.Title, p.Genre, p.Duration, p.Play_Count, r.Rating_Sum, r.Rating_Count "
+            "ORDER BY p.Play_Count DESC, p.Song_ID DESC"
+        )
+        return query, tuple(page_params)
+
+    def fetch_song_page(self, where: str = "", params=(), after: tuple = None,
+                        limit: int = 50) -> Union[List[Dict], bool]:
+        query, page_params = self.song_page_query(where, params, after, limit)
+        return self.execute_query(query, page_params, cache=True)
+
+    def fetch_comment_page(self, song_id: int, after: tuple = None,
+                           limit: int = COMMENTS_PAGE_SIZE) -> Union[List[Dict], bool]:
+        """One page of a song's comments, newest first, keyset-paginated on (Timestamp, Comment_ID).
+
+        ``after`` is the (Timestamp, Comment_ID) of the last comment already
+        shown. Only the newest page is cached; older pages are read on demand.
+        """
+        conditions, params = ["c.Song_ID = %s"], [song_id]
+        if after is not None:
+            conditions.append("(c.Timestamp < %s OR (c.Timestamp = %s AND c.Comment_ID < %s))")
+            params += [after[0], after[0], after[1]]
+        params.append(limit)
+        return self.execute_query(
+            "SELECT c.Comment_ID, c.Comment_Text, u.Username, c.Timestamp "
+            "FROM COMMENTS c JOIN USERS u ON c.User_ID = u.User_ID "
+            f"WHERE {' AND '.join(conditions)} "
+            "ORDER BY c.Timestamp DESC, c.Comment_ID DESC LIMIT %s",
+            tuple(params),
+            cache=COMMENTS_CACHE_TTL if after is None else False
+        )
+
+    def comment_count(self, song_id: int) -> int:
+        rows = self.execute_query(
+            "SELECT COUNT(*) AS Comments FROM COMMENTS WHERE Song_ID = %s",
+            (song_id,),
+            cache=True
+        )
+        return rows[0]['Comments'] if isinstance(rows, list) and rows else 0
+
+    def search_songs(self, text: str, limit: int = 50) -> Union[List[Dict], bool]:
+        """Rank songs by full-text relevance over title, album, genre and artist name.
+
+        Relevance is scaled by log play count so popular matches float up. Queries
+        with no indexable token fall back to a title prefix match, and engines
+        without full-text indexes to a substring match in popularity order.
+        """
+        if not self.backend.fulltext:
+            pattern = f"%{text.strip()}%"
+            return self.fetch_song_page(
+                "s.Title LIKE %s OR s.Album LIKE %s OR s.Genre LIKE %s OR EXISTS ("
+                "SELECT 1 FROM SONG_ARTISTS x JOIN ARTISTS ar ON x.Artist_ID = ar.Artist_ID "
+                "WHERE x.Song_ID = s.Song_ID AND ar.Name LIKE %s)",
+                (pattern,) * 4, limit=limit)
+        terms = fulltext_terms(text)
+        if not terms:
+            return self.fetch_song_page("s.Title LIKE %s", (f"{text.strip()}%",), limit=limit)
+
+        return self.execute_query(
+            "SELECT p.Song_ID, p.Title, GROUP_CONCAT(a.Name SEPARATOR ', ') as Artists, "
+            "p.Genre, p.Duration, p.Play_Count, "
+            "ROUND(r.Rating_Sum / NULLIF(r.Rating_Count, 0), 1) AS Avg_Rating, "
+            "COALESCE(r.Rating_Count, 0) AS Ratings "
+            "FROM (SELECT s.Song_ID, s.Title, s.Genre, s.Duration, s.Play_Count, "
+            "             m.Relevance * (1 + %s * LOG10(1 + s.Play_Count)) AS Score "
+            "      FROM (SELECT Song_ID, SUM(Relevance) AS Relevance "
+            "            FROM (SELECT Song_ID, MATCH(Title, Album, Genre) AGAINST (%s IN BOOLEAN MODE) AS Relevance "
+            "                  FROM SONGS "
+            "                  WHERE MATCH(Title, Album, Genre) AGAINST (%s IN BOOLEAN MODE) "
+            "                  UNION ALL "
+            "                  SELECT sa.Song_ID, MATCH(ar.Name) AGAINST (%s IN BOOLEAN MODE) "
+            "                  FROM ARTISTS ar JOIN SONG_ARTISTS sa ON ar.Artist_ID = sa.Artist_ID "
+            "                  WHERE MATCH(ar.Name) AGAINST (%s IN BOOLEAN MODE)) hits "
+            "            GROUP BY Song_ID) m "
+            "      JOIN SONGS s ON s.Song_ID = m.Song_ID "
+            "      ORDER BY Score DESC, s.Song_ID DESC LIMIT %s) p "
+            "JOIN SONG_ARTISTS sa ON p.Song_ID = sa.Song_ID "
+            "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+            "LEFT JOIN SONG_RATINGS r ON r.Song_ID = p.Song_ID "
+            "GROUP BY p.Song_ID, p.Title, p.Genre, p.Duration, p.Play_Count, p.Score, r.Rating_Sum, r.Rating_Count "
+            "ORDER BY p.Score DESC, p.Song_ID DESC",
+            (SEARCH_POPULARITY_WEIGHT, terms, terms, terms, terms, limit),
+            cache=True
+        )
+
+    def search_artists(self, text: str, limit: int = 8) -> Union[List[Dict], bool]:
+        terms = fulltext_terms(text)
+        if not terms or not self.backend.fulltext:
+            pattern = f"{text.strip()}%" if self.backend.fulltext else f"%{text.strip()}%"
+            return self.execute_query(
+                "SELECT Artist_ID, Name FROM ARTISTS WHERE Name LIKE %s ORDER BY Name LIMIT %s",
+                (pattern, limit),
+                cache=True
+            )
+        return self.execute_query(
+            "SELECT Artist_ID, Name FROM ARTISTS "
+            "WHERE MATCH(Name) AGAINST (%s IN BOOLEAN MODE) "
+            "ORDER BY MATCH(Name) AGAINST (%s IN BOOLEAN MODE) DESC LIMIT %s",
+            (terms, terms, limit),
+            cache=True
+        )
+
+    def close(self):
+        # Connections belong to the shared pool and outlive this session
+        self.last_insert_id = None
+
+PlayEvent = namedtuple("PlayEvent", ["user_id", "song_id", "played_at", "recorded_at"])
+
+_STOP = object()
+
+
+class PlayEventPipeline:
+    """Moves play bookkeeping off the render path.
+
+    ``play_song`` only enqueues a PlayEvent. A background worker drains the
+    queue in batches, coalesces per-song increments and writes each batch in one
+    transaction: one UPDATE for SONGS.Play_Count, one upsert of the uploaders'
+    USER_STATS.Total_Plays, a multi-row upsert into the TRENDING_HOURLY buckets
+    the trending engine reads, one batched INSERT into USER_ACTIVITY and an
+    upsert of the per-user USER_ACTIVITY_DAILY counts.
+
+    A batch is flushed once it reaches ``flush_size`` events, ``flush_interval``
+    seconds after the previous flush, or when its oldest event has waited
+    ``max_lag`` seconds. Failed flushes keep their events and retry on the next
+    tick, and ``close()`` drains whatever is still buffered. Plays of songs or
+    by users deleted before the flush are dropped rather than retried, since
+    their rows can never be written.
+    """
+
+    def __init__(self, pool: ConnectionPool, cache: QueryCache,
+                 flush_size: int, flush_interval: float, max_lag: float):
+        self.pool = pool
+        self.cache = cache
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_lag = max_lag
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._oldest_pending = None
+        self.recorded = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="play-event-flusher", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def record(self, user_id: int, song_id: int):
+        now = datetime.now()
+        self._queue.put(PlayEvent(user_id, song_id, now, time.monotonic()))
+        with self._lock:
+            self.recorded += 1
+
+    def close(self, timeout: float = 30.0):
+        """Flush everything still queued and stop the worker"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def _run(self):
+        buffer = []
+        last_flush = time.monotonic()
+        retry_at = 0.0
+        shutdown_retries = 3
+        stopping = False
+        while True:
+            now = time.monotonic()
+            if stopping:
+                wait = 0
+            else:
+                wait = self.flush_interval - (now - last_flush)
+                if buffer:
+                    wait = min(wait, self.max_lag - (now - buffer[0].recorded_at))
+                wait = max(wait, retry_at - now, 0.01)
+            try:
+                item = self._queue.get(timeout=wait) if wait else self._queue.get_nowait()
+            except queue.Empty:
+                item = None
+
+            # Pull whatever else is already waiting, up to one batch
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    buffer.append(item)
+                if len(buffer) >= self.flush_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            with self._lock:
+                self._pending = len(buffer)
+                self._oldest_pending = buffer[0].recorded_at if buffer else None
+
+            now = time.monotonic()
+            due = stopping or now >= retry_at and (
+                len(buffer) >= self.flush_size
+                or now - last_flush >= self.flush_interval
+                or (buffer and now - buffer[0].recorded_at >= self.max_lag)
+            )
+            if not due:
+                continue
+
+            last_flush = now
+            if buffer:
+                batch = buffer[:self.flush_size]
+                if self._flush(batch):
+                    del buffer[:len(batch)]
+                elif stopping and shutdown_retries:
+                    shutdown_retries -= 1
+                    time.sleep(1)
+                elif stopping:
+                    print(f"⚠️ Dropping {len(buffer)} unflushed play events on shutdown")
+                    buffer.clear()
+                else:
+                    retry_at = now + self.flush_interval
+
+            if stopping and not buffer and self._queue.empty():
+                break
+
+        with self._lock:
+            self._pending = 0
+            self._oldest_pending = None
+
+    def _flush(self, batch: List[PlayEvent]) -> bool:
+        """Write ``batch``; False if it should be retried"""
+        try:
+            conn = self.pool.acquire()
+        except Error as e:
+            print(f"⚠️ Play events not flushed, retrying: {e}")
+            self.failures += 1
+            return False
+
+        healthy = True
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            written = self._existing(cursor, batch)
+            if len(written) < len(batch):
+                self._drop(len(batch) - len(written), "their song or user was deleted")
+            if not written:
+                conn.commit()
+                return True
+
+            plays_per_song = Counter(e.song_id for e in written)
+            plays_per_hour = Counter((e.song_id, bucket_start(e.played_at)) for e in written)
+            plays_per_user_day = Counter((e.user_id, e.played_at.date(), e.song_id) for e in written)
+
+            song_ids = list(plays_per_song)
+            case_sql = " ".join("WHEN %s THEN %s" for _ in song_ids)
+            case_params = [v for song_id in song_ids for v in (song_id, plays_per_song[song_id])]
+            in_sql = ", ".join(["%s"] * len(song_ids))
+
+            cursor.execute(
+                f"UPDATE SONGS SET Play_Count = Play_Count + CASE Song_ID {case_sql} END "
+                f"WHERE Song_ID IN ({in_sql})",
+                case_params + song_ids
+            )
+            cursor.execute(
+                "INSERT INTO USER_STATS (User_ID, Total_Plays) "
+                f"SELECT s.User_ID, SUM(CASE s.Song_ID {case_sql} END) "
+                f"FROM SONGS s WHERE s.Song_ID IN ({in_sql}) GROUP BY s.User_ID "
+                "ON DUPLICATE KEY UPDATE Total_Plays = Total_Plays + VALUES(Total_Plays)",
+                case_params + song_ids
+            )
+            cursor.executemany(
+                "INSERT INTO TRENDING_HOURLY (Song_ID, Bucket_Hour, Play_Count) "
+                "VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE Play_Count = Play_Count + VALUES(Play_Count)",
+                [(song_id, hour, count) for (song_id, hour), count in plays_per_hour.items()]
+            )
+            cursor.executemany(
+                "INSERT INTO USER_ACTIVITY (User_ID, Activity_Type, Song_ID, Timestamp) "
+                "VALUES (%s, 'play', %s, %s)",
+                [(e.user_id, e.song_id, e.played_at) for e in written]
+            )
+            cursor.executemany(
+                "INSERT INTO USER_ACTIVITY_DAILY (User_ID, Activity_Date, Activity_Type, Song_ID, Activity_Count) "
+                "VALUES (%s, %s, 'play', %s, %s) "
+                "ON DUPLICATE KEY UPDATE Activity_Count = Activity_Count + VALUES(Activity_Count)",
+                [(user_id, day, song_id, count) for (user_id, day, song_id), count in plays_per_user_day.items()]
+            )
+            conn.commit()
+        except Error as e:
+            healthy = not isinstance(e, (OperationalError, InterfaceError))
+            try:
+                conn.rollback()
+            except Error:
+                healthy = False
+            if isinstance(e, IntegrityError):
+                # e.g. a song deleted after the check above; retrying would fail the same way
+                self._drop(len(batch), f"the batch can't be written: {e}")
+                return True
+            print(f"⚠️ Play events not flushed, retrying: {e}")
+            self.failures += 1
+            return False
+        finally:
+            if cursor is not None:
+                cursor.close()
+            self.pool.release(conn, healthy=healthy)
+
+        self.cache.invalidate({"SONGS", "TRENDING_HOURLY", "USER_ACTIVITY", "USER_ACTIVITY_DAILY", "USER_STATS"})
+        with self._lock:
+            self.flushed += len(written)
+            self.batches += 1
+        return True
+
+    @staticmethod
+    def _existing(cursor, batch: List[PlayEvent]) -> List[PlayEvent]:
+        """The events whose song and user still exist"""
+        song_ids = list({e.song_id for e in batch})
+        user_ids = list({e.user_id for e in batch})
+        cursor.execute(f"SELECT Song_ID FROM SONGS WHERE Song_ID IN ({', '.join(['%s'] * len(song_ids))})",
+                       song_ids)
+        songs = {row[0] for row in cursor.fetchall()}
+        cursor.execute(f"SELECT User_ID FROM USERS WHERE User_ID IN ({', '.join(['%s'] * len(user_ids))})",
+                       user_ids)
+        users = {row[0] for row in cursor.fetchall()}
+        return [e for e in batch if e.song_id in songs and e.user_id in users]
+
+    def _drop(self, count: int, reason: str):
+        print(f"⚠️ Dropping {count} play events: {reason}")
+        with self._lock:
+            self.dropped += count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            oldest = self._oldest_pending
+            return {
+                "recorded": self.recorded,
+                "flushed": self.flushed,
+                "batches": self.batches,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "queued": self._queue.qsize() + self._pending,
+                "lag_seconds": round(time.monotonic() - oldest, 3) if oldest else 0.0,
+            }
+
+
+@st.cache_resource
+def get_play_pipeline() -> PlayEventPipeline:
+    """One background play-event writer per server process"""
+    pipeline = PlayEventPipeline(
+        get_connection_pool(),
+        get_query_cache(),
+        flush_size=int(os.getenv("PLAY_FLUSH_SIZE", "500")),
+        flush_interval=float(os.getenv("PLAY_FLUSH_INTERVAL", "2")),
+        max_lag=float(os.getenv("PLAY_MAX_LAG", "10")),
+    )
+    return pipeline
+
+
+@st.cache_resource
+def get_trending_engine() -> TrendingEngine:
+    """Decayed top-K trending rankings, rebuilt from TRENDING_HOURLY on every refresh"""
+    return TrendingEngine(get_connection_pool())
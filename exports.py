@@ -0,0 +1,93 @@
+"""Streaming CSV and Parquet export of query results.
+
+Rows arrive in chunks from ``DatabaseManager.stream_query`` (an unbuffered
+cursor), and each chunk is written out before the next is fetched, so memory
+use is bounded by the chunk size rather than the table size.
+"""
+import csv
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_FORMATS = {"CSV": "csv", "Parquet": "parquet"}
+
+# (column names, MySQL type names, rows)
+Chunk = Tuple[List[str], List[str], List[tuple]]
+
+
+def export_path(name: str, fmt: str, formats: Dict[str, str] = EXPORT_FORMATS) -> str:
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(EXPORT_DIR, f"{name.lower()}_{stamp}.{formats[fmt]}")
+
+
+def write_export(chunks: Iterator[Chunk], path: str, fmt: str) -> int:
+    """Write streamed chunks to ``path`` and return the number of rows written"""
+    if fmt == "CSV":
+        return write_csv(chunks, path)
+    if fmt == "Parquet":
+        return write_parquet(chunks, path)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def write_csv(chunks: Iterator[Chunk], path: str) -> int:
+    rows_written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        header_written = False
+        for columns, _, rows in chunks:
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+            rows_written += len(rows)
+    return rows_written
+
+
+def arrow_type(mysql_type: str):
+    import pyarrow as pa
+
+    if mysql_type in ("TINY", "SHORT", "LONG", "INT24", "LONGLONG", "YEAR"):
+        return pa.int64()
+    if mysql_type in ("FLOAT", "DOUBLE", "DECIMAL", "NEWDECIMAL"):
+        return pa.float64()
+    if mysql_type == "DATE":
+        return pa.date32()
+    if mysql_type in ("DATETIME", "TIMESTAMP"):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def write_parquet(chunks: Iterator[Chunk], path: str) -> int:
+    """One Parquet row group per chunk, typed from the cursor's column metadata"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    rows_written = 0
+    writer = None
+    try:
+        for columns, types, rows in chunks:
+            if writer is None:
+                schema = pa.schema([(c, arrow_type(t)) for c, t in zip(columns, types)])
+                writer = pq.ParquetWriter(path, schema)
+            if not rows:
+                continue
+            arrays = []
+            for i, field in enumerate(writer.schema):
+                values = [row[i] for row in rows]
+                if pa.types.is_floating(field.type):
+                    values = [None if v is None else float(v) for v in values]
+                elif pa.types.is_string(field.type):
+                    values = [None if v is None else v.decode("utf-8", "replace") if isinstance(v, (bytes, bytearray)) else str(v)
+                              for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=writer.schema))
+            rows_written += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows_written
@@ -0,0 +1,115 @@
+"""Thumbnails for profile pictures and cover art.
+
+Uploaded images are decoded once, at upload time, cropped to a square at
+every size in THUMBNAIL_SIZES and stored as ``<root>/<aa>/<bb>/<sha256>_<px>.jpg``,
+keyed by the hash of the uploaded bytes, so the same picture is processed and
+stored once however often it is uploaded. The database only keeps the hash.
+
+Pages call ``thumbnail(image, view)`` with whatever the column holds: a
+hash, a file path from before thumbnails existed (converted on first use),
+a remote URL (passed through) or nothing. Missing and unreadable images get
+the bundled placeholder (assets/placeholder.png), so nothing is fetched from
+the network.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+from functools import lru_cache
+from typing import BinaryIO, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+IMAGE_ROOT = os.path.abspath(os.getenv("IMAGE_ROOT", "user_uploads/images"))
+PLACEHOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "placeholder.png")
+
+# Square size in pixels of the thumbnail each view shows
+THUMBNAIL_SIZES = {"sidebar": 150, "grid": 150, "player": 300}
+JPEG_QUALITY = 85
+# Refuse decompression bombs well before Pillow's own limit
+MAX_PIXELS = 40_000_000
+# Transparent areas are flattened onto the theme's secondary background
+BACKGROUND = (26, 28, 32)
+
+_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+
+def thumbnail_file(content_hash: str, size: int, root: str = IMAGE_ROOT) -> str:
+    return os.path.join(root, content_hash[:2], content_hash[2:4], f"{content_hash}_{size}.jpg")
+
+
+def store_image(stream: BinaryIO, root: str = IMAGE_ROOT) -> str:
+    """Make every thumbnail size for an uploaded image; returns its content hash.
+
+    Raises ValueError if the upload isn't an image Pillow can read.
+    """
+    data = stream.read()
+    content_hash = hashlib.sha256(data).hexdigest()
+    sizes = sorted(set(THUMBNAIL_SIZES.values()), reverse=True)
+    missing = [size for size in sizes if not os.path.exists(thumbnail_file(content_hash, size, root))]
+    if missing:
+        make_thumbnails(io.BytesIO(data), content_hash, missing, root)
+    return content_hash
+
+
+def make_thumbnails(source, content_hash: str, sizes, root: str = IMAGE_ROOT):
+    try:
+        with Image.open(source) as image:
+            if image.width * image.height > MAX_PIXELS:
+                raise ValueError(f"Image is too large ({image.width}x{image.height})")
+            # Let the JPEG decoder downscale while decoding; only the largest size is needed
+            image.draft("RGB", (max(sizes) * 2, max(sizes) * 2))
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                flat = Image.new("RGB", image.size, BACKGROUND)
+                flat.paste(image, mask=image.getchannel("A"))
+                image = flat
+            else:
+                image = image.convert("RGB")
+
+            for size in sorted(sizes, reverse=True):
+                image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                path = thumbnail_file(content_hash, size, root)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write then rename, so a concurrent reader never sees half a file
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".jpg")
+                try:
+                    with os.fdopen(fd, "wb") as out:
+                        image.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValueError(f"Could not process image: {e}") from e
+
+
+def thumbnail(image: Optional[str], view: str) -> str:
+    """Path (or URL) of the thumbnail to show for an image column value in ``view``"""
+    size = THUMBNAIL_SIZES[view]
+    if isinstance(image, str) and image.startswith(("http://", "https://")):
+        return image
+    if isinstance(image, str) and _HASH.match(image):
+        path = thumbnail_file(image, size)
+        return path if os.path.exists(path) else placeholder(size)
+    if isinstance(image, str) and image and os.path.isfile(image):
+        return local_thumbnail(os.path.abspath(image), os.stat(image).st_mtime_ns, size) or placeholder(size)
+    return placeholder(size)
+
+
+def placeholder(size: int) -> str:
+    return local_thumbnail(PLACEHOLDER, os.stat(PLACEHOLDER).st_mtime_ns, size) or PLACEHOLDER
+
+
+@lru_cache(maxsize=1024)
+def local_thumbnail(path: str, mtime_ns: int, size: int) -> Optional[str]:
+    """Thumbnail of an image file on disk, made on first use (None if it can't be read)"""
+    try:
+        with open(path, "rb") as f:
+            content_hash = store_image(f)
+    except (OSError, ValueError):
+        return None
+    return thumbnail_file(content_hash, size)
@@ -0,0 +1,274 @@
+"""Bulk import of an audio catalog from a directory tree.
+
+Usage:
+    python ingest.py /path/to/catalog --user-id 1 [--workers 8] [--batch-size 1000]
+                     [--checkpoint FILE] [--restart]
+
+Every .mp3 and .wav file under the directory is copied into content-addressed
+storage, hashed, measured and tag-read in a process pool
+(``audio_store.ingest_file``). The main process takes the results in order and
+writes them ``--batch-size`` at a time: content already in MEDIA_FILES, or
+seen earlier in the run, is skipped as a duplicate, missing artists are added,
+and the batch's SONGS, SONG_ARTISTS, MEDIA_FILES and USER_STATS rows commit in
+one transaction.
+
+After each commit the batch's files are appended to a checkpoint file, so an
+interrupted run resumes where it stopped. Files that could not be read are
+reported and retried on the next run. If a batch fails to commit, the files
+it newly stored are removed again.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from audio_store import discard_uncommitted, ingest_file
+from database import DatabaseManager
+from media_server import MEDIA_ROOT
+
+AUDIO_EXTENSIONS = (".mp3", ".wav")
+BATCH_SIZE = 1000
+# Files submitted to the pool ahead of the one being written, per worker
+IN_FLIGHT_PER_WORKER = 4
+UNKNOWN_ARTIST = "Unknown Artist"
+# Longest tag values that fit SONGS.Title/Album/Genre and ARTISTS.Name
+TITLE_LENGTH, ALBUM_LENGTH, GENRE_LENGTH, ARTIST_LENGTH = 100, 100, 50, 100
+
+
+def audio_files(root: str) -> Iterator[str]:
+    """Audio files under ``root`` in a stable order"""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                yield os.path.join(directory, name)
+
+
+def default_checkpoint(root: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:12]
+    return f".ingest_{digest}.checkpoint"
+
+
+def read_checkpoint(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def bounded_map(executor: Executor, fn: Callable, items: Iterable, window: int) -> Iterator:
+    """``executor.map`` that keeps at most ``window`` calls submitted at a time"""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def placeholders(values) -> str:
+    return ", ".join(["%s"] * len(values))
+
+
+class CatalogIngest:
+    def __init__(self, db: DatabaseManager, root: str, user_id: int, checkpoint: str):
+        self.db = db
+        self.root = root
+        self.user_id = user_id
+        self.checkpoint = checkpoint
+        self.artists: Dict[str, int] = {}  # casefolded name -> Artist_ID
+        self.hashes: Set[str] = set()     # content stored by this run
+        self.counts = Counter()
+        self.bytes = 0
+        self.started = time.perf_counter()
+
+    def run(self, files: List[str], workers: int, batch_size: int = BATCH_SIZE) -> bool:
+        """Ingest ``files``; False if a batch could not be written"""
+        scan = partial(ingest_file, root=MEDIA_ROOT)
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        try:
+            results = (bounded_map(executor, scan, files, workers * IN_FLIGHT_PER_WORKER)
+                       if executor else map(scan, files))
+            batch = []
+            for result in results:
+                batch.append(result)
+                if len(batch) >= batch_size:
+                    if not self.write_batch(batch):
+                        return False
+                    batch = []
+            return self.write_batch(batch)
+        except KeyboardInterrupt:
+            print("Interrupted; run the same command again to resume", file=sys.stderr)
+            return False
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def write_batch(self, batch: List[dict]) -> bool:
+        if not batch:
+            return True
+        stored = []
+        for result in batch:
+            if result["error"]:
+                self.counts["failed"] += 1
+                print(f"⚠️ {result['source']}: {result['error']}", file=sys.stderr)
+                continue
+            self.counts["files"] += 1
+            self.bytes += result["size"]
+            stored.append(result)
+
+        existing = self.existing_hashes({r["content_hash"] for r in stored})
+        if existing is None:
+            self.discard(stored)
+            return False
+        new = []
+        for result in stored:
+            if result["content_hash"] in existing or result["content_hash"] in self.hashes:
+                self.counts["duplicates"] += 1
+            else:
+                self.hashes.add(result["content_hash"])
+                new.append(result)
+
+        if new and not self.insert(new):
+            self.discard(stored)
+            return False
+        self.counts["songs"] += len(new)
+        self.save_checkpoint(stored)
+        self.report("…")
+        return True
+
+    def discard(self, stored: List[dict]):
+        """Remove the files a batch stored for the first time, since it didn't commit"""
+        removed = discard_uncommitted(self.db, [(r["path"], r["content_hash"]) for r in stored if r["created"]])
+        if removed:
+            print(f"Removed {removed} files stored by the failed batch", file=sys.stderr)
+
+    def existing_hashes(self, hashes: Set[str]) -> Optional[Set[str]]:
+        """Which of ``hashes`` some song already points at"""
+        if not hashes:
+            return set()
+        hashes = tuple(hashes)
+        rows = self.db.execute_query(
+            f"SELECT Content_Hash FROM MEDIA_FILES WHERE Content_Hash IN ({placeholders(hashes)}) AND Ref_Count > 0",
+            hashes
+        )
+        if not isinstance(rows, list):
+            return None
+        return {row['Content_Hash'] for row in rows}
+
+    def artist_ids(self, names: Iterable[str]) -> bool:
+        """Look up, or add, the artists not seen yet this run"""
+        missing = list({name.casefold(): name for name in names if name.casefold() not in self.artists}.values())
+        if not missing:
+            return True
+        if not self.load_artists(missing):
+            return False
+        added = list({name.casefold(): name for name in missing if name.casefold() not in self.artists}.values())
+        if added:
+            if not self.db.execute_transaction([
+                ("INSERT INTO ARTISTS (Name) VALUES (%s)", [(name,) for name in added]),
+            ]):
+                return False
+            if not self.load_artists(added):
+                return False
+        return all(name.casefold() in self.artists for name in missing)
+
+    def load_artists(self, names: List[str]) -> bool:
+        rows = self.db.execute_query(
+            f"SELECT Artist_ID, Name FROM ARTISTS WHERE Name IN ({placeholders(names)}) ORDER BY Artist_ID",
+            tuple(names)
+        )
+        if not isinstance(rows, list):
+            return False
+        for row in rows:
+            # The oldest artist wins when a name exists twice
+            self.artists.setdefault(row['Name'].casefold(), row['Artist_ID'])
+        return True
+
+    def insert(self, results: List[dict]) -> bool:
+        songs, links, media = [], [], []
+        for result in results:
+            tags = result["tags"]
+            title = tags.get("title") or os.path.splitext(os.path.basename(result["source"]))[0]
+            artists = [name[:ARTIST_LENGTH] for name in tags.get("artists") or [UNKNOWN_ARTIST]]
+            path = os.path.relpath(result["path"])
+            songs.append((title[:TITLE_LENGTH], (tags.get("album") or "")[:ALBUM_LENGTH] or None,
+                          (tags.get("genre") or "")[:GENRE_LENGTH] or None, result["duration"], path, self.user_id))
+            links.extend((path, name) for name in dict.fromkeys(artists))
+            media.append((result["content_hash"], path, result["size"], result["duration"]))
+
+        if not self.artist_ids(name for _, name in links):
+            return False
+        links = list(dict.fromkeys((self.artists[name.casefold()], path) for path, name in links))
+        # Songs, their artists, counters and file references commit together
+        return self.db.execute_transaction([
+            ("INSERT INTO SONGS (Title, Album, Genre, Duration, File_Path, User_ID) "
+             "VALUES (%s, %s, %s, %s, %s, %s)", songs),
+            ("INSERT INTO SONG_ARTISTS (Song_ID, Artist_ID) SELECT Song_ID, %s FROM SONGS WHERE File_Path = %s",
+             links),
+            ("INSERT INTO MEDIA_FILES (Content_Hash, File_Path, Size_Bytes, Duration, Ref_Count) "
+             "VALUES (%s, %s, %s, %s, 1) "
+             "ON DUPLICATE KEY UPDATE Ref_Count = Ref_Count + 1", media),
+            ("INSERT INTO USER_STATS (User_ID, Upload_Count) VALUES (%s, %s) "
+             "ON DUPLICATE KEY UPDATE Upload_Count = Upload_Count + VALUES(Upload_Count)",
+             (self.user_id, len(songs))),
+        ])
+
+    def save_checkpoint(self, results: List[dict]):
+        with open(self.checkpoint, "a", encoding="utf-8") as f:
+            for result in results:
+                f.write(os.path.relpath(result["source"], self.root) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def report(self, prefix: str):
+        seconds = max(time.perf_counter() - self.started, 1e-9)
+        c = self.counts
+        print(f"{prefix} {c['files']} files: {c['songs']} new songs, "
+              f"{c['duplicates']} duplicates, {c['failed']} failed | "
+              f"{c['files'] / seconds:.1f} files/s, {self.bytes / seconds / 1e6:.1f} MB/s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import an audio catalog into Audily")
+    parser.add_argument("directory", help="directory tree of .mp3 and .wav files")
+    parser.add_argument("--user-id", type=int, required=True, help="account the songs are uploaded as")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes hashing and reading files (0 reads them in this process)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="songs per transaction")
+    parser.add_argument("--checkpoint", help="progress file (default: one per directory in the current directory)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    checkpoint = args.checkpoint or default_checkpoint(args.directory)
+    if args.restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    db = DatabaseManager()
+    user = db.execute_query("SELECT User_ID FROM USERS WHERE User_ID = %s", (args.user_id,))
+    if not isinstance(user, list) or not user:
+        print(f"No user with User_ID {args.user_id}", file=sys.stderr)
+        return 1
+
+    done = read_checkpoint(checkpoint)
+    files = [path for path in audio_files(args.directory) if os.path.relpath(path, args.directory) not in done]
+    if done:
+        print(f"Resuming from {checkpoint}: {len(done)} files already imported")
+    print(f"Importing {len(files)} files with {args.workers} workers")
+
+    ingest = CatalogIngest(db, args.directory, args.user_id, checkpoint)
+    ok = ingest.run(files, args.workers, args.batch_size)
+    ingest.report("✅ Imported" if ok else "⚠️ Stopped after")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
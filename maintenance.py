@@ -0,0 +1,211 @@
+"""Command-line maintenance tasks for the Audily database.
+
+Usage:
+    python maintenance.py migrate [--check]
+    python maintenance.py rebuild-user-stats
+    python maintenance.py rebuild-song-ratings
+    python maintenance.py refresh-recommendations [--full]
+    python maintenance.py rollup-activity [--days 7]
+    python maintenance.py compact-activity [--days 90] [--archive CSV]
+    python maintenance.py export --grid Songs --format Parquet
+"""
+import argparse
+import sys
+
+from database import ACTIVITY_RETENTION_DAYS, ADMIN_GRIDS, DatabaseManager
+from migrations import HALF_STAR_COLUMNS
+from exports import EXPORT_FORMATS
+
+# Page queries checked by ``migrate --check``, with representative parameters.
+# Whole-table reports (e.g. activity per user) are left out on purpose.
+PAGE_QUERIES = [
+    ("Dashboard: user stats",
+     "SELECT Playlist_Count, Upload_Count, Total_Plays FROM USER_STATS WHERE User_ID = %s", (1,)),
+    ("Dashboard: recent uploads",
+     "SELECT s.Song_ID, s.Title, a.Name as Artist, s.Play_Count, s.Cover_Image "
+     "FROM SONGS s "
+     "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+     "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+     "WHERE s.User_ID = %s "
+     "ORDER BY s.Upload_Date DESC LIMIT 5", (1,)),
+    ("Dashboard: recommendations",
+     "SELECT s.Song_ID, s.Title, GROUP_CONCAT(a.Name SEPARATOR ', ') as Artist "
+     "FROM (SELECT Song_ID, Score FROM RECOMMENDATIONS "
+     "      WHERE User_ID = %s ORDER BY Score DESC LIMIT 5) r "
+     "JOIN SONGS s ON r.Song_ID = s.Song_ID "
+     "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+     "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+     "GROUP BY s.Song_ID, s.Title, r.Score "
+     "ORDER BY r.Score DESC", (1,)),
+    ("Browse: genres",
+     "SELECT DISTINCT Genre FROM SONGS WHERE Genre IS NOT NULL", ()),
+    ("Playlists: user playlists",
+     "SELECT p.Playlist_ID, p.Name, p.User_ID, ps.Position, s.Song_ID, s.Title, "
+     "GROUP_CONCAT(a.Name SEPARATOR ', ') as Artist "
+     "FROM PLAYLISTS p "
+     "LEFT JOIN PLAYLIST_SONGS ps ON p.Playlist_ID = ps.Playlist_ID "
+     "LEFT JOIN SONGS s ON ps.Song_ID = s.Song_ID "
+     "LEFT JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+     "LEFT JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+     "WHERE p.User_ID = %s "
+     "GROUP BY p.Playlist_ID, p.Name, p.User_ID, ps.Position, s.Song_ID, s.Title "
+     "ORDER BY p.Playlist_ID, ps.Position, s.Song_ID", (1,)),
+    ("Playlists: import by file path",
+     "SELECT Song_ID, File_Path FROM SONGS WHERE File_Path IN (%s, %s)", ("a.mp3", "b.mp3")),
+    ("Player: comments",
+     "SELECT c.Comment_ID, c.Comment_Text, u.Username, c.Timestamp "
+     "FROM COMMENTS c JOIN USERS u ON c.User_ID = u.User_ID "
+     "WHERE c.Song_ID = %s ORDER BY c.Timestamp DESC, c.Comment_ID DESC LIMIT %s", (1, 20)),
+    ("Player: older comments",
+     "SELECT c.Comment_ID, c.Comment_Text, u.Username, c.Timestamp "
+     "FROM COMMENTS c JOIN USERS u ON c.User_ID = u.User_ID "
+     "WHERE c.Song_ID = %s AND (c.Timestamp < %s OR (c.Timestamp = %s AND c.Comment_ID < %s)) "
+     "ORDER BY c.Timestamp DESC, c.Comment_ID DESC LIMIT %s", (1, "2030-01-01", "2030-01-01", 1000, 20)),
+    ("Player: comment count",
+     "SELECT COUNT(*) AS Comments FROM COMMENTS WHERE Song_ID = %s", (1,)),
+    ("Player: song rating",
+     f"SELECT Rating_Count, Rating_Sum, {', '.join(HALF_STAR_COLUMNS)} FROM SONG_RATINGS WHERE Song_ID = %s",
+     (1,)),
+    ("Trending: hourly checkpoint",
+     "SELECT Song_ID, Bucket_Hour, Play_Count FROM TRENDING_HOURLY WHERE Bucket_Hour >= %s",
+     ("2030-01-01 00:00:00",)),
+    ("Trending: song details",
+     "SELECT s.Song_ID, s.Title, GROUP_CONCAT(a.Name SEPARATOR ', ') as Artist, "
+     "ROUND(r.Rating_Sum / NULLIF(r.Rating_Count, 0), 1) AS Avg_Rating, "
+     "COALESCE(r.Rating_Count, 0) AS Ratings "
+     "FROM SONGS s "
+     "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+     "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+     "LEFT JOIN SONG_RATINGS r ON r.Song_ID = s.Song_ID "
+     "WHERE s.Song_ID IN (%s, %s) "
+     "GROUP BY s.Song_ID, s.Title, r.Rating_Sum, r.Rating_Count", (1, 2)),
+    ("Trending: artist names",
+     "SELECT Artist_ID, Name FROM ARTISTS WHERE Artist_ID IN (%s, %s)", (1, 2)),
+    ("Admin: song popularity report",
+     "SELECT s.Title, a.Name as Artist, s.Play_Count "
+     "FROM SONGS s "
+     "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+     "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+     "ORDER BY s.Play_Count DESC LIMIT 10", ()),
+]
+
+
+def hot_path_queries(db: DatabaseManager) -> list:
+    """(label, query, params) for every page query, built the way the app builds them"""
+    queries = list(PAGE_QUERIES)
+    song_pages = {
+        "all songs": ("", ()),
+        "genre": ("s.Genre = %s", ("Rock",)),
+        "artist": ("EXISTS (SELECT 1 FROM SONG_ARTISTS sa WHERE sa.Song_ID = s.Song_ID AND sa.Artist_ID = %s)", (1,)),
+        "title prefix": ("s.Title LIKE %s", ("lo%",)),
+    }
+    for name, (where, params) in song_pages.items():
+        queries.append((f"Songs: {name}", *db.song_page_query(where, params, after=(10, 100))))
+    queries.append(("Browse: artists", *db.grid_query("Artists", "Name", after=("M", 100), limit=25)))
+    for grid, spec in ADMIN_GRIDS.items():
+        for sort in spec['sortable']:
+            queries.append((f"Admin {grid}: by {sort}", *db.grid_query(grid, sort, descending=True, limit=50)))
+    return queries
+
+
+def migrate(db: DatabaseManager, args) -> bool:
+    conn = db.pool.acquire()
+    try:
+        for migration in db.backend.migrate(conn):
+            print(f"✅ Applied migration {migration.version}: {migration.name}")
+        print(f"Schema at version {db.backend.schema_version(conn)} ({db.backend.name})")
+        if not args.check:
+            return True
+
+        report = db.backend.explain_queries(conn, hot_path_queries(db))
+    finally:
+        db.pool.release(conn)
+
+    for label, scans in report.items():
+        tables = ", ".join(row['table'] + (f" (~{row['rows']} rows)" if row['rows'] is not None else "")
+                           for row in scans)
+        print(f"⚠️ {label}: full scan of {tables}")
+    if not report:
+        print("✅ No full table scans in the checked queries")
+    return not report
+
+
+def rebuild_user_stats(db: DatabaseManager, args) -> bool:
+    ok = db.rebuild_user_stats()
+    if ok:
+        print("✅ USER_STATS rebuilt from PLAYLISTS and SONGS")
+    return ok
+
+
+def rebuild_song_ratings(db: DatabaseManager, args) -> bool:
+    ok = db.rebuild_song_ratings()
+    if ok:
+        print("✅ SONG_RATINGS rebuilt from RATINGS")
+    return ok
+
+
+def refresh_recommendations(db: DatabaseManager, args) -> bool:
+    from recommender import Recommender
+
+    updated = Recommender(db).refresh(full=args.full)
+    print(f"✅ Recommendations refreshed for {updated} users")
+    return True
+
+
+def rollup_activity(db: DatabaseManager, args) -> bool:
+    ok = db.rebuild_activity_rollups(args.days)
+    if ok:
+        print("✅ USER_ACTIVITY_DAILY rebuilt from USER_ACTIVITY"
+              + (f" for the last {args.days} days" if args.days is not None else ""))
+    return ok
+
+
+def compact_activity(db: DatabaseManager, args) -> bool:
+    days = ACTIVITY_RETENTION_DAYS if args.days is None else args.days
+    deleted, path = db.compact_activity(days, archive_format=args.archive)
+    print(f"✅ Compacted {deleted} activity rows older than {days} days"
+          + (f", archived to {path}" if path else ""))
+    return True
+
+
+def export(db: DatabaseManager, args) -> bool:
+    path, count = db.export_grid(args.grid, args.format)
+    print(f"✅ Exported {count} rows to {path}")
+    return True
+
+
+COMMANDS = {
+    "migrate": migrate,
+    "rebuild-user-stats": rebuild_user_stats,
+    "rebuild-song-ratings": rebuild_song_ratings,
+    "refresh-recommendations": refresh_recommendations,
+    "rollup-activity": rollup_activity,
+    "compact-activity": compact_activity,
+    "export": export,
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Audily database maintenance")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--check", action="store_true",
+                        help="migrate: EXPLAIN the app's queries and report full table scans")
+    parser.add_argument("--full", action="store_true",
+                        help="refresh-recommendations: recompute every user, not just those with new activity")
+    parser.add_argument("--days", type=int,
+                        help="rollup-activity: only recompute the last N days; "
+                             f"compact-activity: raw rows to keep (default {ACTIVITY_RETENTION_DAYS})")
+    parser.add_argument("--archive", choices=sorted(EXPORT_FORMATS),
+                        help="compact-activity: export rows to this format before deleting them")
+    parser.add_argument("--grid", choices=sorted(ADMIN_GRIDS), default="Songs",
+                        help="export: which admin table to export")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="CSV",
+                        help="export: output format")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager()
+    return 0 if COMMANDS[args.command](db, args) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Small HTTP server that streams uploaded audio next to the Streamlit app.
+
+The player points ``st.audio`` at this server instead of inlining the file,
+so the browser fetches audio directly with HTTP Range requests (seeking only
+transfers the requested bytes) and can cache it. File bodies go out with
+``socket.sendfile``, which uses the kernel's zero-copy sendfile where available.
+
+Run standalone with ``python media_server.py``; the app also starts it in a
+background thread on first use (see ``start_media_server``).
+"""
+import email.utils
+import mimetypes
+import os
+import re
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import quote, unquote, urlsplit
+
+MEDIA_ROOT = os.path.abspath(os.getenv("MEDIA_ROOT", "user_uploads/songs"))
+# Under MEDIA_ROOT: files still being written by uploads and imports, never served
+INCOMING_DIR = ".incoming"
+MEDIA_HOST = os.getenv("MEDIA_HOST", "0.0.0.0")
+MEDIA_PORT = int(os.getenv("MEDIA_PORT", "8502"))
+MEDIA_BASE_URL = os.getenv("MEDIA_BASE_URL", f"http://localhost:{MEDIA_PORT}/")
+CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def media_url(file_path: str) -> Optional[str]:
+    """Return the streaming URL for a stored file, or None if it isn't under MEDIA_ROOT"""
+    full_path = os.path.abspath(file_path)
+    if os.path.commonpath([full_path, MEDIA_ROOT]) != MEDIA_ROOT:
+        return None
+    relative = os.path.relpath(full_path, MEDIA_ROOT).replace(os.sep, "/")
+    return MEDIA_BASE_URL.rstrip("/") + "/" + quote(relative)
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    server_version = "AudilyMedia/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def serve(self, send_body: bool):
+        path = self.resolve(self.path)
+        if path is None or not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        stat = os.stat(path)
+        size = stat.st_size
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+
+        if self.not_modified(etag, stat.st_mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_common_headers(etag, last_modified)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+        range_header = self.headers.get("Range")
+        if range_header and self.range_applies(etag, stat.st_mtime):
+            byte_range = self.parse_range(range_header, size)
+            if byte_range is None:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, end = byte_range
+            status = HTTPStatus.PARTIAL_CONTENT
+
+        length = max(end - start + 1, 0)
+        self.send_response(status)
+        self.send_common_headers(etag, last_modified)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        if send_body and length:
+            with open(path, "rb") as f:
+                try:
+                    self.wfile.flush()
+                    self.connection.sendfile(f, offset=start, count=length)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Players routinely abort requests when seeking
+                    self.close_connection = True
+
+    def send_common_headers(self, etag: str, last_modified: str):
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Cache-Control", f"public, max-age={CACHE_MAX_AGE}")
+        self.send_header("Access-Control-Allow-Origin", "*")
+
+    def not_modified(self, etag: str, mtime: float) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def range_applies(self, etag: str, mtime: float) -> bool:
+        # If-Range: only honour the range when the client's copy is current
+        if_range = self.headers.get("If-Range")
+        if not if_range:
+            return True
+        if if_range.startswith(('"', 'W/')):
+            return if_range == etag
+        try:
+            return int(mtime) <= email.utils.parsedate_to_datetime(if_range).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def parse_range(header: str, size: int) -> Optional[tuple]:
+        """Parse a single ``bytes=start-end`` range; multi-range requests get the first range"""
+        match = _RANGE_PATTERN.match(header.split(",")[0].strip())
+        if not match or size == 0:
+            return None
+        first, last = match.groups()
+        if first == "":
+            if last == "":
+                return None
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        if start > end or start >= size:
+            return None
+        return start, end
+
+    @staticmethod
+    def resolve(request_path: str) -> Optional[str]:
+        relative = unquote(urlsplit(request_path).path).lstrip("/")
+        full_path = os.path.abspath(os.path.join(MEDIA_ROOT, relative))
+        if os.path.commonpath([full_path, MEDIA_ROOT]) != MEDIA_ROOT:
+            return None
+        incoming = os.path.join(MEDIA_ROOT, INCOMING_DIR)
+        if os.path.commonpath([full_path, incoming]) == incoming:
+            return None
+        return full_path
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_media_server(host: str = MEDIA_HOST, port: int = MEDIA_PORT) -> Optional[ThreadingHTTPServer]:
+    """Serve MEDIA_ROOT from a daemon thread; returns None if the port is taken"""
+    try:
+        server = ThreadingHTTPServer((host, port), MediaRequestHandler)
+    except OSError as e:
+        # Another app process (or a standalone media_server.py) already serves it
+        print(f"⚠️ Media server not started on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="media-server", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    os.makedirs(MEDIA_ROOT, exist_ok=True)
+    print(f"🎧 Serving {MEDIA_ROOT} on http://{MEDIA_HOST}:{MEDIA_PORT}/")
+    ThreadingHTTPServer((MEDIA_HOST, MEDIA_PORT), MediaRequestHandler).serve_forever()
@@ -0,0 +1,557 @@
+"""Versioned schema migrations for the Audily database.
+
+Each migration has a version number and is recorded in SCHEMA_MIGRATIONS once
+applied, so the app only does work when the schema is behind. MySQL commits
+DDL implicitly, so every step checks the live schema before changing it; a
+migration interrupted half way is simply re-run on the next start.
+
+Migrations are applied by ``DatabaseManager`` on startup and by
+``python maintenance.py migrate``; ``--check`` additionally runs EXPLAIN on
+the app's hot-path queries and reports full table scans. SQLite databases
+are built from ``CURRENT_TABLES`` and ``ADDED_COLUMNS`` instead (see
+sqlite_backend.py). Migrations are never edited once they ship; a change to a
+table is a new migration.
+"""
+from collections import namedtuple
+from typing import Dict, Iterable, List, Set
+
+from audio_store import MEDIA_FILES_TABLE
+from trending import TRENDING_HOURLY_TABLE
+
+Migration = namedtuple("Migration", ["version", "name", "apply"])
+
+MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS SCHEMA_MIGRATIONS (
+        Version INT PRIMARY KEY,
+        Name VARCHAR(100) NOT NULL,
+        Applied_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Only one process may migrate at a time (named locks are server-wide)
+MIGRATION_LOCK = "audily_schema_migrations"
+MIGRATION_LOCK_TIMEOUT = 60
+
+BASELINE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS USERS (
+        User_ID INT AUTO_INCREMENT PRIMARY KEY,
+        Username VARCHAR(50) NOT NULL UNIQUE,
+        Email VARCHAR(100) NOT NULL,
+        Password VARCHAR(100) NOT NULL,
+        Profile_Picture VARCHAR(255),
+        Subscription_Type VARCHAR(20) DEFAULT 'Free',
+        Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ARTISTS (
+        Artist_ID INT AUTO_INCREMENT PRIMARY KEY,
+        Name VARCHAR(100) NOT NULL,
+        Bio TEXT,
+        Profile_Picture VARCHAR(255),
+        FULLTEXT KEY ft_artists (Name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SONGS (
+        Song_ID INT AUTO_INCREMENT PRIMARY KEY,
+        Title VARCHAR(100) NOT NULL,
+        Album VARCHAR(100),
+        Duration INT NOT NULL,
+        Genre VARCHAR(50),
+        File_Path VARCHAR(255) NOT NULL,
+        Cover_Image VARCHAR(255),
+        User_ID INT NOT NULL,
+        Upload_Date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        Play_Count INT DEFAULT 0,
+        FOREIGN KEY (User_ID) REFERENCES USERS(User_ID),
+        FULLTEXT KEY ft_songs (Title, Album, Genre)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SONG_ARTISTS (
+        Song_ID INT,
+        Artist_ID INT,
+        PRIMARY KEY (Song_ID, Artist_ID),
+        FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID),
+        FOREIGN KEY (Artist_ID) REFERENCES ARTISTS(Artist_ID)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS PLAYLISTS (
+        Playlist_ID INT AUTO_INCREMENT PRIMARY KEY,
+        Name VARCHAR(100) NOT NULL,
+        User_ID INT NOT NULL,
+        Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (User_ID) REFERENCES USERS(User_ID)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS PLAYLIST_SONGS (
+        Playlist_ID INT,
+        Song_ID INT,
+        PRIMARY KEY (Playlist_ID, Song_ID),
+        FOREIGN KEY (Playlist_ID) REFERENCES PLAYLISTS(Playlist_ID),
+        FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS TRENDING (
+        Trend_ID INT AUTO_INCREMENT PRIMARY KEY,
+        Song_ID INT NOT NULL,
+        Trend_Date DATE NOT NULL,
+        Play_Count INT DEFAULT 0,
+        FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID),
+        UNIQUE KEY (Song_ID, Trend_Date)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS COMMENTS (
+        Comment_ID INT AUTO_INCREMENT PRIMARY KEY,
+        Comment_Text TEXT NOT NULL,
+        User_ID INT NOT NULL,
+        Song_ID INT NOT NULL,
+        Timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (User_ID) REFERENCES USERS(User_ID),
+        FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS RATINGS (
+        Rating_ID INT AUTO_INCREMENT PRIMARY KEY,
+        Rating_Value FLOAT NOT NULL,
+        User_ID INT NOT NULL,
+        Song_ID INT NOT NULL,
+        FOREIGN KEY (User_ID) REFERENCES USERS(User_ID),
+        FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID),
+        UNIQUE KEY (User_ID, Song_ID)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS USER_ACTIVITY (
+        Activity_ID INT AUTO_INCREMENT PRIMARY KEY,
+        User_ID INT NOT NULL,
+        Activity_Type VARCHAR(50) NOT NULL,
+        Activity_Details TEXT,
+        Timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (User_ID) REFERENCES USERS(User_ID)
+    )
+    """,
+]
+
+# Columns later migrations add to the baseline tables, which stay as migration 1
+# created them. SQLite files are built from the current schema rather than by
+# replaying migrations, so sqlite_backend adds these to the baseline statements.
+ADDED_COLUMNS = {
+    "USER_ACTIVITY": {"Song_ID": "INT NULL AFTER Activity_Type"},         # migration 10
+    "PLAYLIST_SONGS": {"Position": "DOUBLE NOT NULL DEFAULT 0",           # migration 11
+                       "Added_At": "DATETIME NULL"},                      # migration 12
+    "RATINGS": {"Rated_At": "DATETIME NULL"},                             # migration 12
+}
+
+USER_STATS_TABLE = """
+    CREATE TABLE IF NOT EXISTS USER_STATS (
+        User_ID INT PRIMARY KEY,
+        Playlist_Count INT NOT NULL DEFAULT 0,
+        Upload_Count INT NOT NULL DEFAULT 0,
+        Total_Plays BIGINT NOT NULL DEFAULT 0,
+        FOREIGN KEY (User_ID) REFERENCES USERS(User_ID)
+    )
+"""
+
+USER_STATS_REBUILD = (
+    "INSERT INTO USER_STATS (User_ID, Playlist_Count, Upload_Count, Total_Plays) "
+    "SELECT u.User_ID, "
+    "       (SELECT COUNT(*) FROM PLAYLISTS p WHERE p.User_ID = u.User_ID), "
+    "       (SELECT COUNT(*) FROM SONGS s WHERE s.User_ID = u.User_ID), "
+    "       (SELECT COALESCE(SUM(s.Play_Count), 0) FROM SONGS s WHERE s.User_ID = u.User_ID) "
+    "FROM USERS u "
+    "ON DUPLICATE KEY UPDATE Playlist_Count = VALUES(Playlist_Count), "
+    "Upload_Count = VALUES(Upload_Count), Total_Plays = VALUES(Total_Plays)"
+)
+
+RECOMMENDATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS RECOMMENDATIONS (
+        Recommendation_ID INT AUTO_INCREMENT PRIMARY KEY,
+        User_ID INT NOT NULL,
+        Song_ID INT NOT NULL,
+        Score FLOAT NOT NULL DEFAULT 0,
+        Recommendation_Date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (User_ID) REFERENCES USERS(User_ID) ON DELETE CASCADE,
+        FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID) ON DELETE CASCADE,
+        KEY idx_recommendations_user (User_ID, Score)
+    )
+"""
+
+# When each user's recommendations were last computed, whether or not any came out
+RECOMMENDATION_REFRESHES_TABLE = """
+    CREATE TABLE IF NOT EXISTS RECOMMENDATION_REFRESHES (
+        User_ID INT PRIMARY KEY,
+        Refreshed_At DATETIME NOT NULL,
+        FOREIGN KEY (User_ID) REFERENCES USERS(User_ID) ON DELETE CASCADE
+    )
+"""
+
+RECOMMENDATION_REFRESHES_BACKFILL = (
+    "INSERT INTO RECOMMENDATION_REFRESHES (User_ID, Refreshed_At) "
+    "SELECT User_ID, MAX(Recommendation_Date) FROM RECOMMENDATIONS "
+    "WHERE Recommendation_Date IS NOT NULL GROUP BY User_ID"
+)
+
+# Per-song rating aggregate, kept in step with RATINGS by DatabaseManager.rate_song.
+# Half_Stars_<n> counts the ratings of n/2 stars (Half_Stars_7 is 3.5 stars).
+RATING_HALF_STARS = 10
+HALF_STAR_COLUMNS = [f"Half_Stars_{n}" for n in range(RATING_HALF_STARS + 1)]
+
+SONG_RATINGS_TABLE = """
+    CREATE TABLE IF NOT EXISTS SONG_RATINGS (
+        Song_ID INT PRIMARY KEY,
+        Rating_Count INT NOT NULL DEFAULT 0,
+        Rating_Sum DOUBLE NOT NULL DEFAULT 0,
+        {histogram}
+        FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID) ON DELETE CASCADE
+    )
+""".format(histogram="\n        ".join(f"{column} INT NOT NULL DEFAULT 0," for column in HALF_STAR_COLUMNS))
+
+SONG_RATINGS_REBUILD = (
+    f"INSERT INTO SONG_RATINGS (Song_ID, Rating_Count, Rating_Sum, {', '.join(HALF_STAR_COLUMNS)}) "
+    "SELECT Song_ID, COUNT(*), SUM(Rating_Value), "
+    + ", ".join(f"SUM(ROUND(Rating_Value * 2) = {n})" for n in range(RATING_HALF_STARS + 1)) + " "
+    "FROM RATINGS GROUP BY Song_ID "
+    "ON DUPLICATE KEY UPDATE Rating_Count = VALUES(Rating_Count), Rating_Sum = VALUES(Rating_Sum), "
+    + ", ".join(f"{column} = VALUES({column})" for column in HALF_STAR_COLUMNS)
+)
+
+# Daily activity counts per user, type and song (0 for activity not about a
+# song). The play pipeline adds to them as it writes raw USER_ACTIVITY rows,
+# so raw rows past the retention period can be deleted without losing counts.
+USER_ACTIVITY_DAILY_TABLE = """
+    CREATE TABLE IF NOT EXISTS USER_ACTIVITY_DAILY (
+        User_ID INT NOT NULL,
+        Activity_Date DATE NOT NULL,
+        Activity_Type VARCHAR(50) NOT NULL,
+        Song_ID INT NOT NULL DEFAULT 0,
+        Activity_Count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (User_ID, Activity_Date, Activity_Type, Song_ID),
+        FOREIGN KEY (User_ID) REFERENCES USERS(User_ID) ON DELETE CASCADE
+    )
+"""
+
+USER_ACTIVITY_DAILY_REBUILD = (
+    "INSERT INTO USER_ACTIVITY_DAILY (User_ID, Activity_Date, Activity_Type, Song_ID, Activity_Count) "
+    "SELECT User_ID, DATE(Timestamp), Activity_Type, COALESCE(Song_ID, 0), COUNT(*) "
+    "FROM USER_ACTIVITY {where}"
+    "GROUP BY User_ID, DATE(Timestamp), Activity_Type, COALESCE(Song_ID, 0) "
+    "ON DUPLICATE KEY UPDATE Activity_Count = VALUES(Activity_Count)"
+)
+
+# Plays used to be logged as 'Played song: <title>'; match them to a song id
+# (the lowest, for duplicate titles) and drop the text
+ACTIVITY_SONG_BACKFILL = [
+    "UPDATE USER_ACTIVITY SET Song_ID = "
+    "(SELECT MIN(s.Song_ID) FROM SONGS s WHERE s.Title = SUBSTRING(USER_ACTIVITY.Activity_Details, 14)) "
+    "WHERE Activity_Type = 'play' AND Song_ID IS NULL AND Activity_Details LIKE 'Played song: %'",
+    "UPDATE USER_ACTIVITY SET Activity_Details = NULL "
+    "WHERE Activity_Type = 'play' AND Song_ID IS NOT NULL AND Activity_Details LIKE 'Played song: %'",
+]
+
+# Songs in a playlist are ordered by Position, spaced PLAYLIST_POSITION_GAP
+# apart when appended; a move takes the midpoint of its new neighbours, so it
+# rewrites one row instead of renumbering the playlist
+PLAYLIST_POSITION_GAP = 1024.0
+
+# Playlists used to be shown in Song_ID order, which existing rows keep
+PLAYLIST_POSITIONS_BACKFILL = f"UPDATE PLAYLIST_SONGS SET Position = Song_ID * {PLAYLIST_POSITION_GAP}"
+
+# Columns added to existing tables, with the statements that fill them in for old rows
+COLUMN_BACKFILLS = {
+    ("PLAYLIST_SONGS", "Position"): [PLAYLIST_POSITIONS_BACKFILL],
+}
+
+# Read models that are derived from other tables, with the statements that fill them
+READ_MODEL_REBUILDS = {
+    "USER_STATS": [USER_STATS_REBUILD],
+    "SONG_RATINGS": [SONG_RATINGS_REBUILD],
+    "USER_ACTIVITY_DAILY": ACTIVITY_SONG_BACKFILL + [USER_ACTIVITY_DAILY_REBUILD.format(where="")],
+    "RECOMMENDATION_REFRESHES": [RECOMMENDATION_REFRESHES_BACKFILL],
+}
+
+# (table, index name, columns) for the filters and sort orders each page uses.
+# InnoDB appends the primary key to secondary indexes, so (Play_Count) also
+# serves ORDER BY Play_Count, Song_ID keyset pages.
+HOT_PATH_INDEXES = [
+    ("SONGS", "idx_songs_user_upload", ("User_ID", "Upload_Date")),        # dashboard recent uploads
+    ("SONGS", "idx_songs_popularity", ("Play_Count",)),                   # all songs, popularity report
+    ("SONGS", "idx_songs_genre_popularity", ("Genre", "Play_Count")),     # genre pages, genre list
+    ("SONGS", "idx_songs_title", ("Title",)),                             # admin grid, title prefix search
+    ("SONGS", "idx_songs_upload_date", ("Upload_Date",)),                 # admin grid
+    ("COMMENTS", "idx_comments_song_time", ("Song_ID", "Timestamp")),     # song comments, newest first
+    ("TRENDING", "idx_trending_date_plays", ("Trend_Date", "Play_Count")),
+    ("USER_ACTIVITY", "idx_activity_user_time", ("User_ID", "Timestamp")),  # recommender
+    ("USER_ACTIVITY", "idx_activity_time", ("Timestamp",)),               # retention, rollup rebuilds
+    ("PLAYLISTS", "idx_playlists_user", ("User_ID",)),                    # playlist page
+    ("PLAYLIST_SONGS", "idx_playlist_songs_position", ("Playlist_ID", "Position")),  # playlist order
+    ("SONGS", "idx_songs_file_path", ("File_Path",)),                     # playlist import
+    ("USERS", "idx_users_created", ("Created_At",)),                      # admin grid
+    ("ARTISTS", "idx_artists_name", ("Name",)),                           # artist list, name prefix search
+]
+
+
+def table_names(cursor) -> Set[str]:
+    """Exact (case-preserved) names of the tables in the current database"""
+    cursor.execute("SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def column_names(cursor, table: str) -> Set[str]:
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def index_columns(cursor, table: str) -> Dict[str, tuple]:
+    """Index name -> indexed columns in order, for the non-FULLTEXT indexes of ``table``"""
+    cursor.execute(
+        "SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_TYPE <> 'FULLTEXT' "
+        "ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+        (table,)
+    )
+    indexes = {}
+    for name, column in cursor.fetchall():
+        indexes[name] = indexes.get(name, ()) + (column,)
+    return indexes
+
+
+def fulltext_indexes(cursor) -> Set[str]:
+    cursor.execute(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND INDEX_TYPE = 'FULLTEXT'"
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def ensure_index(cursor, table: str, name: str, columns: tuple) -> bool:
+    """Add an index unless one with that name, or one starting with ``columns``, exists"""
+    for existing_name, existing in index_columns(cursor, table).items():
+        if existing_name == name or existing[:len(columns)] == tuple(columns):
+            return False
+    cursor.execute(f"ALTER TABLE {table} ADD KEY {name} ({', '.join(columns)})")
+    return True
+
+
+def add_missing_columns(cursor, table: str, definitions: Dict[str, str]):
+    existing = column_names(cursor, table)
+    for column, definition in definitions.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def rename_column(cursor, table: str, old: str, new: str):
+    existing = column_names(cursor, table)
+    if old in existing and new not in existing:
+        cursor.execute(f"ALTER TABLE {table} RENAME COLUMN {old} TO {new}")
+
+
+def create_baseline_tables(cursor):
+    for statement in BASELINE_TABLES:
+        cursor.execute(statement)
+
+
+def reconcile_legacy_schema(cursor):
+    """Bring databases built from the old sql_quiries.sql in line with the app's schema"""
+    rename_column(cursor, "SONGS", "File_Location", "File_Path")
+    add_missing_columns(cursor, "SONGS", {
+        "Cover_Image": "VARCHAR(255)",
+        "User_ID": "INT NULL",
+        "Upload_Date": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+        "Play_Count": "INT DEFAULT 0",
+    })
+    rename_column(cursor, "PLAYLISTS", "Created_By", "User_ID")
+    rename_column(cursor, "PLAYLISTS", "Creation_Date", "Created_At")
+    add_missing_columns(cursor, "USERS", {"Created_At": "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"})
+    add_missing_columns(cursor, "ARTISTS", {"Bio": "TEXT", "Profile_Picture": "VARCHAR(255)"})
+
+    # The old lowercase `trending` table kept one running count per song. On
+    # case-insensitive servers it is the same table as TRENDING, so tell the
+    # two apart by their columns.
+    legacy = next((name for name in table_names(cursor)
+                   if name.lower() == "trending" and "song_id" in column_names(cursor, name)
+                   and "Trend_Date" not in column_names(cursor, name)), None)
+    if legacy:
+        cursor.execute(f"RENAME TABLE {legacy} TO TRENDING_LEGACY")
+        cursor.execute(BASELINE_TABLES[6])
+        cursor.execute(
+            "INSERT INTO TRENDING (Song_ID, Trend_Date, Play_Count) "
+            "SELECT l.song_id, DATE(l.last_updated), SUM(l.play_count) "
+            "FROM TRENDING_LEGACY l JOIN SONGS s ON s.Song_ID = l.song_id "
+            "GROUP BY l.song_id, DATE(l.last_updated) "
+            "ON DUPLICATE KEY UPDATE Play_Count = TRENDING.Play_Count + VALUES(Play_Count)"
+        )
+
+
+def add_search_indexes(cursor):
+    add_missing_columns(cursor, "SONGS", {"Album": "VARCHAR(100) AFTER Title"})
+    existing = fulltext_indexes(cursor)
+    if "ft_songs" not in existing:
+        cursor.execute("ALTER TABLE SONGS ADD FULLTEXT KEY ft_songs (Title, Album, Genre)")
+    if "ft_artists" not in existing:
+        cursor.execute("ALTER TABLE ARTISTS ADD FULLTEXT KEY ft_artists (Name)")
+
+
+def create_user_stats(cursor):
+    if "USER_STATS" not in table_names(cursor):
+        cursor.execute(USER_STATS_TABLE)
+        cursor.execute(USER_STATS_REBUILD)
+
+
+def create_recommendations(cursor):
+    cursor.execute(RECOMMENDATIONS_TABLE)
+    add_missing_columns(cursor, "RECOMMENDATIONS", {"Score": "FLOAT NOT NULL DEFAULT 0 AFTER Song_ID"})
+    ensure_index(cursor, "RECOMMENDATIONS", "idx_recommendations_user", ("User_ID", "Score"))
+
+
+def create_media_files(cursor):
+    cursor.execute(MEDIA_FILES_TABLE)
+
+
+def create_trending_hourly(cursor):
+    cursor.execute(TRENDING_HOURLY_TABLE)
+
+
+def add_hot_path_indexes(cursor):
+    for table, name, columns in HOT_PATH_INDEXES:
+        ensure_index(cursor, table, name, columns)
+
+
+def create_song_ratings(cursor):
+    if "SONG_RATINGS" not in table_names(cursor):
+        cursor.execute(SONG_RATINGS_TABLE)
+        cursor.execute(SONG_RATINGS_REBUILD)
+
+
+def create_activity_rollups(cursor):
+    add_missing_columns(cursor, "USER_ACTIVITY", {"Song_ID": "INT NULL AFTER Activity_Type"})
+    ensure_index(cursor, "USER_ACTIVITY", "idx_activity_time", ("Timestamp",))
+    if "USER_ACTIVITY_DAILY" not in table_names(cursor):
+        cursor.execute(USER_ACTIVITY_DAILY_TABLE)
+        for statement in READ_MODEL_REBUILDS["USER_ACTIVITY_DAILY"]:
+            cursor.execute(statement)
+
+
+def add_playlist_positions(cursor):
+    if "Position" not in column_names(cursor, "PLAYLIST_SONGS"):
+        cursor.execute("ALTER TABLE PLAYLIST_SONGS ADD COLUMN Position DOUBLE NOT NULL DEFAULT 0")
+        for statement in COLUMN_BACKFILLS[("PLAYLIST_SONGS", "Position")]:
+            cursor.execute(statement)
+    ensure_index(cursor, "PLAYLIST_SONGS", "idx_playlist_songs_position", ("Playlist_ID", "Position"))
+    ensure_index(cursor, "SONGS", "idx_songs_file_path", ("File_Path",))
+
+
+def add_interaction_times(cursor):
+    # NULL for rows written before this migration; only later changes need a time
+    add_missing_columns(cursor, "RATINGS", {"Rated_At": "DATETIME NULL"})
+    add_missing_columns(cursor, "PLAYLIST_SONGS", {"Added_At": "DATETIME NULL"})
+
+
+def create_recommendation_refreshes(cursor):
+    if "RECOMMENDATION_REFRESHES" not in table_names(cursor):
+        cursor.execute(RECOMMENDATION_REFRESHES_TABLE)
+        cursor.execute(RECOMMENDATION_REFRESHES_BACKFILL)
+
+
+MIGRATIONS = [
+    Migration(1, "baseline tables", create_baseline_tables),
+    Migration(2, "reconcile sql_quiries.sql schema", reconcile_legacy_schema),
+    Migration(3, "full-text search", add_search_indexes),
+    Migration(4, "user stats read model", create_user_stats),
+    Migration(5, "recommendations", create_recommendations),
+    Migration(6, "content-addressed media files", create_media_files),
+    Migration(7, "hourly trending buckets", create_trending_hourly),
+    Migration(8, "hot-path indexes", add_hot_path_indexes),
+    Migration(9, "song rating aggregates", create_song_ratings),
+    Migration(10, "daily activity rollups", create_activity_rollups),
+    Migration(11, "playlist positions", add_playlist_positions),
+    Migration(12, "rating and playlist times", add_interaction_times),
+    Migration(13, "recommendation refresh times", create_recommendation_refreshes),
+]
+
+# Every table the app uses, parents before children; with ADDED_COLUMNS, the
+# schema as of the latest migration
+CURRENT_TABLES = BASELINE_TABLES + [USER_STATS_TABLE, RECOMMENDATIONS_TABLE, MEDIA_FILES_TABLE, TRENDING_HOURLY_TABLE,
+                                    SONG_RATINGS_TABLE, USER_ACTIVITY_DAILY_TABLE, RECOMMENDATION_REFRESHES_TABLE]
+
+
+def applied_versions(cursor) -> Set[int]:
+    cursor.execute(MIGRATIONS_TABLE)
+    cursor.execute("SELECT Version FROM SCHEMA_MIGRATIONS")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending_migrations(cursor) -> List[Migration]:
+    applied = applied_versions(cursor)
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+def migrate(conn) -> List[Migration]:
+    """Apply pending migrations in order on ``conn``; returns those applied"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+        if not cursor.fetchone()[0]:
+            raise RuntimeError("Timed out waiting for another process to finish migrating")
+        try:
+            applied = []
+            for migration in pending_migrations(cursor):
+                migration.apply(cursor)
+                cursor.execute(
+                    "INSERT INTO SCHEMA_MIGRATIONS (Version, Name) VALUES (%s, %s)",
+                    (migration.version, migration.name)
+                )
+                conn.commit()
+                applied.append(migration)
+            return applied
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def schema_version(conn) -> int:
+    cursor = conn.cursor()
+    try:
+        return max(applied_versions(cursor), default=0)
+    finally:
+        cursor.close()
+
+
+def full_scans(cursor, query: str, params=()) -> List[Dict]:
+    """EXPLAIN ``query`` and return the plan rows that read a whole base table.
+
+    Derived tables and UNION results (``<derived2>``, ``<union1,2>``) are
+    skipped; they are already bounded by the inner query's LIMIT.
+    """
+    cursor.execute("EXPLAIN " + query, params)
+    columns = cursor.column_names
+    plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return [row for row in plan
+            if row.get('type') == "ALL" and row.get('table') and not row['table'].startswith("<")]
+
+
+def explain_queries(conn, queries: Iterable[tuple]) -> Dict[str, List[Dict]]:
+    """Run ``full_scans`` for each (label, query, params); returns label -> offending plan rows"""
+    cursor = conn.cursor()
+    try:
+        report = {}
+        for label, query, params in queries:
+            scans = full_scans(cursor, query, params)
+            if scans:
+                report[label] = scans
+        return report
+    finally:
+        cursor.close()
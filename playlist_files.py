@@ -0,0 +1,189 @@
+"""M3U and CSV playlist import and export.
+
+Imports are read as a stream of entries and resolved against SONGS a batch at
+a time: one lookup each by Song_ID, by File_Path and by title, whatever the
+batch size, so a playlist of thousands of entries costs a handful of queries
+rather than one per line. Each resolved batch is appended with
+``DatabaseManager.add_to_playlist``.
+
+Exports stream the playlist in order through ``stream_query``, like the admin
+exports, and write M3U (``#EXTINF`` lines with the stored file paths) or CSV.
+"""
+import csv
+import io
+import os
+import re
+from collections import namedtuple
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+
+from exports import Chunk, export_path, write_csv
+
+IMPORT_BATCH = int(os.getenv("PLAYLIST_IMPORT_BATCH", "500"))
+PLAYLIST_FORMATS = {"M3U": "m3u", "CSV": "csv"}
+IMPORT_EXTENSIONS = ["m3u", "m3u8", "csv"]
+
+# One line of an imported playlist; any field may be missing
+Entry = namedtuple("Entry", ["song_id", "path", "title", "artist"])
+
+PLAYLIST_EXPORT_QUERY = (
+    "SELECT s.Song_ID, s.Title, GROUP_CONCAT(a.Name SEPARATOR ', ') AS Artists, "
+    "s.Album, s.Duration, s.File_Path "
+    "FROM PLAYLIST_SONGS ps "
+    "JOIN SONGS s ON ps.Song_ID = s.Song_ID "
+    "LEFT JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+    "LEFT JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+    "WHERE ps.Playlist_ID = %s "
+    "GROUP BY ps.Position, s.Song_ID, s.Title, s.Album, s.Duration, s.File_Path "
+    "ORDER BY ps.Position, s.Song_ID"
+)
+
+
+def split_artist_title(text: str) -> Tuple[str, str]:
+    """Split "Artist - Title"; text without the separator is all title"""
+    artist, sep, title = text.partition(" - ")
+    return (artist.strip(), title.strip()) if sep else ("", text.strip())
+
+
+def read_m3u(lines: Iterable[str]) -> Iterator[Entry]:
+    info = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#EXTINF:"):
+            _, _, info = line.partition(",")
+            continue
+        if line.startswith("#"):
+            continue
+        # Without an #EXTINF line the file name is the best guess at artist and title
+        artist, title = split_artist_title(info if info is not None else
+                                           os.path.splitext(os.path.basename(line.replace("\\", "/")))[0])
+        yield Entry(None, line, title or None, artist or None)
+        info = None
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[Entry]:
+    reader = csv.DictReader(lines)
+    for row in reader:
+        row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+        song_id = row.get("song_id", "")
+        yield Entry(int(song_id) if song_id.isdigit() else None,
+                    row.get("file_path") or None,
+                    row.get("title") or None,
+                    row.get("artists") or row.get("artist") or None)
+
+
+def read_playlist(stream: BinaryIO, name: str) -> Iterator[Entry]:
+    """Entries of an uploaded .m3u, .m3u8 or .csv file, read as they are consumed.
+
+    Raises ValueError for any other file type.
+    """
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    if extension not in IMPORT_EXTENSIONS:
+        raise ValueError(f"Unsupported playlist file: {name}")
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    return read_csv(text) if extension == "csv" else read_m3u(text)
+
+
+def placeholders(values) -> str:
+    return ", ".join(["%s"] * len(values))
+
+
+def resolve(db, batch: List[Entry]) -> List:
+    """Song_ID for each entry of ``batch`` (None where nothing matched).
+
+    An entry's Song_ID wins, then its file path, then its title; a title
+    shared by several songs goes to the most played one by the entry's
+    artist, or the most played one overall when the entry names no artist.
+    """
+    ids = tuple({e.song_id for e in batch if e.song_id is not None})
+    paths = tuple({e.path for e in batch if e.path})
+    titles = tuple({e.title for e in batch if e.title})
+
+    known_ids, by_path, by_title = set(), {}, {}
+    if ids:
+        rows = db.execute_query(f"SELECT Song_ID FROM SONGS WHERE Song_ID IN ({placeholders(ids)})", ids)
+        known_ids = {row['Song_ID'] for row in rows or []}
+    if paths:
+        rows = db.execute_query(
+            f"SELECT Song_ID, File_Path FROM SONGS WHERE File_Path IN ({placeholders(paths)})", paths
+        )
+        by_path = {row['File_Path']: row['Song_ID'] for row in rows or []}
+    if titles:
+        rows = db.execute_query(
+            "SELECT s.Song_ID, s.Title, GROUP_CONCAT(a.Name SEPARATOR ', ') AS Artists "
+            "FROM SONGS s "
+            "LEFT JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+            "LEFT JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+            f"WHERE s.Title IN ({placeholders(titles)}) "
+            "GROUP BY s.Song_ID, s.Title, s.Play_Count "
+            "ORDER BY s.Play_Count DESC, s.Song_ID",
+            titles
+        )
+        for row in rows or []:
+            by_title.setdefault(row['Title'].casefold(), []).append(row)
+
+    resolved = []
+    for entry in batch:
+        song_id = entry.song_id if entry.song_id in known_ids else by_path.get(entry.path)
+        if song_id is None and entry.title:
+            candidates = by_title.get(entry.title.casefold(), [])
+            if entry.artist:
+                artist = entry.artist.casefold()
+                candidates = [c for c in candidates if artist in (c['Artists'] or "").casefold()]
+            song_id = candidates[0]['Song_ID'] if candidates else None
+        resolved.append(song_id)
+    return resolved
+
+
+def import_playlist(db, playlist_id: int, entries: Iterable[Entry],
+                    batch_size: int = IMPORT_BATCH) -> Tuple[int, List[Entry]]:
+    """Append every entry that matches a song; returns (songs added, unmatched entries).
+
+    Entries for songs already in the playlist, or repeated in the file, match
+    but add nothing.
+    """
+    added, unmatched = 0, []
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            break
+        song_ids = []
+        for entry, song_id in zip(batch, resolve(db, batch)):
+            if song_id is None:
+                unmatched.append(entry)
+            else:
+                song_ids.append(song_id)
+        count = db.add_to_playlist(playlist_id, song_ids)
+        if count is None:
+            break
+        added += count
+    return added, unmatched
+
+
+def write_m3u(chunks: Iterator[Chunk], path: str) -> int:
+    rows_written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("#EXTM3U\n")
+        for columns, _, rows in chunks:
+            col = {name: i for i, name in enumerate(columns)}
+            for row in rows:
+                duration = row[col['Duration']]
+                label = " - ".join(part for part in (row[col['Artists']], row[col['Title']]) if part)
+                f.write(f"#EXTINF:{duration if duration is not None else -1},{label}\n")
+                f.write(f"{row[col['File_Path']]}\n")
+            rows_written += len(rows)
+    return rows_written
+
+
+def export_playlist(db, playlist_id: int, name: str, fmt: str) -> Tuple[str, int]:
+    """Stream a playlist, in order, to an M3U or CSV file; returns (path, songs written)"""
+    if fmt not in PLAYLIST_FORMATS:
+        raise ValueError(f"Unsupported playlist format: {fmt}")
+    path = export_path(re.sub(r"\W+", "_", name).strip("_") or "playlist", fmt, PLAYLIST_FORMATS)
+    chunks = db.stream_query(PLAYLIST_EXPORT_QUERY, (playlist_id,), site=db.call_site())
+    if fmt == "M3U":
+        return path, write_m3u(chunks, path)
+    return path, write_csv(chunks, path)
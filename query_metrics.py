@@ -0,0 +1,278 @@
+"""Per-query latency metrics and slow-query log.
+
+Every statement run through ``DatabaseManager`` is recorded under its
+fingerprint: the SQL with literals and placeholders replaced by ``?`` and
+IN/VALUES lists collapsed, so ``WHERE Song_ID IN (1, 2, 3)`` and
+``WHERE Song_ID IN (4, 5)`` share one series. Series are further split by
+call site, the module-qualified function that issued the query
+(``views.dashboard.show``, ``views.admin.admin_grid``, ...).
+
+Each series keeps a fixed-bucket latency histogram (percentiles are
+interpolated from the buckets, as Prometheus' ``histogram_quantile`` does),
+rows returned and errors. Queries slower than ``SLOW_QUERY_MS`` are kept,
+with their parameters, in a bounded slow-query log.
+
+The metrics are served in the Prometheus text format by
+``start_metrics_server`` and shown on the admin Performance tab.
+"""
+import hashlib
+import re
+import sys
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OVERFLOW_FINGERPRINT = "<other>"
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_ROWS = re.compile(r"(\(\?\+\))(?:\s*,\s*\(\?\+\))+")
+_WHITESPACE = re.compile(r"\s+")
+_SENSITIVE = re.compile(r"password", re.IGNORECASE)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query: str) -> str:
+    """Normalise a statement so queries differing only in values share a series"""
+    text = _STRING_LITERAL.sub("?", query)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _VALUE_LIST.sub("(?+)", text)
+    text = _REPEATED_ROWS.sub(r"\1, ...", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def fingerprint_id(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def call_site(skip: tuple = (), skip_modules: tuple = ()) -> str:
+    """``module.qualname`` of the nearest calling function that isn't database plumbing.
+
+    Frames in this module, lambdas/comprehensions, methods of the classes in
+    ``skip`` (e.g. ``DatabaseManager``) and functions of the modules in
+    ``skip_modules`` (shared helpers such as the paging controls) are passed
+    over. Every page's entry point is called ``show``, so the module name is
+    what tells the pages apart.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "")
+        if code.co_filename != __file__ and not code.co_name.startswith("<") and module not in skip_modules:
+            owner = frame.f_locals.get("self") if "self" in code.co_varnames else None
+            if not skip or not isinstance(owner, skip):
+                name = getattr(code, "co_qualname", code.co_name)
+                return name if module == "__main__" else f"{module}.{name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def redact(query: str, params):
+    """Params as logged: hidden entirely for statements that touch passwords"""
+    if params is None:
+        return None
+    if _SENSITIVE.search(query):
+        return "<redacted>"
+    if isinstance(params, list):
+        # executemany batches: keep the log entry small
+        return f"{len(params)} rows, first: {params[0]!r}" if params else "0 rows"
+    return repr(params)
+
+
+class QuerySeries:
+    __slots__ = ("fingerprint", "site", "calls", "errors", "rows", "total_seconds", "max_seconds", "buckets")
+
+    def __init__(self, fingerprint: str, site: str):
+        self.fingerprint = fingerprint
+        self.site = site
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, seconds: float, rows: int, error: bool):
+        self.calls += 1
+        self.errors += bool(error)
+        self.rows += rows
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile by linear interpolation inside its bucket"""
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(self.buckets):
+            upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.max_seconds
+            if count and seen + count >= rank:
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max_seconds)
+            seen += count
+            lower = upper
+        return self.max_seconds
+
+
+class QueryMetrics:
+    """Thread-safe registry of query series plus the slow-query log"""
+
+    def __init__(self, slow_threshold: float = 0.2, slow_log_size: int = 200, max_series: int = 1000):
+        self.slow_threshold = slow_threshold
+        self.max_series = max_series
+        self._series: Dict[tuple, QuerySeries] = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._gauges: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, query: str, seconds: float, rows: int = 0, error: Optional[Exception] = None,
+               site: str = "unknown", params=None):
+        text = fingerprint(query)
+        key = (text, site)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    key = (OVERFLOW_FINGERPRINT, site)
+                    series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = QuerySeries(key[0], site)
+            series.observe(seconds, rows, error is not None)
+            if seconds >= self.slow_threshold:
+                self._slow.append({
+                    "Time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "Milliseconds": round(seconds * 1000, 1),
+                    "Site": site,
+                    "Query": text,
+                    "Params": redact(query, params),
+                    "Rows": rows,
+                    "Error": str(error) if error else "",
+                })
+
+    def add_gauges(self, name: str, collect: Callable[[], Dict[str, float]]):
+        """Export ``collect()`` (e.g. pool or cache stats) as ``audily_<name>_<key>`` gauges"""
+        self._gauges[name] = collect
+
+    def summary(self) -> List[Dict]:
+        """One row per (fingerprint, site), slowest total time first"""
+        with self._lock:
+            series = list(self._series.values())
+            rows = [{
+                "Site": s.site,
+                "Query": s.fingerprint,
+                "Calls": s.calls,
+                "Errors": s.errors,
+                "Rows": s.rows,
+                "Total ms": round(s.total_seconds * 1000, 1),
+                "Avg ms": round(s.total_seconds * 1000 / s.calls, 2) if s.calls else 0.0,
+                "p50 ms": round(s.quantile(0.50) * 1000, 2),
+                "p95 ms": round(s.quantile(0.95) * 1000, 2),
+                "p99 ms": round(s.quantile(0.99) * 1000, 2),
+                "Max ms": round(s.max_seconds * 1000, 2),
+            } for s in series]
+        return sorted(rows, key=lambda row: row["Total ms"], reverse=True)
+
+    def slow_queries(self) -> List[Dict]:
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._slow.clear()
+            self.started_at = time.time()
+
+    def prometheus_text(self) -> str:
+        """Render every series in the Prometheus text exposition format"""
+        with self._lock:
+            series = [(s.fingerprint, s.site, s.calls, s.errors, s.rows, s.total_seconds, list(s.buckets))
+                      for s in self._series.values()]
+
+        lines = [
+            "# HELP audily_query_info Fingerprinted SQL text for each query_id.",
+            "# TYPE audily_query_info gauge",
+        ]
+        for text in sorted({s[0] for s in series}):
+            lines.append(f'audily_query_info{{query_id="{fingerprint_id(text)}",query="{_label(text)}"}} 1')
+
+        lines += [
+            "# HELP audily_query_duration_seconds Time spent executing each query.",
+            "# TYPE audily_query_duration_seconds histogram",
+        ]
+        for text, site, calls, _, _, total, buckets in series:
+            labels = f'query_id="{fingerprint_id(text)}",site="{_label(site)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += count
+                lines.append(f'audily_query_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'audily_query_duration_seconds_bucket{{{labels},le="+Inf"}} {calls}')
+            lines.append(f"audily_query_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"audily_query_duration_seconds_count{{{labels}}} {calls}")
+
+        for metric, index, help_text in (("errors", 3, "Queries that raised a database error."),
+                                         ("rows", 4, "Rows returned or affected.")):
+            lines += [f"# HELP audily_query_{metric}_total {help_text}",
+                      f"# TYPE audily_query_{metric}_total counter"]
+            for s in series:
+                labels = f'query_id="{fingerprint_id(s[0])}",site="{_label(s[1])}"'
+                lines.append(f"audily_query_{metric}_total{{{labels}}} {s[index]}")
+
+        for name, collect in list(self._gauges.items()):
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    lines.append(f"# TYPE audily_{name}_{key} gauge")
+                    lines.append(f"audily_{name}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def start_metrics_server(metrics: QueryMetrics, host: str, port: int) -> Optional[ThreadingHTTPServer]:
+    """Serve ``/metrics`` from a daemon thread; returns None if the port is taken"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            body = metrics.prometheus_text().encode()
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ Metrics server not started on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
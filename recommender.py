@@ -0,0 +1,187 @@
+"""Offline item-item collaborative filtering for "Recommended For You".
+
+Builds a sparse user x song matrix from ratings, play logs and playlist
+membership, scores each user's unseen songs by cosine item similarity and
+stores the top N per user in RECOMMENDATIONS, where the dashboard reads them
+with a single indexed lookup.
+
+Run with ``python maintenance.py refresh-recommendations [--full]``.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from database import DatabaseManager
+
+# How much each kind of interaction counts towards a user's affinity for a song
+RATING_WEIGHT = 1.0
+PLAY_WEIGHT = 1.0
+PLAYLIST_WEIGHT = 2.0
+
+NEIGHBOURS = 50       # similar songs kept per song
+TOP_N = 20            # recommendations stored per user
+WRITE_BATCH_USERS = 500
+
+
+class Recommender:
+    def __init__(self, db: DatabaseManager, top_n: int = TOP_N, neighbours: int = NEIGHBOURS):
+        self.db = db
+        self.top_n = top_n
+        self.neighbours = neighbours
+
+    def load_interactions(self) -> Optional[tuple]:
+        """Return parallel (user_ids, song_ids, weights) arrays, one entry per signal"""
+        ratings = self.db.execute_query(
+            "SELECT User_ID, Song_ID, Rating_Value AS Weight FROM RATINGS WHERE Rating_Value > 0"
+        )
+        # From the daily rollups, which keep counting plays whose raw rows were compacted
+        plays = self.db.execute_query(
+            "SELECT d.User_ID, d.Song_ID, SUM(d.Activity_Count) AS Weight "
+            "FROM USER_ACTIVITY_DAILY d "
+            "JOIN SONGS s ON s.Song_ID = d.Song_ID "
+            "WHERE d.Activity_Type = 'play' "
+            "GROUP BY d.User_ID, d.Song_ID"
+        )
+        playlisted = self.db.execute_query(
+            "SELECT p.User_ID, ps.Song_ID, COUNT(*) AS Weight "
+            "FROM PLAYLISTS p JOIN PLAYLIST_SONGS ps ON p.Playlist_ID = ps.Playlist_ID "
+            "GROUP BY p.User_ID, ps.Song_ID"
+        )
+        if not all(isinstance(rows, list) for rows in (ratings, plays, playlisted)):
+            return None
+
+        def columns(rows: List[Dict], transform) -> tuple:
+            users = np.fromiter((r['User_ID'] for r in rows), dtype=np.int64, count=len(rows))
+            songs = np.fromiter((r['Song_ID'] for r in rows), dtype=np.int64, count=len(rows))
+            weights = transform(np.fromiter((float(r['Weight']) for r in rows), dtype=np.float64, count=len(rows)))
+            return users, songs, weights
+
+        parts = [
+            columns(ratings, lambda w: RATING_WEIGHT * w / 5.0),
+            columns(plays, lambda w: PLAY_WEIGHT * np.log1p(w)),
+            columns(playlisted, lambda w: PLAYLIST_WEIGHT * np.minimum(w, 1.0)),
+        ]
+        return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
+
+    @staticmethod
+    def build_matrix(user_ids: np.ndarray, song_ids: np.ndarray, weights: np.ndarray) -> tuple:
+        """Sparse user x song matrix; duplicate (user, song) signals are summed"""
+        users, user_rows = np.unique(user_ids, return_inverse=True)
+        songs, song_cols = np.unique(song_ids, return_inverse=True)
+        matrix = sparse.csr_matrix((weights, (user_rows, song_cols)), shape=(len(users), len(songs)))
+        matrix.sum_duplicates()
+        return matrix, users, songs
+
+    def item_similarity(self, matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+        """Cosine similarity between songs, pruned to the top ``neighbours`` per song"""
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+        norms[norms == 0] = 1.0
+        normalized = (matrix @ sparse.diags(1.0 / norms)).tocsc()
+        similarity = (normalized.T @ normalized).tocsr()
+        similarity.setdiag(0)
+        similarity.eliminate_zeros()
+
+        # Keep only the strongest neighbours in each row
+        indptr, data = similarity.indptr, similarity.data
+        for row in range(similarity.shape[0]):
+            start, end = indptr[row], indptr[row + 1]
+            if end - start > self.neighbours:
+                row_data = data[start:end]
+                cutoff = np.partition(row_data, -self.neighbours)[-self.neighbours]
+                row_data[row_data < cutoff] = 0
+        similarity.eliminate_zeros()
+        return similarity
+
+    def top_n_for(self, matrix: sparse.csr_matrix, similarity: sparse.csr_matrix,
+                  rows: np.ndarray) -> List[tuple]:
+        """Return (row, song column, score) triples for the given user rows"""
+        scores = (matrix[rows] @ similarity).tocsr()
+        seen = matrix[rows].tocsr()
+        results = []
+        for i, row in enumerate(rows):
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            cols, vals = scores.indices[start:end], scores.data[start:end]
+            unseen = ~np.isin(cols, seen.indices[seen.indptr[i]:seen.indptr[i + 1]])
+            cols, vals = cols[unseen], vals[unseen]
+            if len(cols) > self.top_n:
+                best = np.argpartition(vals, -self.top_n)[-self.top_n:]
+                cols, vals = cols[best], vals[best]
+            results.extend((row, col, val) for col, val in zip(cols, vals))
+        return results
+
+    def stale_users(self) -> Optional[set]:
+        """Users who played, rated or playlisted a song since their recommendations were last computed"""
+        rows = self.db.execute_query(
+            "SELECT DISTINCT a.User_ID "
+            "FROM (SELECT User_ID, MAX(Timestamp) AS Last_Seen FROM USER_ACTIVITY GROUP BY User_ID "
+            "      UNION ALL "
+            "      SELECT User_ID, MAX(Rated_At) FROM RATINGS GROUP BY User_ID "
+            "      UNION ALL "
+            "      SELECT p.User_ID, MAX(ps.Added_At) "
+            "      FROM PLAYLISTS p JOIN PLAYLIST_SONGS ps ON p.Playlist_ID = ps.Playlist_ID "
+            "      GROUP BY p.User_ID) a "
+            "LEFT JOIN RECOMMENDATION_REFRESHES r ON r.User_ID = a.User_ID "
+            "WHERE a.Last_Seen IS NOT NULL AND (r.Refreshed_At IS NULL OR a.Last_Seen > r.Refreshed_At)"
+        )
+        if not isinstance(rows, list):
+            return None
+        return {r['User_ID'] for r in rows}
+
+    def refresh(self, full: bool = False) -> int:
+        """Recompute recommendations and return how many users were updated.
+
+        Similarities are always computed from the full matrix; without ``full``
+        only users with new activity get their rows rewritten. Every user
+        looked at is stamped in RECOMMENDATION_REFRESHES with the time the
+        refresh started, including users who end up with no recommendations,
+        so they aren't picked up again until they do something new.
+        """
+        started = self.db.execute_query("SELECT NOW() AS Started")
+        if not isinstance(started, list):
+            return 0
+        started = started[0]['Started']
+        interactions = self.load_interactions()
+        if interactions is None or not len(interactions[0]):
+            return 0
+
+        matrix, users, songs = self.build_matrix(*interactions)
+        similarity = self.item_similarity(matrix)
+
+        if full:
+            rows = np.arange(len(users))
+        else:
+            stale = self.stale_users()
+            if stale is None:
+                return 0
+            rows = np.flatnonzero(np.isin(users, list(stale)))
+            # Users whose new activity isn't a signal (e.g. a zero rating) have nothing to compute
+            unscored = list(stale - set(users.tolist()))
+            if unscored and not self.db.execute_transaction([self.stamp(unscored, started)]):
+                return 0
+
+        for start in range(0, len(rows), WRITE_BATCH_USERS):
+            batch = rows[start:start + WRITE_BATCH_USERS]
+            user_ids = [int(users[row]) for row in batch]
+            placeholders = ", ".join(["%s"] * len(user_ids))
+            recommendations = [
+                (int(users[row]), int(songs[col]), float(score))
+                for row, col, score in self.top_n_for(matrix, similarity, batch)
+            ]
+            statements = [(f"DELETE FROM RECOMMENDATIONS WHERE User_ID IN ({placeholders})", tuple(user_ids)),
+                          self.stamp(user_ids, started)]
+            if recommendations:
+                statements.append((
+                    "INSERT INTO RECOMMENDATIONS (User_ID, Song_ID, Score) VALUES (%s, %s, %s)",
+                    recommendations
+                ))
+            if not self.db.execute_transaction(statements):
+                return start
+        return len(rows)
+
+    @staticmethod
+    def stamp(user_ids: List[int], refreshed_at) -> tuple:
+        """Statement recording that ``user_ids`` were refreshed at ``refreshed_at``"""
+        return ("INSERT INTO RECOMMENDATION_REFRESHES (User_ID, Refreshed_At) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE Refreshed_At = VALUES(Refreshed_At)",
+                [(user_id, refreshed_at) for user_id in user_ids])
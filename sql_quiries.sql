@@ -1,20 +1,29 @@
-CREATE DATABASE IF NOT EXISTS music_app;
-USE music_app;
+-- Reference schema for the Audily database, matching what migrations.py
+-- builds. The app creates and upgrades the database itself; this file is for
+-- setting one up by hand.
+CREATE DATABASE IF NOT EXISTS MUSIC_APP;
+USE MUSIC_APP;
  
 -- Create USERS table
 CREATE TABLE USERS (
     User_ID INT PRIMARY KEY AUTO_INCREMENT,
     Username VARCHAR(50) NOT NULL UNIQUE,
-    Email VARCHAR(100) NOT NULL UNIQUE,
-    Password VARCHAR(255) NOT NULL,
+    Email VARCHAR(100) NOT NULL,
+    Password VARCHAR(100) NOT NULL,
     Profile_Picture VARCHAR(255),
-    Subscription_Type ENUM('Free', 'Premium', 'Family') DEFAULT 'Free'
+    Subscription_Type VARCHAR(20) DEFAULT 'Free',
+    Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_users_created (Created_At)
 );
 
 -- Create ARTISTS table
 CREATE TABLE ARTISTS (
     Artist_ID INT PRIMARY KEY AUTO_INCREMENT,
-    Name VARCHAR(100) NOT NULL
+    Name VARCHAR(100) NOT NULL,
+    Bio TEXT,
+    Profile_Picture VARCHAR(255),
+    KEY idx_artists_name (Name),
+    FULLTEXT KEY ft_artists (Name)
 );
 
 -- Create SONGS table
@@ -22,85 +31,138 @@ CREATE TABLE SONGS (
     Song_ID INT PRIMARY KEY AUTO_INCREMENT,
     Title VARCHAR(100) NOT NULL,
     Album VARCHAR(100),
-    Genre VARCHAR(50),
-    Release_Date DATE,
     Duration INT NOT NULL COMMENT 'Duration in seconds',
-    File_Location VARCHAR(255) NOT NULL
+    Genre VARCHAR(50),
+    File_Path VARCHAR(255) NOT NULL,
+    Cover_Image VARCHAR(255),
+    User_ID INT NOT NULL,
+    Upload_Date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Play_Count INT DEFAULT 0,
+    FOREIGN KEY (User_ID) REFERENCES USERS(User_ID),
+    KEY idx_songs_user_upload (User_ID, Upload_Date),
+    KEY idx_songs_popularity (Play_Count),
+    KEY idx_songs_genre_popularity (Genre, Play_Count),
+    KEY idx_songs_title (Title),
+    KEY idx_songs_upload_date (Upload_Date),
+    FULLTEXT KEY ft_songs (Title, Album, Genre)
+);
+
+-- Create SONG_ARTISTS junction table
+CREATE TABLE SONG_ARTISTS (
+    Song_ID INT NOT NULL,
+    Artist_ID INT NOT NULL,
+    PRIMARY KEY (Song_ID, Artist_ID),
+    FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID),
+    FOREIGN KEY (Artist_ID) REFERENCES ARTISTS(Artist_ID)
 );
 
 -- Create PLAYLISTS table
 CREATE TABLE PLAYLISTS (
     Playlist_ID INT PRIMARY KEY AUTO_INCREMENT,
     Name VARCHAR(100) NOT NULL,
-    Created_By INT NOT NULL,
-    Creation_Date DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (Created_By) REFERENCES USERS(User_ID) ON DELETE CASCADE
+    User_ID INT NOT NULL,
+    Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (User_ID) REFERENCES USERS(User_ID),
+    KEY idx_playlists_user (User_ID)
+);
+
+-- Create PLAYLIST_SONGS junction table
+CREATE TABLE PLAYLIST_SONGS (
+    Playlist_ID INT NOT NULL,
+    Song_ID INT NOT NULL,
+    PRIMARY KEY (Playlist_ID, Song_ID),
+    FOREIGN KEY (Playlist_ID) REFERENCES PLAYLISTS(Playlist_ID),
+    FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID)
+);
+
+-- Create TRENDING table (daily play counts)
+CREATE TABLE TRENDING (
+    Trend_ID INT PRIMARY KEY AUTO_INCREMENT,
+    Song_ID INT NOT NULL,
+    Trend_Date DATE NOT NULL,
+    Play_Count INT DEFAULT 0,
+    FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID),
+    UNIQUE KEY (Song_ID, Trend_Date),
+    KEY idx_trending_date_plays (Trend_Date, Play_Count)
+);
+
+-- Create TRENDING_HOURLY table (checkpoint for the trending engine)
+CREATE TABLE TRENDING_HOURLY (
+    Song_ID INT NOT NULL,
+    Bucket_Hour DATETIME NOT NULL,
+    Play_Count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Song_ID, Bucket_Hour),
+    KEY idx_trending_hourly_bucket (Bucket_Hour),
+    FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID) ON DELETE CASCADE
 );
 
 -- Create COMMENTS table
 CREATE TABLE COMMENTS (
     Comment_ID INT PRIMARY KEY AUTO_INCREMENT,
     Comment_Text TEXT NOT NULL,
-    Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
     User_ID INT NOT NULL,
     Song_ID INT NOT NULL,
-    FOREIGN KEY (User_ID) REFERENCES USERS(User_ID) ON DELETE CASCADE,
-    FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID) ON DELETE CASCADE
+    Timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (User_ID) REFERENCES USERS(User_ID),
+    FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID),
+    KEY idx_comments_song_time (Song_ID, Timestamp)
 );
 
 -- Create RATINGS table
 CREATE TABLE RATINGS (
     Rating_ID INT PRIMARY KEY AUTO_INCREMENT,
-    Rating_Value DECIMAL(2,1) NOT NULL CHECK (Rating_Value BETWEEN 0 AND 5),
+    Rating_Value FLOAT NOT NULL,
     User_ID INT NOT NULL,
     Song_ID INT NOT NULL,
-    FOREIGN KEY (User_ID) REFERENCES USERS(User_ID) ON DELETE CASCADE,
-    FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID) ON DELETE CASCADE,
+    FOREIGN KEY (User_ID) REFERENCES USERS(User_ID),
+    FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID),
     UNIQUE (User_ID, Song_ID)
 );
 
+-- Create USER_ACTIVITY table
+CREATE TABLE USER_ACTIVITY (
+    Activity_ID INT PRIMARY KEY AUTO_INCREMENT,
+    User_ID INT NOT NULL,
+    Activity_Type VARCHAR(50) NOT NULL,
+    Activity_Details TEXT,
+    Timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (User_ID) REFERENCES USERS(User_ID),
+    KEY idx_activity_user_time (User_ID, Timestamp)
+);
+
+-- Create USER_STATS table (dashboard counters)
+CREATE TABLE USER_STATS (
+    User_ID INT PRIMARY KEY,
+    Playlist_Count INT NOT NULL DEFAULT 0,
+    Upload_Count INT NOT NULL DEFAULT 0,
+    Total_Plays BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (User_ID) REFERENCES USERS(User_ID)
+);
+
 -- Create RECOMMENDATIONS table
 CREATE TABLE RECOMMENDATIONS (
     Recommendation_ID INT PRIMARY KEY AUTO_INCREMENT,
     User_ID INT NOT NULL,
     Song_ID INT NOT NULL,
+    Score FLOAT NOT NULL DEFAULT 0,
     Recommendation_Date DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (User_ID) REFERENCES USERS(User_ID) ON DELETE CASCADE,
-    FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID) ON DELETE CASCADE
-);
-
--- Create USER_LOGS table
-CREATE TABLE USER_LOGS (
-    Log_ID INT PRIMARY KEY AUTO_INCREMENT,
-    User_ID INT NOT NULL,
-    Activity VARCHAR(255) NOT NULL,
-    Log_Date DATETIME DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (User_ID) REFERENCES USERS(User_ID) ON DELETE CASCADE
-);
-
--- Create SONG_ARTISTS junction table
-CREATE TABLE SONG_ARTISTS (
-    Song_ID INT NOT NULL,
-    Artist_ID INT NOT NULL,
-    PRIMARY KEY (Song_ID, Artist_ID),
     FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID) ON DELETE CASCADE,
-    FOREIGN KEY (Artist_ID) REFERENCES ARTISTS(Artist_ID) ON DELETE CASCADE
+    KEY idx_recommendations_user (User_ID, Score)
 );
 
--- Create PLAYLIST_SONGS junction table
-CREATE TABLE PLAYLIST_SONGS (
-    Playlist_ID INT NOT NULL,
-    Song_ID INT NOT NULL,
-    Added_Date DATETIME DEFAULT CURRENT_TIMESTAMP,
-    PRIMARY KEY (Playlist_ID, Song_ID),
-    FOREIGN KEY (Playlist_ID) REFERENCES PLAYLISTS(Playlist_ID) ON DELETE CASCADE,
-    FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID) ON DELETE CASCADE
+-- Create MEDIA_FILES table (content-addressed audio)
+CREATE TABLE MEDIA_FILES (
+    Content_Hash CHAR(64) PRIMARY KEY,
+    File_Path VARCHAR(255) NOT NULL UNIQUE,
+    Size_Bytes BIGINT NOT NULL,
+    Duration INT NOT NULL,
+    Ref_Count INT NOT NULL DEFAULT 0
 );
 
-CREATE TABLE trending (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    song_id INT NOT NULL,
-    play_count INT DEFAULT 0,
-    last_updated DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    FOREIGN KEY (song_id) REFERENCES songs(id)
+-- Create SCHEMA_MIGRATIONS table (versions applied by migrations.py)
+CREATE TABLE SCHEMA_MIGRATIONS (
+    Version INT PRIMARY KEY,
+    Name VARCHAR(100) NOT NULL,
+    Applied_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
\ No newline at end of file
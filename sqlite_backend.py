@@ -0,0 +1,519 @@
+"""Embedded SQLite backend (``DB_BACKEND=sqlite``).
+
+Runs the whole app against one database file at ``SQLITE_PATH`` instead of a
+MySQL server. Connections use WAL journaling, so page reads never wait on the
+play-event writer, and the app's SQL is rewritten on the way in
+(``translate``) for the MySQL-isms it relies on:
+
+- ``ON DUPLICATE KEY UPDATE c = VALUES(c)`` becomes ``ON CONFLICT DO UPDATE SET c = excluded.c``;
+- ``GROUP_CONCAT(x SEPARATOR ', ')``, ``CURDATE()``, ``NOW()``, ``LAST_INSERT_ID()``,
+  ``GREATEST`` and ``LEAST`` map to their SQLite spellings;
+- ``SET @var = ...`` session variables live in a per-connection temp table;
+- ``UPDATE a JOIN b ON ... SET ...`` becomes ``UPDATE a ... FROM b WHERE ...``;
+- ``TRUNCATE TABLE``, ``ANALYZE TABLE`` and ``SET FOREIGN_KEY_CHECKS`` for the benchmark generator.
+
+The schema is built in one transaction straight from the current table
+definitions (``migrations.CURRENT_TABLES``) rather than by replaying the
+MySQL migrations. Errors are re-raised as their ``mysql.connector``
+counterparts so callers handle both engines alike. There is no full-text
+index; search falls back to LIKE matching.
+"""
+import math
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+from mysql.connector import FieldType, errors
+
+import migrations
+
+PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),       # WAL stays consistent; only the last commits can be lost on power failure
+    ("foreign_keys", "ON"),
+    ("busy_timeout", "5000"),        # ms a writer waits for another writer before "database is locked"
+    ("cache_size", "-65536"),        # 64 MiB page cache per connection
+    ("temp_store", "MEMORY"),
+    ("mmap_size", str(256 * 1024 * 1024)),
+]
+
+# Rows read ahead to infer column types for ``cursor.description``
+TYPE_SAMPLE_ROWS = 64
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()[:10]))
+
+
+def mysql_error(e: sqlite3.Error) -> errors.Error:
+    """The ``mysql.connector`` error the app expects for a sqlite3 error"""
+    message = str(e)
+    if isinstance(e, sqlite3.IntegrityError):
+        return errors.IntegrityError(msg=message)
+    if isinstance(e, sqlite3.DataError):
+        return errors.DataError(msg=message)
+    if isinstance(e, sqlite3.OperationalError):
+        if re.search(r"disk I/O|unable to open|malformed|not a database", message):
+            # The file itself is unusable; the pool drops connections on OperationalError
+            return errors.OperationalError(msg=message)
+        if "locked" in message or "busy" in message:
+            # Like an InnoDB lock wait timeout: worth retrying, the connection is fine
+            return errors.DatabaseError(msg=message)
+        return errors.ProgrammingError(msg=message)
+    if isinstance(e, sqlite3.ProgrammingError):
+        return errors.ProgrammingError(msg=message)
+    if isinstance(e, sqlite3.InterfaceError):
+        return errors.InterfaceError(msg=message)
+    return errors.DatabaseError(msg=message)
+
+
+_STRING = r"'(?:[^'\\]|\\.|'')*'"
+
+
+def _mask(sql: str) -> str:
+    """``sql`` with string literals and parenthesised text blanked out.
+
+    Positions are preserved, so a keyword found in the mask is at the same
+    offset in ``sql`` and is known to be at the top level of the statement.
+    """
+    masked = re.sub(_STRING, lambda m: " " * len(m.group()), sql)
+    out, depth = [], 0
+    for ch in masked:
+        if ch == "(":
+            depth += 1
+        out.append(" " if depth else ch)
+        if ch == ")":
+            depth -= 1
+    return "".join(out)
+
+
+def _split_top(sql: str) -> List[str]:
+    """Split on commas that aren't inside parentheses or strings"""
+    parts, start = [], 0
+    for m in re.finditer(",", _mask(sql)):
+        parts.append(sql[start:m.start()])
+        start = m.end()
+    return parts + [sql[start:]]
+
+
+def _outside_strings(pattern: str, repl, sql: str) -> str:
+    def replace(m):
+        return m.group() if m.group().startswith("'") else m.expand(repl) if isinstance(repl, str) else repl(m)
+    return re.sub(f"{_STRING}|{pattern}", replace, sql, flags=re.I)
+
+
+_SUBSTITUTIONS = [
+    (r"\s+SEPARATOR\s+", ", "),
+    (r"\bCURDATE\(\)", "date('now', 'localtime')"),
+    (r"\bNOW\(\)", "datetime('now', 'localtime')"),
+    (r"\bLAST_INSERT_ID\(\)", "last_insert_rowid()"),
+    (r"\bGREATEST\(", "MAX("),
+    (r"\bLEAST\(", "MIN("),
+    (r"^\s*INSERT\s+IGNORE\b", "INSERT OR IGNORE"),
+    (r"^\s*TRUNCATE\s+TABLE\b", "DELETE FROM"),
+    (r"^\s*ANALYZE\s+TABLE\b", "ANALYZE"),
+    (r"^\s*SET\s+FOREIGN_KEY_CHECKS\s*=", "PRAGMA foreign_keys ="),
+]
+_SET_VARIABLE = re.compile(r"\s*SET\s+@(\w+)\s*:?=\s*(.*?)\s*$", re.S | re.I)
+_UPDATE_JOIN = re.compile(
+    r"\s*UPDATE\s+(\w+)(?:\s+(?:AS\s+)?(?!JOIN\b)(\w+))?\s+(?:INNER\s+)?JOIN\s+"
+    r"(\w+)(?:\s+(?:AS\s+)?(?!ON\b)(\w+))?\s+ON\s", re.I)
+
+
+def _update_join(sql: str) -> str:
+    m = _UPDATE_JOIN.match(sql)
+    if not m:
+        return sql
+    table, alias, joined, joined_alias = m.group(1), m.group(2) or m.group(1), m.group(3), m.group(4) or m.group(3)
+    masked = _mask(sql)
+    set_at = re.compile(r"\bSET\b", re.I).search(masked, m.end())
+    where_at = re.compile(r"\bWHERE\b", re.I).search(masked, set_at.end())
+    condition = sql[m.end():set_at.start()].strip()
+    assignments = sql[set_at.end():where_at.start() if where_at else len(sql)]
+    # SQLite doesn't allow a qualified column on the left of SET
+    assignments = ", ".join(re.sub(rf"^\s*(?:{alias}|{table})\.", "", a).strip() for a in _split_top(assignments))
+    where = f"({condition})" + (f" AND ({sql[where_at.end():].strip()})" if where_at else "")
+    return f"UPDATE {table} AS {alias} SET {assignments} FROM {joined} AS {joined_alias} WHERE {where}"
+
+
+def _upsert(sql: str) -> str:
+    masked = _mask(sql)
+    m = re.search(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", masked, re.I)
+    if not m:
+        return sql
+    head, assignments, top = sql[:m.start()].rstrip(), sql[m.end():], masked[:m.start()]
+    if re.search(r"\bSELECT\b", top, re.I) and not re.search(r"\bWHERE\b", top, re.I):
+        # Without a WHERE, SQLite reads "SELECT ... FROM t ON CONFLICT" as a join constraint
+        clause = re.search(r"\b(?:GROUP\s+BY|ORDER\s+BY|LIMIT)\b", top, re.I)
+        at = clause.start() if clause else len(head)
+        head = f"{head[:at].rstrip()} WHERE true {head[at:]}".rstrip()
+    assignments = re.sub(r"\bVALUES\((\w+)\)", r"excluded.\1", assignments, flags=re.I)
+    return f"{head} ON CONFLICT DO UPDATE SET {assignments.strip()}"
+
+
+@lru_cache(maxsize=2048)
+def translate(query: str) -> str:
+    """Rewrite a MySQL statement (``%s`` placeholders) for SQLite (``?`` placeholders)"""
+    sql = _outside_strings(r"%s", "?", query)
+    for pattern, repl in _SUBSTITUTIONS:
+        sql = _outside_strings(pattern, repl, sql)
+
+    variable = _SET_VARIABLE.match(sql)
+    if variable:
+        # The temp table is WITHOUT ROWID, so this doesn't move last_insert_rowid()
+        name, expression = variable.groups()
+        return f"INSERT OR REPLACE INTO temp._session_vars (Name, Value) VALUES ('{name}', ({expression}))"
+    sql = _outside_strings(r"@(\w+)", r"(SELECT Value FROM temp._session_vars WHERE Name = '\1')", sql)
+    return _upsert(_update_join(sql))
+
+
+def _concat(*values):
+    return None if any(v is None for v in values) else "".join(str(v) for v in values)
+
+
+def _log10(value):
+    return math.log10(value) if value is not None and value > 0 else None
+
+
+_FIELD_TYPES = [
+    (int, FieldType.LONGLONG),
+    (float, FieldType.DOUBLE),
+    (datetime, FieldType.DATETIME),  # before date, which it subclasses
+    (date, FieldType.DATE),
+    ((bytes, bytearray, memoryview), FieldType.BLOB),
+]
+
+
+class Cursor:
+    """The slice of the mysql.connector cursor API the app uses, over a sqlite3 cursor.
+
+    sqlite3 steps through results lazily, so every cursor already behaves like
+    an unbuffered one and ``buffered=`` is ignored.
+    """
+
+    def __init__(self, raw: sqlite3.Connection, dictionary: bool = False):
+        self._cursor = raw.cursor()
+        self._dictionary = dictionary
+        self._peeked = []
+        self._description = None
+
+    def execute(self, query: str, params=()):
+        self._peeked, self._description = [], None
+        try:
+            self._cursor.execute(translate(query), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+
+    def executemany(self, query: str, seq_params):
+        self._peeked, self._description = [], None
+        try:
+            self._cursor.executemany(translate(query), [tuple(p) for p in seq_params])
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+
+    def _fetch(self, size: int = None) -> list:
+        try:
+            return self._cursor.fetchall() if size is None else self._cursor.fetchmany(size)
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+
+    def _rows(self, rows: list) -> list:
+        if not self._dictionary:
+            return rows
+        columns = self.column_names
+        return [dict(zip(columns, row)) for row in rows]
+
+    @property
+    def column_names(self) -> tuple:
+        return tuple(d[0] for d in self._cursor.description or ())
+
+    @property
+    def description(self):
+        """DB-API description with MySQL type codes guessed from the first rows' values"""
+        if self._cursor.description is None:
+            return None
+        if self._description is None:
+            self._peeked += self._fetch(TYPE_SAMPLE_ROWS)
+            self._description = []
+            for i, column in enumerate(self.column_names):
+                value = next((row[i] for row in self._peeked if row[i] is not None), None)
+                code = next((code for kind, code in _FIELD_TYPES if isinstance(value, kind)), FieldType.VAR_STRING)
+                self._description.append((column, code, None, None, None, None, True))
+        return self._description
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size: int = 1) -> list:
+        rows = self._peeked[:size]
+        del self._peeked[:size]
+        if len(rows) < size:
+            rows += self._fetch(size - len(rows))
+        return self._rows(rows)
+
+    def fetchall(self) -> list:
+        rows, self._peeked = self._peeked + self._fetch(), []
+        return self._rows(rows)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        try:
+            self._cursor.close()
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+
+
+class Connection:
+    """A sqlite3 connection that hands out mysql.connector-style cursors"""
+
+    def __init__(self, raw: sqlite3.Connection):
+        self.raw = raw
+
+    def cursor(self, dictionary: bool = False, buffered: bool = None) -> Cursor:
+        return Cursor(self.raw, dictionary)
+
+    def commit(self):
+        try:
+            self.raw.commit()
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+
+    def rollback(self):
+        try:
+            self.raw.rollback()
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+
+    def close(self):
+        try:
+            self.raw.close()
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+
+
+_COLUMN_REWRITES = [
+    (r"\b(?:BIG)?INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (r"\b(?:BIG)?INT\s+PRIMARY\s+KEY\b", "INTEGER PRIMARY KEY"),  # a rowid alias rather than a second index
+    (r"\bDEFAULT\s+CURRENT_TIMESTAMP\b", "DEFAULT (datetime('now', 'localtime'))"),
+    (r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP\b", ""),
+    (r"\bENUM\s*\([^)]*\)", "TEXT"),
+    (r"\s+UNSIGNED\b", ""),
+    (r"\s+COMMENT\s+'(?:[^']|'')*'", ""),
+    (r"\s+AFTER\s+\w+$", ""),
+]
+_CONSTRAINT = re.compile(r"(?:PRIMARY\s+KEY|FOREIGN\s+KEY|UNIQUE\s*\(|CONSTRAINT|CHECK)\b", re.I)
+
+
+def sqlite_table(statement: str) -> tuple:
+    """(table, column definitions, table constraints, CREATE INDEX statements)
+    in SQLite syntax for one MySQL ``CREATE TABLE IF NOT EXISTS``, with the
+    columns later migrations added to it"""
+    table, body = re.match(r"\s*CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)\s*\((.*)\)", statement, re.S | re.I).groups()
+    columns, constraints, indexes = [], [], []
+    for item in _split_top(body):
+        item = " ".join(item.split())
+        key = re.match(r"(FULLTEXT\s+|UNIQUE\s+)?(?:KEY|INDEX)\b\s*(\w+)?\s*\((.*)\)$", item, re.I)
+        if key:
+            kind, name, indexed = key.groups()
+            if kind and kind.strip().upper() == "UNIQUE":
+                constraints.append(f"UNIQUE ({indexed})")
+            elif not kind:
+                indexes.append(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({indexed})")
+            continue
+        if _CONSTRAINT.match(item):
+            constraints.append(item)
+            continue
+        columns.append(sqlite_column(item))
+    columns += [sqlite_column(f"{name} {definition}")
+                for name, definition in migrations.ADDED_COLUMNS.get(table, {}).items()]
+    return table, columns, constraints, indexes
+
+
+def sqlite_column(definition: str) -> str:
+    for pattern, repl in _COLUMN_REWRITES:
+        definition = re.sub(pattern, repl, definition, flags=re.I)
+    return definition
+
+
+def index_prefixes(cursor, table: str) -> Dict[str, tuple]:
+    """Index name -> indexed columns, including implicit PRIMARY KEY / UNIQUE indexes"""
+    indexes = {}
+    for row in cursor.execute(f"PRAGMA index_list({table})").fetchall():
+        indexes[row[1]] = tuple(info[2] for info in cursor.execute(f"PRAGMA index_info({row[1]})").fetchall())
+    primary_key = [info for info in cursor.execute(f"PRAGMA table_info({table})").fetchall() if info[5]]
+    indexes["PRIMARY"] = tuple(info[1] for info in sorted(primary_key, key=lambda info: info[5]))
+    return indexes
+
+
+def ensure_index(cursor, table: str, name: str, columns: tuple) -> bool:
+    """Add an index unless one with that name, or one starting with ``columns``, exists"""
+    for existing_name, existing in index_prefixes(cursor, table).items():
+        if existing_name == name or existing[:len(columns)] == tuple(columns):
+            return False
+    cursor.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+    return True
+
+
+def create_table(cursor, statement: str):
+    """Create a table, or add the columns an older file is missing"""
+    table, columns, constraints, indexes = sqlite_table(statement)
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns + constraints)})")
+    existing = {info[1] for info in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+    for column in columns:
+        if column.split()[0] not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+    for index in indexes:
+        cursor.execute(index)
+    return table
+
+
+def create_schema(cursor):
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    backfills = [
+        statements for (table, column), statements in migrations.COLUMN_BACKFILLS.items()
+        if table in existing
+        and column not in {info[1] for info in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+    ]
+    tables = [create_table(cursor, statement) for statement in migrations.CURRENT_TABLES]
+    for statements in backfills:
+        # create_table just added the column to rows that predate it
+        for statement in statements:
+            cursor.execute(translate(statement))
+    for table in tables:
+        if table not in existing and table in migrations.READ_MODEL_REBUILDS:
+            # Fill a read model added to an existing file from the tables it summarizes
+            for statement in migrations.READ_MODEL_REBUILDS[table]:
+                cursor.execute(translate(statement))
+    for table, name, columns in migrations.HOT_PATH_INDEXES:
+        ensure_index(cursor, table, name, columns)
+    # InnoDB indexes foreign key columns implicitly; SQLite needs them spelled out
+    for table in tables:
+        foreign_keys = {}
+        for fk in cursor.execute(f"PRAGMA foreign_key_list({table})").fetchall():
+            foreign_keys.setdefault(fk[0], []).append((fk[1], fk[3]))
+        for key in foreign_keys.values():
+            columns = tuple(column for _, column in sorted(key))
+            ensure_index(cursor, table, f"idx_{table.lower()}_{'_'.join(columns).lower()}", columns)
+
+
+def migrate(raw: sqlite3.Connection) -> List[migrations.Migration]:
+    """Build the current schema if the file is behind; returns the migrations it stands in for.
+
+    The whole upgrade is one IMMEDIATE transaction (SQLite DDL is
+    transactional), which also keeps two processes from upgrading at once.
+    """
+    cursor = raw.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        create_table(cursor, migrations.MIGRATIONS_TABLE)
+        applied = {row[0] for row in cursor.execute("SELECT Version FROM SCHEMA_MIGRATIONS").fetchall()}
+        pending = [m for m in migrations.MIGRATIONS if m.version not in applied]
+        if pending:
+            create_schema(cursor)
+            cursor.executemany("INSERT INTO SCHEMA_MIGRATIONS (Version, Name) VALUES (?, ?)",
+                               [(m.version, m.name) for m in pending])
+        raw.commit()
+        return pending
+    except BaseException:
+        raw.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def full_scans(cursor, query: str, params=()) -> List[Dict]:
+    """EXPLAIN QUERY PLAN ``query`` and return the steps that scan a whole table without an index.
+
+    Scans of subqueries (``CO-ROUTINE p`` / ``MATERIALIZE p``) are skipped,
+    like derived tables in the MySQL check, and so is a LIMITed walk in rowid
+    order (no temp B-tree sort), which stops early like MySQL's ``index`` access.
+    """
+    plan = [row[3] for row in cursor.execute("EXPLAIN QUERY PLAN " + translate(query), tuple(params)).fetchall()]
+    if re.search(r"\bLIMIT\b", query, re.I) and not any(step.startswith("USE TEMP B-TREE") for step in plan):
+        return []
+    derived = {m.group(1) for m in (re.match(r"(?:CO-ROUTINE|MATERIALIZE) (\w+)", step) for step in plan) if m}
+    scans = (re.fullmatch(r"SCAN (\w+)", step) for step in plan)
+    return [{"table": m.group(1), "rows": None} for m in scans if m and m.group(1) not in derived]
+
+
+class SQLiteBackend:
+    name = "sqlite"
+    fulltext = False
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def connect(self) -> Connection:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        try:
+            raw = sqlite3.connect(self.path, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+            for pragma, value in PRAGMAS:
+                raw.execute(f"PRAGMA {pragma} = {value}")
+            raw.execute("CREATE TEMP TABLE IF NOT EXISTS _session_vars (Name TEXT PRIMARY KEY, Value) WITHOUT ROWID")
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+        raw.create_function("CONCAT", -1, _concat, deterministic=True)
+        raw.create_function("LOG10", 1, _log10, deterministic=True)
+        raw.create_function("VERSION", 0, lambda: f"SQLite {sqlite3.sqlite_version}")
+        # Pooled connections move between threads, but only one uses them at a time
+        return Connection(raw)
+
+    def create_database(self) -> List[migrations.Migration]:
+        """The file is created on first connect; this just builds the schema"""
+        conn = self.connect()
+        try:
+            return self.migrate(conn)
+        finally:
+            conn.close()
+
+    def migrate(self, conn: Connection) -> List[migrations.Migration]:
+        try:
+            return migrate(conn.raw)
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+
+    def schema_version(self, conn: Connection) -> int:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COALESCE(MAX(Version), 0) FROM SCHEMA_MIGRATIONS")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def explain_queries(self, conn: Connection, queries: Iterable[tuple]) -> Dict[str, List[Dict]]:
+        cursor = conn.raw.cursor()
+        try:
+            report = {}
+            for label, query, params in queries:
+                scans = full_scans(cursor, query, params)
+                if scans:
+                    report[label] = scans
+            return report
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+        finally:
+            cursor.close()
+
+    def table_rows(self, conn: Connection) -> Dict[str, int]:
+        """Exact rows per table; counting is cheap on a local file"""
+        cursor = conn.raw.cursor()
+        try:
+            tables = [row[0] for row in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'").fetchall()]
+            return {table: cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+        finally:
+            cursor.close()
@@ -0,0 +1,79 @@
+import io
+import struct
+
+from audio_store import audio_extension, store_stream, wav_tags
+
+
+def chunk(chunk_id: bytes, body: bytes) -> bytes:
+    return struct.pack("<4sI", chunk_id, len(body)) + body + (b"\0" if len(body) % 2 else b"")
+
+
+def info_list(fields) -> bytes:
+    return chunk(b"LIST", b"INFO" + b"".join(chunk(field_id, value + b"\0") for field_id, value in fields))
+
+
+def wav(*chunks: bytes) -> io.BytesIO:
+    body = b"WAVE" + b"".join(chunks)
+    return io.BytesIO(b"RIFF" + struct.pack("<I", len(body)) + body)
+
+
+def test_info_fields():
+    f = wav(info_list([(b"INAM", b"Song"), (b"IART", b"Band"), (b"IPRD", b"Album"), (b"IGNR", b"Rock")]))
+    assert wav_tags(f) == {"title": "Song", "artists": ["Band"], "album": "Album", "genre": "Rock"}
+
+
+def test_odd_sized_fields_are_padded():
+    f = wav(info_list([(b"INAM", b"Odd"), (b"IART", b"Artist")]), chunk(b"data", b"\0" * 4))
+    assert wav_tags(f) == {"title": "Odd", "artists": ["Artist"]}
+
+
+def test_latin1_fallback():
+    assert wav_tags(wav(info_list([(b"INAM", "Café".encode("latin-1"))]))) == {"title": "Café"}
+
+
+def test_unknown_fields_and_blank_values_are_skipped():
+    assert wav_tags(wav(info_list([(b"ICMT", b"comment"), (b"INAM", b"  ")]))) == {}
+
+
+def test_tiny_list_chunk():
+    f = wav(chunk(b"LIST", b"IN"), info_list([(b"INAM", b"After")]))
+    assert wav_tags(f) == {"title": "After"}
+
+
+def test_empty_list_chunk():
+    f = wav(chunk(b"LIST", b""), info_list([(b"INAM", b"After")]))
+    assert wav_tags(f) == {"title": "After"}
+
+
+def test_non_info_list_is_skipped():
+    f = wav(chunk(b"LIST", b"adtl" + chunk(b"labl", b"x" * 6)), info_list([(b"INAM", b"Song")]))
+    assert wav_tags(f) == {"title": "Song"}
+
+
+def test_other_chunks_are_skipped():
+    f = wav(chunk(b"fmt ", b"\0" * 16), chunk(b"data", b"\0" * 7), info_list([(b"IGNR", b"Jazz")]))
+    assert wav_tags(f) == {"genre": "Jazz"}
+
+
+def test_truncated_file():
+    f = wav(info_list([(b"INAM", b"Song")]))
+    assert wav_tags(io.BytesIO(f.getvalue()[:20])) == {}
+
+
+def test_store_stream_keys_on_content(tmp_path):
+    data = wav(info_list([(b"INAM", b"Song")])).getvalue()
+    path, content_hash, size, created = store_stream(io.BytesIO(data), str(tmp_path))
+    assert created and size == len(data)
+    assert path == str(tmp_path / content_hash[:2] / content_hash[2:4] / f"{content_hash}.wav")
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+    again = store_stream(io.BytesIO(data), str(tmp_path))
+    assert again == (path, content_hash, size, False)
+    assert not list((tmp_path / ".incoming").iterdir())
+
+
+def test_audio_extension():
+    assert audio_extension(b"RIFF\0\0\0\0WAVE") == "wav"
+    assert audio_extension(b"ID3\x04\0\0\0\0\0\0") == "mp3"
+    assert audio_extension(b"") == "mp3"
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import numpy as np
+
+from columnar import frame_from_chunks
+
+COLUMNS = ["Song_ID", "Title", "Score", "Upload_Date"]
+TYPES = ["LONG", "VAR_STRING", "DOUBLE", "DATETIME"]
+
+
+def test_chunks_are_concatenated_in_order():
+    chunks = [
+        (COLUMNS, TYPES, [(1, "a", 0.5, datetime(2024, 1, 1)), (2, "b", 1.5, datetime(2024, 1, 2))]),
+        (COLUMNS, TYPES, [(3, "c", 2.5, datetime(2024, 1, 3))]),
+    ]
+    df = frame_from_chunks(iter(chunks))
+    assert list(df.columns) == COLUMNS
+    assert df["Song_ID"].tolist() == [1, 2, 3]
+    assert df["Title"].tolist() == ["a", "b", "c"]
+    assert df["Song_ID"].dtype == np.int64
+    assert df["Score"].dtype == np.float64
+    assert df["Upload_Date"].iloc[2] == datetime(2024, 1, 3)
+
+
+def test_nulls():
+    df = frame_from_chunks(iter([(COLUMNS, TYPES, [(1, None, None, None), (None, "b", 1.0, None)])]))
+    assert df["Song_ID"].dtype == np.float64
+    assert np.isnan(df["Song_ID"].iloc[1])
+    assert df["Title"].isna().tolist() == [True, False]
+    assert np.isnan(df["Score"].iloc[0])
+    assert df["Upload_Date"].isna().all()
+
+
+def test_integer_column_with_nulls_in_one_chunk_only():
+    df = frame_from_chunks(iter([
+        (["Play_Count"], ["LONGLONG"], [(1,), (2,)]),
+        (["Play_Count"], ["LONGLONG"], [(None,)]),
+    ]))
+    assert df["Play_Count"].tolist()[:2] == [1.0, 2.0]
+    assert np.isnan(df["Play_Count"].iloc[2])
+
+
+def test_no_rows_keeps_columns_and_types():
+    df = frame_from_chunks(iter([(COLUMNS, TYPES, [])]))
+    assert df.empty
+    assert list(df.columns) == COLUMNS
+    assert df["Song_ID"].dtype == np.int64
+    assert df["Score"].dtype == np.float64
+
+
+def test_no_chunks():
+    df = frame_from_chunks(iter([]))
+    assert df.empty and list(df.columns) == []
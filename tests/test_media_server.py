@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import media_server
+from media_server import MediaRequestHandler
+
+parse_range = MediaRequestHandler.parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes=999-999", (999, 999)),
+    ("bytes=0-0, 500-600", (0, 0)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=1000-",
+    "bytes=500-100",
+    "bytes=-",
+    "bytes=a-b",
+    "items=0-10",
+    "bytes=0-10-20",
+])
+def test_unsatisfiable_or_malformed_ranges(header):
+    assert parse_range(header, 1000) is None
+
+
+def test_empty_file_has_no_ranges():
+    assert parse_range("bytes=0-", 0) is None
+
+
+@pytest.fixture
+def media_root(tmp_path, monkeypatch):
+    root = str(tmp_path / "songs")
+    monkeypatch.setattr(media_server, "MEDIA_ROOT", root)
+    return root
+
+
+def test_resolve_stored_file(media_root):
+    assert MediaRequestHandler.resolve("/ab/cd/abcd.mp3?t=1") == os.path.join(media_root, "ab", "cd", "abcd.mp3")
+    assert MediaRequestHandler.resolve("/ab/a%20b.mp3") == os.path.join(media_root, "ab", "a b.mp3")
+
+
+@pytest.mark.parametrize("request_path", [
+    "/../secret.txt",
+    "/ab/../../secret.txt",
+    "/%2e%2e/secret.txt",
+    "/.incoming/tmp1234",
+    "/ab/../.incoming/tmp1234",
+    "/.incoming",
+])
+def test_resolve_rejects_paths_outside_storage(media_root, request_path):
+    assert MediaRequestHandler.resolve(request_path) is None
@@ -0,0 +1,113 @@
+import pytest
+
+import migrations
+from migrations import Migration
+
+
+class FakeCursor:
+    """Just enough of a MySQL cursor for ``migrations.migrate``"""
+
+    def __init__(self, server):
+        self.server = server
+        self.result = []
+
+    def execute(self, query, params=()):
+        self.server.log.append(query.split("(")[0].strip() if query.startswith("SELECT") else query.split()[0])
+        if query.startswith("SELECT GET_LOCK"):
+            self.result = [(self.server.lock_free,)]
+        elif query.startswith("SELECT RELEASE_LOCK"):
+            self.result = [(1,)]
+        elif query.startswith("SELECT Version FROM SCHEMA_MIGRATIONS"):
+            self.result = [(version,) for version in self.server.versions]
+        elif query.startswith("INSERT INTO SCHEMA_MIGRATIONS"):
+            self.server.versions.append(params[0])
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, lock_free=1):
+        self.lock_free = lock_free
+        self.versions = []
+        self.log = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def applied(monkeypatch):
+    calls = []
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        Migration(1, "first", lambda cursor: calls.append(1)),
+        Migration(2, "second", lambda cursor: calls.append(2)),
+    ])
+    return calls
+
+
+def test_migrate_applies_pending_in_order_and_records_versions(applied):
+    conn = FakeConnection()
+    done = migrations.migrate(conn)
+    assert [m.version for m in done] == [1, 2]
+    assert applied == [1, 2]
+    assert conn.versions == [1, 2]
+    assert conn.commits == 2
+    assert migrations.schema_version(conn) == 2
+
+
+def test_migrate_holds_the_lock_for_the_whole_run(applied):
+    conn = FakeConnection()
+    migrations.migrate(conn)
+    assert conn.log[0] == "SELECT GET_LOCK"
+    assert conn.log[-1] == "SELECT RELEASE_LOCK"
+
+
+def test_rerun_applies_nothing(applied):
+    conn = FakeConnection()
+    migrations.migrate(conn)
+    assert migrations.migrate(conn) == []
+    assert applied == [1, 2]
+    assert conn.versions == [1, 2]
+
+
+def test_only_new_migrations_run(applied):
+    conn = FakeConnection()
+    conn.versions = [1]
+    assert [m.version for m in migrations.migrate(conn)] == [2]
+    assert applied == [2]
+
+
+def test_lock_timeout_applies_nothing(applied):
+    conn = FakeConnection(lock_free=0)
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn)
+    assert applied == []
+    assert "SELECT RELEASE_LOCK" not in conn.log
+
+
+def test_failed_migration_releases_the_lock_and_keeps_earlier_ones(monkeypatch):
+    def fail(cursor):
+        raise ValueError("boom")
+    monkeypatch.setattr(migrations, "MIGRATIONS", [Migration(1, "first", lambda cursor: None),
+                                                   Migration(2, "broken", fail)])
+    conn = FakeConnection()
+    with pytest.raises(ValueError):
+        migrations.migrate(conn)
+    assert conn.versions == [1]
+    assert conn.log[-1] == "SELECT RELEASE_LOCK"
+
+
+def test_versions_are_unique_and_ascending():
+    versions = [m.version for m in migrations.MIGRATIONS]
+    assert versions == sorted(set(versions))
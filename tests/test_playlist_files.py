@@ -0,0 +1,63 @@
+from playlist_files import Entry, read_csv, read_m3u, split_artist_title, write_m3u
+
+
+def test_split_artist_title():
+    assert split_artist_title("Band - Song") == ("Band", "Song")
+    assert split_artist_title("  Band  -  Song - Live ") == ("Band", "Song - Live")
+    assert split_artist_title("Song") == ("", "Song")
+    assert split_artist_title("Hyphen-ated") == ("", "Hyphen-ated")
+
+
+def test_read_m3u_uses_extinf():
+    lines = ["#EXTM3U", "#EXTINF:215,Band - Song", "music/a.mp3", "", "# comment", "#EXTINF:-1,Untitled", "b.mp3"]
+    assert list(read_m3u(lines)) == [
+        Entry(None, "music/a.mp3", "Song", "Band"),
+        Entry(None, "b.mp3", "Untitled", None),
+    ]
+
+
+def test_read_m3u_falls_back_to_file_name():
+    assert list(read_m3u(["C:\\Music\\Band - Song.mp3\r\n", "/music/Other.wav"])) == [
+        Entry(None, "C:\\Music\\Band - Song.mp3", "Song", "Band"),
+        Entry(None, "/music/Other.wav", "Other", None),
+    ]
+
+
+def test_extinf_applies_to_the_next_path_only():
+    entries = list(read_m3u(["#EXTINF:1,Band - Song", "a.mp3", "Other - Track.mp3"]))
+    assert entries[1] == Entry(None, "Other - Track.mp3", "Track", "Other")
+
+
+def test_read_csv():
+    lines = ["Song_ID,Title,Artists,File_Path\n", "12,Song,Band,a.mp3\n", "x, Other ,,\n"]
+    assert list(read_csv(lines)) == [
+        Entry(12, "a.mp3", "Song", "Band"),
+        Entry(None, None, "Other", None),
+    ]
+
+
+def test_read_csv_header_case_and_artist_column():
+    assert list(read_csv([" title ,ARTIST\n", "Song,Band\n"])) == [Entry(None, None, "Song", "Band")]
+
+
+def test_write_m3u(tmp_path):
+    columns = ["Song_ID", "Title", "Artists", "Album", "Duration", "File_Path"]
+    chunks = iter([
+        (columns, [], [(1, "Song", "Band", None, 215, "music/a.mp3")]),
+        (columns, [], [(2, "Untitled", None, None, None, "b.mp3")]),
+    ])
+    path = tmp_path / "out.m3u"
+    assert write_m3u(chunks, str(path)) == 2
+    assert path.read_text(encoding="utf-8") == (
+        "#EXTM3U\n"
+        "#EXTINF:215,Band - Song\nmusic/a.mp3\n"
+        "#EXTINF:-1,Untitled\nb.mp3\n"
+    )
+
+
+def test_m3u_round_trip(tmp_path):
+    columns = ["Song_ID", "Title", "Artists", "Album", "Duration", "File_Path"]
+    path = tmp_path / "out.m3u"
+    write_m3u(iter([(columns, [], [(1, "Song", "A, B", None, 10, "x/y.mp3")])]), str(path))
+    with open(path, encoding="utf-8") as f:
+        assert list(read_m3u(f)) == [Entry(None, "x/y.mp3", "Song", "A, B")]
@@ -0,0 +1,53 @@
+from query_metrics import call_site, fingerprint
+
+
+def test_placeholders_and_literals_collapse():
+    assert fingerprint("SELECT * FROM SONGS WHERE Song_ID = %s") == "SELECT * FROM SONGS WHERE Song_ID = ?"
+    assert fingerprint("SELECT * FROM SONGS WHERE Title = 'It''s' AND Duration > 200") == \
+        "SELECT * FROM SONGS WHERE Title = ? AND Duration > ?"
+    assert fingerprint("SELECT %(id)s, \"x\"") == "SELECT ?, ?"
+
+
+def test_value_lists_of_any_length_share_a_series():
+    short = fingerprint("SELECT Song_ID FROM SONGS WHERE Song_ID IN (%s, %s)")
+    long = fingerprint("SELECT Song_ID FROM SONGS WHERE Song_ID IN (%s, %s, %s, %s, %s)")
+    assert short == long == "SELECT Song_ID FROM SONGS WHERE Song_ID IN (?+)"
+
+
+def test_multi_row_inserts_share_a_series():
+    one = fingerprint("INSERT INTO RATINGS (Rating_Value, User_ID, Song_ID) VALUES (%s, %s, %s)")
+    many = fingerprint("INSERT INTO RATINGS (Rating_Value, User_ID, Song_ID) VALUES (1, 2, 3), (4, 5, 6), (7, 8, 9)")
+    assert many == "INSERT INTO RATINGS (Rating_Value, User_ID, Song_ID) VALUES (?+), ..."
+    assert one == "INSERT INTO RATINGS (Rating_Value, User_ID, Song_ID) VALUES (?+)"
+
+
+def test_whitespace_is_normalised():
+    assert fingerprint("SELECT 1\n  FROM   SONGS ") == "SELECT ? FROM SONGS"
+
+
+def test_identifiers_with_digits_are_kept():
+    assert fingerprint("SELECT Half_Star_1 FROM SONG_RATINGS") == "SELECT Half_Star_1 FROM SONG_RATINGS"
+
+
+
+class Page:
+    def show(self):
+        return helper()
+
+    def site(self, **kwargs):
+        return call_site(**kwargs)
+
+
+def helper():
+    return call_site()
+
+
+def test_call_site_is_module_qualified():
+    assert Page().show() == f"{__name__}.helper"
+    assert Page().site() == f"{__name__}.Page.site"
+    assert (lambda: helper())() == f"{__name__}.helper"
+
+
+def test_call_site_skips_classes_and_modules():
+    assert Page().site(skip=(Page,)) == f"{__name__}.test_call_site_skips_classes_and_modules"
+    assert not Page().site(skip_modules=(__name__,)).startswith(__name__)
@@ -0,0 +1,133 @@
+import pytest
+
+import migrations
+from sqlite_backend import SQLiteBackend, translate
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "audily.sqlite3"))
+
+
+@pytest.fixture
+def conn(backend):
+    connection = backend.connect()
+    cursor = connection.cursor()
+    cursor.execute("CREATE TABLE COUNTS (Name TEXT PRIMARY KEY, Total INT NOT NULL)")
+    cursor.execute("CREATE TABLE NAMES (Name TEXT PRIMARY KEY, Label TEXT)")
+    cursor.close()
+    yield connection
+    connection.close()
+
+
+def rows(conn, query, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def test_placeholders_and_functions():
+    assert translate("SELECT GREATEST(a, %s), LEAST(b, %s) FROM t") == "SELECT MAX(a, ?), MIN(b, ?) FROM t"
+    assert translate("SELECT NOW(), CURDATE()") == \
+        "SELECT datetime('now', 'localtime'), date('now', 'localtime')"
+    assert translate("INSERT IGNORE INTO t VALUES (%s)") == "INSERT OR IGNORE INTO t VALUES (?)"
+
+
+def test_string_literals_are_left_alone():
+    assert translate("SELECT 'NOW() %s @x' FROM t WHERE a = %s") == "SELECT 'NOW() %s @x' FROM t WHERE a = ?"
+
+
+def test_on_duplicate_key_update():
+    assert translate("INSERT INTO COUNTS (Name, Total) VALUES (%s, %s) "
+                     "ON DUPLICATE KEY UPDATE Total = Total + VALUES(Total)") == \
+        "INSERT INTO COUNTS (Name, Total) VALUES (?, ?) ON CONFLICT DO UPDATE SET Total = Total + excluded.Total"
+
+
+def test_upsert_from_select_without_where_is_not_read_as_a_join():
+    assert translate("INSERT INTO COUNTS (Name, Total) SELECT Name, 1 FROM NAMES "
+                     "ON DUPLICATE KEY UPDATE Total = VALUES(Total)") == \
+        "INSERT INTO COUNTS (Name, Total) SELECT Name, 1 FROM NAMES WHERE true " \
+        "ON CONFLICT DO UPDATE SET Total = excluded.Total"
+
+
+def test_upsert_runs(conn):
+    upsert = "INSERT INTO COUNTS (Name, Total) VALUES (%s, %s) ON DUPLICATE KEY UPDATE Total = Total + VALUES(Total)"
+    for total in (2, 3):
+        rows(conn, upsert, ("a", total))
+    rows(conn, "INSERT INTO NAMES (Name) VALUES ('a'), ('b')")
+    rows(conn, "INSERT INTO COUNTS (Name, Total) SELECT Name, 10 FROM NAMES GROUP BY Name "
+               "ON DUPLICATE KEY UPDATE Total = COUNTS.Total + VALUES(Total)")
+    assert rows(conn, "SELECT Name, Total FROM COUNTS ORDER BY Name") == [("a", 15), ("b", 10)]
+
+
+def test_update_join():
+    assert translate("UPDATE COUNTS c JOIN NAMES n ON n.Name = c.Name SET c.Total = 0, Total = 1 "
+                     "WHERE n.Label = %s") == \
+        "UPDATE COUNTS AS c SET Total = 0, Total = 1 FROM NAMES AS n WHERE (n.Name = c.Name) AND (n.Label = ?)"
+
+
+def test_update_join_runs(conn):
+    rows(conn, "INSERT INTO COUNTS (Name, Total) VALUES ('a', 1), ('b', 2), ('c', 3)")
+    rows(conn, "INSERT INTO NAMES (Name, Label) VALUES ('a', 'x'), ('b', 'y'), ('c', 'x')")
+    rows(conn, "UPDATE COUNTS c INNER JOIN NAMES AS n ON n.Name = c.Name "
+               "SET c.Total = c.Total * 10 WHERE n.Label = %s", ("x",))
+    assert rows(conn, "SELECT Total FROM COUNTS ORDER BY Name") == [(10,), (2,), (30,)]
+
+
+def test_session_variables(conn):
+    assert translate("SET @cutoff = %s").startswith("INSERT OR REPLACE INTO temp._session_vars")
+    rows(conn, "INSERT INTO COUNTS (Name, Total) VALUES ('a', 1), ('b', 5)")
+    rows(conn, "SET @cutoff = %s", (3,))
+    assert rows(conn, "SELECT Name FROM COUNTS WHERE Total > @cutoff") == [("b",)]
+    rows(conn, "SET @cutoff := (SELECT MIN(Total) FROM COUNTS)")
+    assert rows(conn, "SELECT @cutoff") == [(1,)]
+
+
+def test_session_variables_are_per_connection(backend, conn):
+    rows(conn, "SET @x = 1")
+    other = backend.connect()
+    try:
+        assert rows(other, "SELECT @x") == [(None,)]
+    finally:
+        other.close()
+
+
+def test_create_database_records_every_migration(backend):
+    applied = backend.create_database()
+    assert [m.version for m in applied] == [m.version for m in migrations.MIGRATIONS]
+    conn = backend.connect()
+    try:
+        assert backend.schema_version(conn) == migrations.MIGRATIONS[-1].version
+        tables = {name for name, in rows(conn, "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"SCHEMA_MIGRATIONS", "SONGS", "RECOMMENDATION_REFRESHES"} <= tables
+    finally:
+        conn.close()
+
+
+def test_rerun_is_a_no_op(backend):
+    backend.create_database()
+    conn = backend.connect()
+    try:
+        rows(conn, "INSERT INTO ARTISTS (Name) VALUES ('Nina')")
+        conn.commit()
+        assert backend.migrate(conn) == []
+        assert rows(conn, "SELECT COUNT(*) FROM SCHEMA_MIGRATIONS") == [(len(migrations.MIGRATIONS),)]
+        assert rows(conn, "SELECT Name FROM ARTISTS") == [("Nina",)]
+    finally:
+        conn.close()
+
+
+def test_new_migrations_are_recorded_on_an_older_file(backend):
+    backend.create_database()
+    conn = backend.connect()
+    try:
+        latest = migrations.MIGRATIONS[-1]
+        rows(conn, "DELETE FROM SCHEMA_MIGRATIONS WHERE Version = %s", (latest.version,))
+        conn.commit()
+        assert backend.migrate(conn) == [latest]
+        assert backend.schema_version(conn) == latest.version
+    finally:
+        conn.close()
@@ -0,0 +1,187 @@
+"""In-memory trending rankings with exponentially time-decayed scores.
+
+Plays are counted in hourly buckets per song. Every ``refresh_interval``
+seconds a background thread rebuilds the buckets from TRENDING_HOURLY and
+scores each song over every configured window.
+A play's contribution halves every ``half_life`` seconds. The engine keeps the
+top K songs and artists per window, so the Trending page reads a precomputed
+ranking instead of aggregating at request time.
+
+The play pipeline writes the buckets to TRENDING_HOURLY in its flush
+transaction, and the engine only ever reads them from there. A play shows up
+in the rankings at the first refresh after it is flushed, whichever app
+process recorded it.
+"""
+import heapq
+import math
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+BUCKET_SECONDS = 3600
+
+# Window label -> (window length, half-life), both in seconds
+TRENDING_WINDOWS = {
+    "Last hour": (3600, 15 * 60),
+    "Last 24 hours": (24 * 3600, 6 * 3600),
+    "Last 7 days": (7 * 24 * 3600, 2 * 24 * 3600),
+}
+
+TRENDING_HOURLY_TABLE = """
+    CREATE TABLE IF NOT EXISTS TRENDING_HOURLY (
+        Song_ID INT NOT NULL,
+        Bucket_Hour DATETIME NOT NULL,
+        Play_Count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (Song_ID, Bucket_Hour),
+        KEY idx_trending_hourly_bucket (Bucket_Hour),
+        FOREIGN KEY (Song_ID) REFERENCES SONGS(Song_ID) ON DELETE CASCADE
+    )
+"""
+
+
+def bucket_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+class TrendingEngine:
+    def __init__(self, pool, windows: Dict[str, tuple] = None,
+                 top_k: int = int(os.getenv("TRENDING_TOP_K", "50")),
+                 refresh_interval: float = float(os.getenv("TRENDING_REFRESH_INTERVAL", "30"))):
+        self.pool = pool
+        self.windows = windows or TRENDING_WINDOWS
+        self.top_k = top_k
+        self.refresh_interval = refresh_interval
+        self._buckets = defaultdict(Counter)  # song id -> {bucket start timestamp: plays}
+        self._song_artists = {}  # song id -> tuple of artist ids
+        self._rankings = {name: {"songs": [], "artists": []} for name in self.windows}
+        self._lock = threading.Lock()
+        self.refreshed_at = None
+
+        self.load()
+        self.refresh()
+        threading.Thread(target=self._refresh_loop, name="trending-refresh", daemon=True).start()
+
+    def _query(self, query: str, params=()) -> List[tuple]:
+        conn = self.pool.acquire()
+        healthy = True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            self.pool.release(conn, healthy=healthy)
+
+    def load(self):
+        """Replace the buckets with the longest window's rows of TRENDING_HOURLY"""
+        horizon = max(window for window, _ in self.windows.values())
+        since = datetime.fromtimestamp(time.time() - horizon - BUCKET_SECONDS)
+        try:
+            rows = self._query(
+                "SELECT Song_ID, Bucket_Hour, Play_Count FROM TRENDING_HOURLY WHERE Bucket_Hour >= %s",
+                (since,)
+            )
+        except Exception as e:
+            print(f"⚠️ Trending checkpoint not loaded: {e}")
+            return
+        buckets = defaultdict(Counter)
+        for song_id, hour, plays in rows:
+            buckets[song_id][hour.timestamp()] += plays
+        with self._lock:
+            self._buckets = buckets
+            # Songs no longer played in any window don't need their artists
+            self._song_artists = {song_id: artists for song_id, artists in self._song_artists.items()
+                                  if song_id in buckets}
+        self._resolve_artists(set(buckets))
+
+    def _resolve_artists(self, song_ids: set):
+        missing = [song_id for song_id in song_ids if song_id not in self._song_artists]
+        if not missing:
+            return
+        placeholders = ", ".join(["%s"] * len(missing))
+        try:
+            rows = self._query(
+                f"SELECT Song_ID, Artist_ID FROM SONG_ARTISTS WHERE Song_ID IN ({placeholders})",
+                tuple(missing)
+            )
+        except Exception as e:
+            print(f"⚠️ Trending artists not resolved: {e}")
+            return
+        artists = defaultdict(list)
+        for song_id, artist_id in rows:
+            artists[song_id].append(artist_id)
+        with self._lock:
+            for song_id in missing:
+                self._song_artists[song_id] = tuple(artists.get(song_id, ()))
+
+    def refresh(self):
+        """Recompute the decayed top-K rankings for every window"""
+        now = time.time()
+        horizon = max(window for window, _ in self.windows.values())
+        with self._lock:
+            # Drop buckets that have aged out of every window
+            for song_id in list(self._buckets):
+                buckets = self._buckets[song_id]
+                for start in [s for s in buckets if s + BUCKET_SECONDS <= now - horizon]:
+                    del buckets[start]
+                if not buckets:
+                    del self._buckets[song_id]
+                    self._song_artists.pop(song_id, None)
+            snapshot = {song_id: list(buckets.items()) for song_id, buckets in self._buckets.items()}
+            song_artists = dict(self._song_artists)
+
+        rankings = {}
+        for name, (window, half_life) in self.windows.items():
+            decay = math.log(2) / half_life
+            song_scores, song_plays = {}, {}
+            for song_id, buckets in snapshot.items():
+                score = plays = 0
+                for start, count in buckets:
+                    if start + BUCKET_SECONDS <= now - window:
+                        continue
+                    # Decay from the bucket midpoint (or now, for the current bucket)
+                    age = max(now - (start + BUCKET_SECONDS / 2), 0)
+                    score += count * math.exp(-decay * age)
+                    plays += count
+                if plays:
+                    song_scores[song_id] = score
+                    song_plays[song_id] = plays
+
+            artist_scores, artist_plays = Counter(), Counter()
+            for song_id, score in song_scores.items():
+                for artist_id in song_artists.get(song_id, ()):
+                    artist_scores[artist_id] += score
+                    artist_plays[artist_id] += song_plays[song_id]
+
+            top_songs = heapq.nlargest(self.top_k, song_scores.items(), key=lambda item: item[1])
+            top_artists = heapq.nlargest(self.top_k, artist_scores.items(), key=lambda item: item[1])
+            rankings[name] = {
+                "songs": [{"Song_ID": k, "Score": round(v, 3), "Plays": song_plays[k]} for k, v in top_songs],
+                "artists": [{"Artist_ID": k, "Score": round(v, 3), "Plays": artist_plays[k]} for k, v in top_artists],
+            }
+
+        self._rankings = rankings
+        self.refreshed_at = datetime.now()
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.load()
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Trending refresh failed: {e}")
+
+    def top_songs(self, window: str, n: int = 10) -> List[Dict]:
+        return self._rankings[window]["songs"][:n]
+
+    def top_artists(self, window: str, n: int = 5) -> List[Dict]:
+        return self._rankings[window]["artists"][:n]
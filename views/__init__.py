@@ -0,0 +1,23 @@
+"""Page modules for the signed-in app, imported the first time they are shown.
+
+Each module has a ``show(db)`` entry point. ``audily_app`` only imports the
+page being rendered, so plotly (Trending, Admin) and pandas (pages that build
+DataFrames) load when a session first opens such a page instead of on every
+cold start; login and playback never pay for them.
+"""
+import importlib
+
+# Sidebar label -> module, in menu order
+PAGES = {
+    "Dashboard": "views.dashboard",
+    "Browse Music": "views.browse",
+    "My Playlists": "views.playlists",
+    "Upload Music": "views.upload",
+    "Trending": "views.trending",
+    "Admin": "views.admin",
+}
+
+
+def load_page(name: str):
+    """The page module for a menu entry; Python caches it after the first import"""
+    return importlib.import_module(PAGES[name])
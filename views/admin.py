@@ -0,0 +1,233 @@
+"""Admin grids, reports and query performance"""
+import os
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from audio_store import remove_unreferenced
+from database import ADMIN_GRIDS
+from exports import EXPORT_FORMATS
+from views.common import keyset_pages, still_loading
+
+
+def show(db):
+    if st.session_state.current_user['Username'] != 'admin':
+        st.warning("You don't have admin privileges")
+        return
+
+    st.title("🛠 Admin Panel")
+    st.markdown("---")
+
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Users", "Songs", "Artists", "Reports", "Performance"])
+
+    with tab1:
+        st.subheader("User Management")
+        users = admin_grid(db, "Users")
+
+        if users:
+            with st.expander("Add New User"):
+                with st.form("add_user"):
+                    username = st.text_input("Username")
+                    email = st.text_input("Email")
+                    password = st.text_input("Password", type="password")
+                    subscription = st.selectbox(
+                        "Subscription",
+                        options=["Free", "Premium", "Family"]
+                    )
+
+                    if st.form_submit_button("Add User"):
+                        success = db.execute_query(
+                            "INSERT INTO USERS (Username, Email, Password, Subscription_Type) "
+                            "VALUES (%s, %s, %s, %s)",
+                            (username, email, password, subscription),
+                            fetch=False
+                        )
+                        if success:
+                            st.success("User added successfully!")
+        else:
+            st.warning("No users found")
+
+    with tab2:
+        st.subheader("Song Management")
+        songs = admin_grid(db, "Songs")
+
+        if songs:
+            with st.expander("Delete Song"):
+                # Only the visible page is offered, not the whole catalog
+                song_id = st.selectbox(
+                    "Select song to delete",
+                    options=[s['Song_ID'] for s in songs],
+                    format_func={s['Song_ID']: f"{s['Title']} (#{s['Song_ID']})" for s in songs}.get
+                )
+
+                if st.button("Delete Song"):
+                    success = db.execute_transaction([
+                        ("UPDATE USER_STATS us JOIN SONGS s ON s.User_ID = us.User_ID "
+                         "SET us.Upload_Count = GREATEST(us.Upload_Count - 1, 0), "
+                         "us.Total_Plays = GREATEST(us.Total_Plays - s.Play_Count, 0) "
+                         "WHERE s.Song_ID = %s", (song_id,)),
+                        ("UPDATE MEDIA_FILES m JOIN SONGS s ON s.File_Path = m.File_Path "
+                         "SET m.Ref_Count = m.Ref_Count - 1 WHERE s.Song_ID = %s", (song_id,)),
+                        # Rows that reference the song go first, or its foreign keys block the delete
+                        *[(f"DELETE FROM {table} WHERE Song_ID = %s", (song_id,))
+                          for table in ("SONG_ARTISTS", "PLAYLIST_SONGS", "COMMENTS", "RATINGS", "TRENDING")],
+                        ("DELETE FROM SONGS WHERE Song_ID = %s", (song_id,)),
+                    ])
+                    if success:
+                        remove_unreferenced(db)
+                        st.success("Song deleted successfully!")
+                        time.sleep(1)
+                        st.rerun()
+        else:
+            st.warning("No songs found")
+
+    with tab3:
+        st.subheader("Artist Management")
+        artists = admin_grid(db, "Artists")
+
+        if artists:
+            with st.expander("Add New Artist"):
+                with st.form("add_artist"):
+                    name = st.text_input("Name")
+
+                    if st.form_submit_button("Add Artist"):
+                        success = db.execute_query(
+                            "INSERT INTO ARTISTS (Name) VALUES (%s)",
+                            (name,),
+                            fetch=False
+                        )
+                        if success:
+                            st.success("Artist added successfully!")
+        else:
+            st.warning("No artists found")
+
+    with tab4:
+        st.subheader("System Reports")
+
+        # The reports don't depend on each other, so they run side by side
+        reports = db.fetch_all({
+            "activity": lambda: db.fetch_frame(
+                "SELECT u.Username, COALESCE(SUM(d.Activity_Count), 0) as Activity_Count "
+                "FROM USERS u LEFT JOIN USER_ACTIVITY_DAILY d ON u.User_ID = d.User_ID "
+                "GROUP BY u.User_ID",
+                cache=True
+            ),
+            "popularity": lambda: db.fetch_frame(
+                "SELECT s.Title, a.Name as Artist, s.Play_Count "
+                "FROM SONGS s "
+                "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+                "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+                "ORDER BY s.Play_Count DESC LIMIT 10",
+                cache=True
+            ),
+        })
+
+        # User activity report
+        st.write("### User Activity")
+        user_activity = reports["activity"]
+        if user_activity is None:
+            still_loading("The user activity report")
+        elif isinstance(user_activity, pd.DataFrame) and not user_activity.empty:
+            fig = px.bar(user_activity, x='Username', y='Activity_Count',
+                        title="User Activity Count")
+            st.plotly_chart(fig)
+        else:
+            st.warning("No user activity data")
+
+        # Song popularity report
+        st.write("### Song Popularity")
+        song_popularity = reports["popularity"]
+        if song_popularity is None:
+            still_loading("The song popularity report")
+        elif isinstance(song_popularity, pd.DataFrame) and not song_popularity.empty:
+            fig = px.pie(song_popularity, values='Play_Count', names='Title',
+                        title="Top Songs by Plays")
+            st.plotly_chart(fig)
+        else:
+            st.warning("No song popularity data")
+
+        # Maintenance
+        st.write("### Maintenance")
+        if st.button("Rebuild User Stats"):
+            if db.rebuild_user_stats():
+                st.success("User stats rebuilt from playlists and songs")
+
+    with tab5:
+        show_performance(db)
+
+
+def admin_grid(db, grid: str) -> List[Dict]:
+    """Filterable, sortable, keyset-paginated admin table with streaming export"""
+    spec = ADMIN_GRIDS[grid]
+    col1, col2, col3, col4 = st.columns([2, 3, 2, 1])
+    with col1:
+        filter_column = st.selectbox("Filter on", spec['filterable'], key=f"{grid}_filter_column")
+    with col2:
+        filter_text = st.text_input("Contains", key=f"{grid}_filter_text")
+    with col3:
+        sort = st.selectbox("Sort by", spec['sortable'], key=f"{grid}_sort")
+    with col4:
+        descending = st.checkbox("Desc", key=f"{grid}_desc")
+
+    rows = keyset_pages(
+        f"admin_{grid}",
+        (filter_column, filter_text, sort, descending),
+        lambda after, limit: db.fetch_grid_page(
+            grid, sort, descending, filter_column, filter_text, after=after, limit=limit
+        ),
+        lambda row: (row[sort], row[spec['key']])
+    )
+    if rows:
+        st.dataframe(pd.DataFrame(rows))
+
+    with st.expander(f"Export {grid}"):
+        fmt = st.radio("Format", list(EXPORT_FORMATS), horizontal=True, key=f"{grid}_export_format")
+        if st.button("Export", key=f"{grid}_export"):
+            try:
+                path, count = db.export_grid(grid, fmt, filter_column, filter_text)
+            except Exception as e:
+                st.error(f"Export failed: {e}")
+            else:
+                st.success(f"Exported {count} rows to {path}")
+                with open(path, "rb") as f:
+                    st.download_button("Download", f, file_name=os.path.basename(path), key=f"{grid}_download")
+    return rows
+
+
+def show_performance(db):
+    metrics = db.metrics
+    st.subheader("Query Performance")
+    st.caption(
+        f"Since {datetime.fromtimestamp(metrics.started_at).strftime('%Y-%m-%d %H:%M:%S')} · "
+        f"Prometheus metrics on port {os.getenv('METRICS_PORT', '8503')} at /metrics"
+    )
+
+    pool, cache = db.pool.stats(), db.cache.stats()
+    lookups = cache['hits'] + cache['misses']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Connections in use", f"{pool['in_use']} / {pool['size']}")
+    col2.metric("Waiting for a connection", pool['waiting'])
+    col3.metric("Cache hit rate", f"{cache['hits'] / lookups:.0%}" if lookups else "-")
+    col4.metric("Cached results", cache['entries'])
+
+    st.write("### Queries by total time")
+    summary = metrics.summary()
+    if summary:
+        st.dataframe(pd.DataFrame(summary))
+    else:
+        st.info("No queries recorded yet")
+
+    st.write(f"### Slow queries (over {metrics.slow_threshold * 1000:.0f} ms)")
+    slow = metrics.slow_queries()
+    if slow:
+        st.dataframe(pd.DataFrame(slow))
+    else:
+        st.info("No slow queries recorded")
+
+    if st.button("Reset Metrics"):
+        metrics.reset()
+        st.rerun()
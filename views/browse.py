@@ -0,0 +1,132 @@
+"""Song, artist and genre browsing"""
+import pandas as pd
+import streamlit as st
+
+from columnar import format_durations
+from images import thumbnail
+from views import player
+from views.common import keyset_pages, paginated_songs
+
+
+def show(db):
+    st.title("🎶 Browse Music")
+    st.markdown("---")
+
+    tab1, tab2, tab3 = st.tabs(["All Songs", "Artists", "Genres"])
+
+    with tab1:
+        st.subheader("All Songs")
+        search_query = st.text_input("Search songs")
+
+        if search_query:
+            matched_artists = db.search_artists(search_query)
+            if isinstance(matched_artists, list) and matched_artists:
+                st.write("Matching artists:")
+                cols = st.columns(len(matched_artists))
+                for col, artist in zip(cols, matched_artists):
+                    with col:
+                        if st.button(artist['Name'], key=f"search_artist_{artist['Artist_ID']}"):
+                            show_artist_songs(db, artist['Artist_ID'])
+
+            songs = db.search_songs(search_query)
+        else:
+            songs = paginated_songs(db, "all_songs")
+
+        if songs:
+            df = pd.DataFrame(songs)
+            df['Duration'] = format_durations(df['Duration'])
+            st.dataframe(df)
+
+            selected_song = st.selectbox(
+                "Select a song to play",
+                options=[f"{s['Title']} - {s['Artists']}" for s in songs]
+            )
+
+            if st.button("Play Selected Song"):
+                song_id = next(s['Song_ID'] for s in songs if f"{s['Title']} - {s['Artists']}" == selected_song)
+                player.show(db, song_id)
+        else:
+            st.warning("No songs found")
+
+    with tab2:
+        st.subheader("Artists")
+        # A page of artists at a time rather than the whole table
+        artists = keyset_pages(
+            "artists",
+            (),
+            lambda after, limit: db.fetch_grid_page("Artists", "Name", after=after, limit=limit),
+            lambda row: (row['Name'], row['Artist_ID'])
+        )
+
+        if artists:
+            cols = st.columns(4)
+            for idx, artist in enumerate(artists):
+                with cols[idx % 4]:
+                    st.image(thumbnail(artist.get('Profile_Picture'), "grid"), width=150)
+                    st.subheader(artist['Name'])
+                    if st.button(f"View songs", key=f"artist_{artist['Artist_ID']}"):
+                        show_artist_songs(db, artist['Artist_ID'])
+        else:
+            st.warning("No artists found")
+
+    with tab3:
+        st.subheader("Genres")
+        genres = db.execute_query(
+            "SELECT DISTINCT Genre FROM SONGS WHERE Genre IS NOT NULL",
+            cache=True
+        )
+
+        if isinstance(genres, list) and genres:
+            selected_genre = st.selectbox(
+                "Select a genre",
+                options=[g['Genre'] for g in genres]
+            )
+
+            genre_songs = paginated_songs(db, "genre_songs", "s.Genre = %s", (selected_genre,))
+
+            if genre_songs:
+                st.write(pd.DataFrame(genre_songs)[['Song_ID', 'Title', 'Artists']])
+            else:
+                st.warning(f"No songs found in genre: {selected_genre}")
+        else:
+            st.warning("No genres found")
+
+
+def show_artist_songs(db, artist_id):
+    artist = db.execute_query(
+        "SELECT * FROM ARTISTS WHERE Artist_ID = %s",
+        (artist_id,)
+    )
+
+    if not isinstance(artist, list) or not artist:
+        st.error("Artist not found")
+        return
+
+    artist = artist[0]
+    st.title(f"Songs by {artist['Name']}")
+    st.markdown("---")
+
+    songs = paginated_songs(db, 
+        f"artist_{artist_id}_songs",
+        "EXISTS (SELECT 1 FROM SONG_ARTISTS sa WHERE sa.Song_ID = s.Song_ID AND sa.Artist_ID = %s)",
+        (artist_id,)
+    )
+
+    if songs:
+        df = pd.DataFrame(songs).drop(columns=['Artists'])
+        df['Duration'] = format_durations(df['Duration'])
+        st.dataframe(df)
+
+        selected_song = st.selectbox(
+            "Select a song to play",
+            options=[f"{s['Title']}" for s in songs]
+        )
+
+        if st.button("Play Selected Song"):
+            song_id = next(s['Song_ID'] for s in songs if s['Title'] == selected_song)
+            player.show(db, song_id)
+    else:
+        st.warning("No songs found for this artist")
+
+    if st.button("Back to Artists"):
+        show(db)
@@ -0,0 +1,58 @@
+"""Widgets shared by several pages"""
+from typing import Dict, List
+
+import streamlit as st
+
+
+def keyset_pages(key: str, signature: tuple, fetch_page, cursor_of) -> List[Dict]:
+    """Render page-size and prev/next controls around a keyset-paginated fetch.
+
+    ``fetch_page(after, limit)`` returns the rows following cursor ``after``
+    and ``cursor_of(row)`` gives a row's cursor. The cursor stack lives in
+    session state under ``key`` and resets whenever ``signature`` (the
+    filter and sort order) changes.
+    """
+    state_key = f"{key}_pages"
+    if st.session_state.get(state_key, {}).get("signature") != signature:
+        st.session_state[state_key] = {"signature": signature, "cursors": [None]}
+    pages = st.session_state[state_key]
+
+    page_size = st.selectbox("Page size", [25, 50, 100], key=f"{key}_page_size")
+    if pages.get("page_size") != page_size:
+        pages["page_size"] = page_size
+        pages["cursors"] = [None]
+
+    rows = fetch_page(pages["cursors"][-1], page_size + 1)
+    if not isinstance(rows, list):
+        return []
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀ Previous", key=f"{key}_prev", disabled=len(pages["cursors"]) == 1):
+            pages["cursors"].pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Page {len(pages['cursors'])}")
+    with col3:
+        if st.button("Next ▶", key=f"{key}_next", disabled=not has_next):
+            pages["cursors"].append(cursor_of(rows[-1]))
+            st.rerun()
+
+    return rows
+
+
+def paginated_songs(db, key: str, where: str = "", params=()) -> List[Dict]:
+    """Visible page of songs ordered by play count, with paging controls"""
+    return keyset_pages(
+        key,
+        (where, tuple(params or ())),
+        lambda after, limit: db.fetch_song_page(where, params, after=after, limit=limit),
+        lambda row: (row['Play_Count'], row['Song_ID'])
+    )
+
+
+def still_loading(what: str):
+    """Stand-in for a section whose query missed the ``fetch_all`` timeout"""
+    st.info(f"{what} is taking longer than usual and will show up on the next refresh.")
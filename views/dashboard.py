@@ -0,0 +1,99 @@
+"""Landing page: the user's stats, recent uploads and recommendations"""
+import pandas as pd
+import streamlit as st
+
+from images import thumbnail
+from views import player
+from views.common import still_loading
+
+
+def show(db):
+    st.title("🎧 Your Music Dashboard")
+    st.markdown("---")
+
+    # The page's reads don't depend on each other, so they run side by side
+    user_id = st.session_state.current_user['User_ID']
+    results = db.fetch_all({
+        # User stats from the USER_STATS read model
+        "stats": lambda: db.execute_query(
+            "SELECT Playlist_Count, Upload_Count, Total_Plays FROM USER_STATS WHERE User_ID = %s",
+            (user_id,),
+            cache=True
+        ),
+        "recent": lambda: db.execute_query(
+            "SELECT s.Song_ID, s.Title, a.Name as Artist, s.Play_Count, s.Cover_Image "
+            "FROM SONGS s "
+            "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+            "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+            "WHERE s.User_ID = %s "
+            "ORDER BY s.Upload_Date DESC LIMIT 5",
+            (user_id,),
+            cache=True
+        ),
+        "recommended": lambda: recommendations(db, user_id),
+    })
+
+    stats = results["stats"]
+    if stats is None:
+        still_loading("Your stats")
+    else:
+        stats = stats[0] if isinstance(stats, list) and stats else {}
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Your Playlists", stats.get('Playlist_Count', 0))
+        with col2:
+            st.metric("Songs Uploaded", stats.get('Upload_Count', 0))
+        with col3:
+            st.metric("Total Plays", stats.get('Total_Plays', 0))
+
+    # Recently played with safe data access
+    st.subheader("Recently Played")
+    recent_songs = results["recent"]
+
+    if recent_songs is None:
+        still_loading("Your recent uploads")
+    elif isinstance(recent_songs, list) and recent_songs:
+        for song in recent_songs:
+            with st.expander(f"{song['Title']} - {song['Artist']}"):
+                col1, col2 = st.columns([1, 3])
+                with col1:
+                    st.image(thumbnail(song.get('Cover_Image'), "grid"), width=150)
+                with col2:
+                    st.write(f"Plays: {song['Play_Count']}")
+                    if st.button("Play", key=f"play_{song['Song_ID']}"):
+                        player.show(db, song['Song_ID'])
+    else:
+        st.warning("No recently played songs")
+
+    # Recommended for you with safe data access
+    st.subheader("Recommended For You")
+    recommended = results["recommended"]
+
+    if recommended is None:
+        still_loading("Your recommendations")
+    elif isinstance(recommended, pd.DataFrame) and not recommended.empty:
+        st.write(recommended)
+    else:
+        st.info("No recommendations yet. Start listening to get recommendations!")
+
+
+def recommendations(db, user_id: int):
+    recommended = db.fetch_frame(
+        "SELECT s.Song_ID, s.Title, GROUP_CONCAT(a.Name SEPARATOR ', ') as Artist "
+        "FROM (SELECT Song_ID, Score FROM RECOMMENDATIONS "
+        "      WHERE User_ID = %s ORDER BY Score DESC LIMIT 5) r "
+        "JOIN SONGS s ON r.Song_ID = s.Song_ID "
+        "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+        "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+        "GROUP BY s.Song_ID, s.Title, r.Score "
+        "ORDER BY r.Score DESC",
+        (user_id,),
+        cache=True
+    )
+    if isinstance(recommended, pd.DataFrame) and recommended.empty:
+        # Nothing computed for this user yet; fall back to the most played songs
+        recommended = pd.DataFrame([
+            {'Song_ID': s['Song_ID'], 'Title': s['Title'], 'Artist': s['Artists']}
+            for s in (db.fetch_song_page(limit=5) or [])
+        ])
+    return recommended
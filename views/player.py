@@ -0,0 +1,156 @@
+"""Now-playing page: audio, comments and ratings"""
+import os
+import time
+from datetime import datetime
+
+import streamlit as st
+
+from database import COMMENTS_PAGE_SIZE, get_play_pipeline
+from images import thumbnail
+from media_server import MEDIA_ROOT, media_url, start_media_server
+
+
+@st.cache_resource
+def get_media_server():
+    """Start the range-request audio server once per process unless it runs standalone"""
+    if os.getenv("MEDIA_SERVER_AUTOSTART", "1") != "1":
+        return None
+    os.makedirs(MEDIA_ROOT, exist_ok=True)
+    return start_media_server()
+
+
+def show(db, song_id):
+    song = db.execute_query(
+        "SELECT * FROM SONGS WHERE Song_ID = %s",
+        (song_id,)
+    )
+
+    if not isinstance(song, list) or not song:
+        st.error("Song not found")
+        return
+
+    song = song[0]
+
+    # Play count, trending and activity log are written in batches off the render path
+    get_play_pipeline().record(st.session_state.current_user['User_ID'], song_id)
+
+    st.title(f"🎵 Now Playing: {song['Title']}")
+    st.markdown("---")
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.image(thumbnail(song.get('Cover_Image'), "player"), width=300)
+    with col2:
+        st.write(f"Plays: {song['Play_Count'] + 1}")  # +1 because we already incremented
+        st.write(f"Duration: {datetime.utcfromtimestamp(song['Duration']).strftime('%M:%S')}")
+
+        # Get artists
+        artists = db.execute_query(
+            "SELECT a.Name FROM SONG_ARTISTS sa "
+            "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+            "WHERE sa.Song_ID = %s",
+            (song_id,)
+        )
+        if isinstance(artists, list) and artists:
+            st.write("Artists:", ", ".join([a['Name'] for a in artists]))
+
+    # Audio player streams from the media server instead of inlining the file
+    audio_url = media_url(song['File_Path'])
+    if audio_url:
+        get_media_server()
+        st.audio(audio_url)
+    else:
+        st.audio(song['File_Path'])
+
+    show_comments(db, song_id)
+
+    show_rating(db, song_id)
+
+
+@st.fragment
+def show_rating(db, song_id):
+    """The song's average rating and the user's own, as a fragment like the comments"""
+    user_id = st.session_state.current_user['User_ID']
+    aggregate = db.song_rating(song_id)
+    if aggregate['Ratings']:
+        st.write(f"Rating: ⭐ {aggregate['Avg_Rating']} ({aggregate['Ratings']} ratings)")
+        with st.expander("Rating breakdown"):
+            st.bar_chart({"Ratings": {f"{stars:g}": n for stars, n in aggregate['Histogram'].items()}})
+
+    current_rating = db.execute_query(
+        "SELECT Rating_Value FROM RATINGS "
+        "WHERE User_ID = %s AND Song_ID = %s",
+        (user_id, song_id)
+    )
+
+    with st.form("add_rating"):
+        rating = st.slider("Rate this song", 0.0, 5.0,
+                           current_rating[0]['Rating_Value'] if isinstance(current_rating, list) and current_rating else 0.0,
+                           0.5)
+        if st.form_submit_button("Submit Rating"):
+            if db.rate_song(user_id, song_id, rating):
+                st.success("Rating submitted!")
+                time.sleep(1)
+                st.rerun(scope="fragment")
+
+
+def comment_cursor(comment) -> tuple:
+    return comment['Timestamp'], comment['Comment_ID']
+
+
+def load_more_comments(db, song_id, comments):
+    older = db.fetch_comment_page(song_id, after=comment_cursor(comments[-1]))
+    if isinstance(older, list):
+        st.session_state[f"comments_{song_id}"] = comments + older
+
+
+@st.fragment
+def show_comments(db, song_id):
+    """Newest comments first, older pages on demand.
+
+    Runs as a fragment so "Load more" and posting a comment rerun only this
+    section, not the whole page (and not the play it recorded). The newest
+    page comes from a short-lived cache; pages loaded with "Load more" are
+    kept in session state, so a rerun costs one cached query however many
+    comments are on screen.
+    """
+    st.subheader("Comments")
+    total = db.comment_count(song_id)
+    newest = db.fetch_comment_page(song_id)
+    if not isinstance(newest, list):
+        return
+
+    state_key = f"comments_{song_id}"
+    loaded = st.session_state.get(state_key, [])
+    if loaded and newest and len(newest) == COMMENTS_PAGE_SIZE and comment_cursor(newest[-1]) > comment_cursor(loaded[0]):
+        # More than a page of new comments since the older ones were loaded; start over
+        loaded = st.session_state[state_key] = []
+    seen = {c['Comment_ID'] for c in newest}
+    comments = newest + [c for c in loaded if c['Comment_ID'] not in seen]
+
+    if comments:
+        st.caption(f"{total} comments")
+        for comment in comments:
+            st.markdown(f"**{comment['Username']}** ({comment['Timestamp'].strftime('%Y-%m-%d %H:%M')})\n\n"
+                        f"{comment['Comment_Text']}\n\n---")
+        if len(comments) < total:
+            st.button("Load more comments", key=f"more_comments_{song_id}",
+                      on_click=load_more_comments, args=(db, song_id, comments))
+    else:
+        st.info("No comments yet")
+
+    # Add comment
+    with st.form("add_comment"):
+        comment_text = st.text_area("Add your comment")
+        if st.form_submit_button("Post Comment"):
+            if comment_text:
+                success = db.execute_query(
+                    "INSERT INTO COMMENTS (Comment_Text, User_ID, Song_ID) "
+                    "VALUES (%s, %s, %s)",
+                    (comment_text, st.session_state.current_user['User_ID'], song_id),
+                    fetch=False
+                )
+                if success:
+                    st.success("Comment added!")
+                    time.sleep(1)
+                    st.rerun(scope="fragment")
@@ -0,0 +1,139 @@
+"""The signed-in user's playlists"""
+import csv
+import os
+import time
+
+import pandas as pd
+import streamlit as st
+
+from playlist_files import IMPORT_EXTENSIONS, PLAYLIST_FORMATS, export_playlist, import_playlist, read_playlist
+from views.common import paginated_songs
+
+
+def show(db):
+    st.title("🎼 Your Playlists")
+    st.markdown("---")
+
+    # Create new playlist
+    with st.expander("Create New Playlist"):
+        with st.form("new_playlist"):
+            playlist_name = st.text_input("Playlist Name")
+
+            if st.form_submit_button("Create"):
+                if playlist_name:
+                    user_id = st.session_state.current_user['User_ID']
+                    success = db.execute_transaction([
+                        ("INSERT INTO PLAYLISTS (Name, User_ID) VALUES (%s, %s)", (playlist_name, user_id)),
+                        ("INSERT INTO USER_STATS (User_ID, Playlist_Count) VALUES (%s, 1) "
+                         "ON DUPLICATE KEY UPDATE Playlist_Count = Playlist_Count + 1", (user_id,)),
+                    ])
+                    if success:
+                        st.success("Playlist created successfully!")
+                        time.sleep(1)
+                        st.rerun()
+                else:
+                    st.warning("Please enter a playlist name")
+
+    # Display user's playlists, loaded with their songs in one round trip
+    playlists = db.fetch_user_playlists(st.session_state.current_user['User_ID'])
+
+    if isinstance(playlists, list) and playlists:
+        # One shared catalog page feeds every playlist's "add song" picker
+        with st.expander("Find songs to add"):
+            catalog_query = st.text_input("Search catalog", key="playlist_catalog_search")
+            if catalog_query:
+                catalog = db.search_songs(catalog_query, limit=25) or []
+            else:
+                catalog = paginated_songs(db, "playlist_catalog")
+            catalog_labels = {s['Song_ID']: f"{s['Title']} - {s['Artists']}" for s in catalog}
+
+        for playlist in playlists:
+            with st.expander(playlist['Name']):
+                show_playlist(db, playlist, catalog, catalog_labels)
+
+                if st.button(f"Delete Playlist", key=f"del_{playlist['Playlist_ID']}"):
+                    success = db.execute_transaction([
+                        ("DELETE FROM PLAYLIST_SONGS WHERE Playlist_ID = %s", (playlist['Playlist_ID'],)),
+                        ("DELETE FROM PLAYLISTS WHERE Playlist_ID = %s", (playlist['Playlist_ID'],)),
+                        ("UPDATE USER_STATS SET Playlist_Count = GREATEST(Playlist_Count - 1, 0) "
+                         "WHERE User_ID = %s", (playlist['User_ID'],)),
+                    ])
+                    if success:
+                        st.success("Playlist deleted!")
+                        time.sleep(1)
+                        st.rerun()
+    else:
+        st.info("You haven't created any playlists yet")
+
+
+def show_playlist(db, playlist, catalog, catalog_labels):
+    playlist_id = playlist['Playlist_ID']
+    songs = playlist['Songs']
+
+    if songs:
+        st.write(pd.DataFrame(songs).drop(columns=['Position']))
+    else:
+        st.info("This playlist is empty")
+
+    # Add several catalog songs at once; they are appended in one batched insert
+    if catalog:
+        to_add = st.multiselect(
+            "Add songs to playlist",
+            options=[s['Song_ID'] for s in catalog],
+            format_func=catalog_labels.get,
+            key=f"add_{playlist_id}"
+        )
+        if st.button("Add Songs", key=f"add_btn_{playlist_id}", disabled=not to_add):
+            added = db.add_to_playlist(playlist_id, to_add)
+            if added is not None:
+                st.toast(f"Added {added} songs to {playlist['Name']}")
+                st.rerun()
+
+    if songs:
+        labels = {s['Song_ID']: f"{s['Title']} - {s['Artist']}" for s in songs}
+        to_remove = st.multiselect(
+            "Remove songs", options=list(labels), format_func=labels.get, key=f"remove_{playlist_id}"
+        )
+        if st.button("Remove Songs", key=f"remove_btn_{playlist_id}", disabled=not to_remove):
+            if db.remove_from_playlist(playlist_id, to_remove):
+                st.toast(f"Removed {len(to_remove)} songs from {playlist['Name']}")
+                st.rerun()
+
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            to_move = st.selectbox("Move song", options=list(labels), format_func=labels.get,
+                                   key=f"move_{playlist_id}")
+        with col2:
+            position = st.number_input("To position", min_value=1, max_value=len(songs), step=1,
+                                       key=f"move_to_{playlist_id}")
+        with col3:
+            if st.button("Move", key=f"move_btn_{playlist_id}"):
+                if db.move_playlist_song(playlist_id, to_move, int(position) - 1):
+                    st.rerun()
+
+    with st.popover("Import / Export"):
+        uploaded = st.file_uploader("Import M3U or CSV", type=IMPORT_EXTENSIONS, key=f"import_{playlist_id}")
+        if uploaded is not None and st.button("Import", key=f"import_btn_{playlist_id}"):
+            try:
+                added, unmatched = import_playlist(db, playlist_id, read_playlist(uploaded, uploaded.name))
+            except (ValueError, csv.Error) as e:
+                st.error(f"Import failed: {e}")
+            else:
+                st.toast(f"Imported {added} songs into {playlist['Name']}")
+                if unmatched:
+                    st.warning(f"{len(unmatched)} entries matched no song, e.g. "
+                               + ", ".join(e.title or e.path or str(e.song_id) for e in unmatched[:5]))
+                else:
+                    st.rerun()
+
+        fmt = st.radio("Format", list(PLAYLIST_FORMATS), horizontal=True, key=f"export_format_{playlist_id}")
+        if st.button("Export", key=f"export_btn_{playlist_id}", disabled=not songs):
+            try:
+                path, count = export_playlist(db, playlist_id, playlist['Name'], fmt)
+            except Exception as e:
+                st.error(f"Export failed: {e}")
+            else:
+                st.success(f"Exported {count} songs to {path}")
+                with open(path, "rb") as f:
+                    st.download_button("Download", f, file_name=os.path.basename(path),
+                                       key=f"export_download_{playlist_id}")
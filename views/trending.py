@@ -0,0 +1,79 @@
+"""Decayed trending rankings for songs and artists"""
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from database import get_trending_engine
+from trending import TRENDING_WINDOWS
+
+
+def show(db):
+    st.title("📈 Trending Now")
+    st.markdown("---")
+
+    engine = get_trending_engine()
+    window = st.radio("Window", list(TRENDING_WINDOWS), index=1, horizontal=True)
+    if engine.refreshed_at:
+        st.caption(f"Rankings updated {engine.refreshed_at.strftime('%H:%M:%S')}")
+
+    tab1, tab2 = st.tabs(["Songs", "Artists"])
+
+    with tab1:
+        st.subheader("Trending Songs")
+        ranking = engine.top_songs(window, 10)
+        df = pd.DataFrame()
+        if ranking:
+            placeholders = ", ".join(["%s"] * len(ranking))
+            details = db.fetch_frame(
+                "SELECT s.Song_ID, s.Title, GROUP_CONCAT(a.Name SEPARATOR ', ') as Artist, "
+                "ROUND(r.Rating_Sum / NULLIF(r.Rating_Count, 0), 1) AS Avg_Rating, "
+                "COALESCE(r.Rating_Count, 0) AS Ratings "
+                "FROM SONGS s "
+                "JOIN SONG_ARTISTS sa ON s.Song_ID = sa.Song_ID "
+                "JOIN ARTISTS a ON sa.Artist_ID = a.Artist_ID "
+                "LEFT JOIN SONG_RATINGS r ON r.Song_ID = s.Song_ID "
+                f"WHERE s.Song_ID IN ({placeholders}) "
+                "GROUP BY s.Song_ID, s.Title, r.Rating_Sum, r.Rating_Count",
+                tuple(r['Song_ID'] for r in ranking),
+                cache=True
+            )
+            if isinstance(details, pd.DataFrame):
+                # Ranking order, with the details joined on
+                ranked = pd.DataFrame(ranking)[['Song_ID', 'Plays', 'Score']]
+                df = ranked.merge(details, on='Song_ID')[list(details.columns) + ['Plays', 'Score']]
+
+        if not df.empty:
+            fig = px.bar(df, x='Title', y='Score', color='Artist',
+                         hover_data=['Plays'], title=f"Top Songs ({window})")
+            st.plotly_chart(fig)
+
+            st.write("Top Songs List:")
+            st.dataframe(df)
+        else:
+            st.warning("No trending data available")
+
+    with tab2:
+        st.subheader("Trending Artists")
+        ranking = engine.top_artists(window, 5)
+        df = pd.DataFrame()
+        if ranking:
+            placeholders = ", ".join(["%s"] * len(ranking))
+            names = db.fetch_frame(
+                f"SELECT Artist_ID, Name FROM ARTISTS WHERE Artist_ID IN ({placeholders})",
+                tuple(r['Artist_ID'] for r in ranking),
+                cache=True
+            )
+            if isinstance(names, pd.DataFrame):
+                ranked = pd.DataFrame(ranking)[['Artist_ID', 'Plays', 'Score']]
+                df = ranked.merge(names, on='Artist_ID')[['Artist_ID', 'Name', 'Plays', 'Score']]
+                df = df.rename(columns={'Plays': 'Total_Plays'})
+
+        if not df.empty:
+            fig = px.pie(df, values='Score', names='Name',
+                        title=f"Artist Popularity ({window})")
+            st.plotly_chart(fig)
+
+            st.write("Top Artists List:")
+            st.dataframe(df)
+        else:
+            st.warning("No trending data available")
@@ -0,0 +1,106 @@
+"""Song upload into content-addressed media storage"""
+import os
+import time
+
+import streamlit as st
+
+from audio_store import audio_duration, discard_uncommitted, store_stream
+from images import store_image
+
+# Artists offered in the picker at a time
+ARTIST_CHOICES = 50
+
+
+def show(db):
+    st.title("🎤 Upload Music")
+    st.markdown("---")
+
+    st.subheader("Upload New Song")
+    # Artist selection sits outside the form so the search updates as it is typed
+    artist_option = st.radio("Artist", ["Existing Artist", "New Artist"], horizontal=True)
+    artist_id = new_artist = None
+    if artist_option == "Existing Artist":
+        # A search, or the first names alphabetically, rather than the whole table
+        artist_search = st.text_input("Search artists")
+        artists = (db.search_artists(artist_search, limit=ARTIST_CHOICES) if artist_search.strip() else
+                   db.fetch_grid_page("Artists", "Name", limit=ARTIST_CHOICES))
+        if isinstance(artists, list) and artists:
+            names = {a['Artist_ID']: a['Name'] for a in artists}
+            artist_id = st.selectbox("Select Artist", options=list(names), format_func=names.get)
+        else:
+            st.warning("No matching artists")
+    else:
+        new_artist = st.text_input("New Artist Name*", placeholder="Required if creating new artist")
+
+    with st.form("upload_form"):
+        song_title = st.text_input("Song Title*", placeholder="Required")
+        song_file = st.file_uploader("Audio File*", type=["mp3", "wav"], accept_multiple_files=False)
+        album = st.text_input("Album", placeholder="Optional")
+        genre = st.text_input("Genre", placeholder="Optional")
+        cover_file = st.file_uploader("Cover Image", type=["jpg", "jpeg", "png"], accept_multiple_files=False)
+
+        if st.form_submit_button("Upload Song"):
+            if not song_title:
+                st.error("Please enter a song title")
+            elif not song_file:
+                st.error("Please upload an audio file")
+            elif artist_option == "New Artist" and not new_artist:
+                st.error("Please enter an artist name")
+            elif artist_option == "Existing Artist" and artist_id is None:
+                st.error("Please select an artist")
+            else:
+                try:
+                    # Cover thumbnails first, so a bad image doesn't leave stored audio behind
+                    cover = None
+                    if cover_file:
+                        try:
+                            cover = store_image(cover_file)
+                        except ValueError as e:
+                            st.error(f"Cover image could not be used: {e}")
+                            return
+
+                    # Stream the file into content-addressed storage; identical audio is stored once
+                    song_file.seek(0)
+                    stored_path, content_hash, size, created = store_stream(song_file)
+                    song_path = os.path.relpath(stored_path)
+
+                    duration = audio_duration(stored_path)
+                    if duration is None:
+                        if created:
+                            os.remove(stored_path)
+                        st.error("Could not read the audio duration. Please upload a valid MP3 or WAV file.")
+                        return
+
+                    user_id = st.session_state.current_user['User_ID']
+                    if artist_option == "New Artist":
+                        artist_statements = [
+                            ("INSERT INTO ARTISTS (Name) VALUES (%s)", (new_artist,)),
+                            ("SET @artist_id = LAST_INSERT_ID()", None),
+                        ]
+                    else:
+                        artist_statements = [("SET @artist_id = %s", (artist_id,))]
+
+                    # Artist, song, link, counters and file reference commit together
+                    success = db.execute_transaction(artist_statements + [
+                        ("INSERT INTO SONGS (Title, Album, Genre, Duration, File_Path, Cover_Image, User_ID) "
+                         "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                         (song_title, album or None, genre, duration, song_path, cover, user_id)),
+                        ("INSERT INTO SONG_ARTISTS (Song_ID, Artist_ID) VALUES (LAST_INSERT_ID(), @artist_id)", None),
+                        ("INSERT INTO USER_STATS (User_ID, Upload_Count) VALUES (%s, 1) "
+                         "ON DUPLICATE KEY UPDATE Upload_Count = Upload_Count + 1", (user_id,)),
+                        ("INSERT INTO MEDIA_FILES (Content_Hash, File_Path, Size_Bytes, Duration, Ref_Count) "
+                         "VALUES (%s, %s, %s, %s, 1) "
+                         "ON DUPLICATE KEY UPDATE Ref_Count = Ref_Count + 1",
+                         (content_hash, song_path, size, duration)),
+                    ])
+
+                    if not success and created:
+                        # Nothing references the new file; don't leave it in storage
+                        discard_uncommitted(db, [(stored_path, content_hash)])
+                    if success:
+                        st.success("Song uploaded successfully!" if created else
+                                   "Song uploaded successfully! (identical audio was already stored)")
+                        time.sleep(1)
+                        st.rerun()
+                except Exception as e:
+                    st.error(f"Failed to upload song: {e}")